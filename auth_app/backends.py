@@ -0,0 +1,46 @@
+"""
+ModelBackend with the logged-in user kept in the cache between requests, so
+that an authenticated request with a cached (or signed-cookie) session runs
+no queries before its view does.
+
+The entry is dropped whenever the user is saved or deleted (auth_app.signals),
+which covers logins, password changes and admin edits; writes that bypass
+save() (QuerySet.update) show up after INVENTORY_USER_CACHE_TIMEOUT seconds.
+0 (the default unless the cache is shared between workers) looks the user
+up on every request.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def timeout():
+    return getattr(settings, 'INVENTORY_USER_CACHE_TIMEOUT', 0)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not timeout():
+            return super().get_user(user_id)
+        user = cache.get(cache_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(cache_key(user_id), user, timeout())
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        if not timeout():
+            return await super().aget_user(user_id)
+        user = await cache.aget(cache_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await cache.aset(cache_key(user_id), user, timeout())
+        return user if self.user_can_authenticate(user) else None
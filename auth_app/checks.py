@@ -0,0 +1,35 @@
+"""
+System checks: the cached session engine and the user cache need a cache
+every worker shares. On locmem, a logout or password change in one worker
+leaves the old session or user cached -- and accepted -- in the others.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+from .backends import timeout as user_cache_timeout
+
+
+HINT = (
+    "Set INVENTORY_CACHE to 'redis' or 'file', or go back to the defaults "
+    "(INVENTORY_SESSIONS=db, INVENTORY_USER_CACHE_TIMEOUT=0). A single-process "
+    "server may silence this with SILENCED_SYSTEM_CHECKS."
+)
+
+
+@register(Tags.security, Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    errors = []
+    if settings.SESSION_ENGINE.endswith(('.cache', '.cached_db')):
+        if isinstance(caches[settings.SESSION_CACHE_ALIAS], LocMemCache):
+            errors.append(Error(
+                f"{settings.SESSION_ENGINE} sessions are kept in a per-process (locmem) cache.",
+                hint=HINT, id='auth_app.E001',
+            ))
+    if user_cache_timeout() and isinstance(caches['default'], LocMemCache):
+        errors.append(Error(
+            "INVENTORY_USER_CACHE_TIMEOUT caches users in a per-process (locmem) cache.",
+            hint=HINT, id='auth_app.E002',
+        ))
+    return errors
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
 
 
 class RegisterForm(forms.ModelForm):
@@ -42,11 +44,29 @@ class RegisterForm(forms.ModelForm):
             'password'
         ]  # password_confirm is NOT part of User model
 
-    def clean_email(self):
+    def validate_unique(self):
+        """
+        Check the username and the email (ignoring case) in one query: the
+        username's unique index OR the LOWER(email) one from
+        auth_app/migrations/0001, instead of a query per field -- and the
+        email's ``iexact`` scan of the whole user table.
+        """
+        username = self.cleaned_data.get("username")
         email = self.cleaned_data.get("email")
-        if User.objects.filter(email__iexact=email).exists():
-            raise ValidationError("This email is already registered.")
-        return email
+        lookups = Q()
+        if username:
+            lookups |= Q(username=username)
+        if email:
+            # the index's own expression and condition, so that it gets used
+            lookups |= Q(~Q(email=''), email_lower=Lower(Value(email)))
+        if not lookups:
+            return
+
+        taken = list(User.objects.annotate(email_lower=Lower('email')).filter(lookups).values_list('username', 'email'))
+        if username and any(other == username for other, _ in taken):
+            self.add_error('username', User._meta.get_field('username').error_messages['unique'])
+        if email and any(other.lower() == email.lower() for _, other in taken):
+            self.add_error('email', "This email is already registered.")
 
     def clean_password(self):
         password = self.cleaned_data.get("password")
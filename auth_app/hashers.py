@@ -0,0 +1,49 @@
+"""
+Django's password hashers with their cost read from settings, so the
+hashing profile (settings.INVENTORY_PASSWORD_HASHER) can be tuned per
+deployment without code changes. The algorithm names are Django's own and
+every hash records its parameters, so existing hashes keep verifying; a
+hash made at another cost is re-made at this one on the next login.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def _cost(name, default):
+    return getattr(settings, name, None) or default
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _cost('INVENTORY_PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Needs argon2-cffi (``pip install django[argon2]``)."""
+
+    @property
+    def time_cost(self):
+        return _cost('INVENTORY_ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        # KiB
+        return _cost('INVENTORY_ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _cost('INVENTORY_ARGON2_PARALLELISM', hashers.Argon2PasswordHasher.parallelism)
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _cost('INVENTORY_SCRYPT_WORK_FACTOR', hashers.ScryptPasswordHasher.work_factor)
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * n * r bytes; OpenSSL refuses more than 32 MiB
+        # unless told otherwise (0 keeps its default)
+        needed = 128 * self.work_factor * self.block_size
+        return 2 * needed if needed > 16 * 1024 * 1024 else 0
@@ -0,0 +1,46 @@
+"""
+A unique index on LOWER(email) for auth_user, so that registration's
+case-insensitive "is this email taken?" check is an index lookup instead of
+a scan of the user table. Blank emails (users made by createsuperuser or the
+admin without one) are left out of it.
+
+auth.User isn't ours to add Meta constraints to, so the index is created
+through the schema editor here, like AddConstraint would.
+"""
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+EMAIL_UNIQUE = models.UniqueConstraint(
+    Lower('email'), condition=~models.Q(email=''), name='auth_user_email_lower_uniq',
+)
+
+
+def add_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.exclude(email='').annotate(email_lower=Lower('email'))
+        .values('email_lower').annotate(users=models.Count('pk')).filter(users__gt=1)
+        .values_list('email_lower', flat=True)[:10]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Some users share an email address (ignoring case); give them distinct ones "
+            f"before migrating: {', '.join(duplicates)}"
+        )
+    schema_editor.add_constraint(User, EMAIL_UNIQUE)
+
+
+def remove_index(apps, schema_editor):
+    schema_editor.remove_constraint(apps.get_model('auth', 'User'), EMAIL_UNIQUE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .backends import cache_key
+
+
+# every save drops the cached copy: a changed password must end the other
+# sessions (their auth hash no longer matches) on the very next request
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    cache.delete(cache_key(instance.pk))
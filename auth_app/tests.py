@@ -1,8 +1,23 @@
 # auth_app/tests.py
-from django.test import TestCase, Client
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from invApp.testing import QueryBudgetMixin, TENANT_SIZES, seed_tenant
+from . import throttle
+from .checks import check_shared_cache
+from .forms import RegisterForm
+
 
 class RegistrationTests(TestCase):
     """Test user registration functionality"""
@@ -79,6 +94,52 @@ class RegistrationTests(TestCase):
         self.assertEqual(User.objects.count(), 0)
 
 
+class RegistrationUniquenessTests(TestCase):
+    """Test the indexed, single-query username and email checks on signup"""
+
+    def setUp(self):
+        self.existing = User.objects.create_user(username='taken', email='Someone@Example.com', password='x')
+        self.data = {
+            'username': 'newcomer', 'first_name': 'New', 'last_name': 'Comer', 'email': 'new@example.com',
+            'password': 'Sturdy-pass-2024', 'password_confirm': 'Sturdy-pass-2024',
+        }
+
+    def test_both_duplicates_reported_in_one_query(self):
+        """A taken username and a taken email (in any case) should be found by one query"""
+        form = RegisterForm({**self.data, 'username': 'taken', 'email': 'someone@EXAMPLE.com'})
+        with self.assertNumQueries(1):
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['username'], ['A user with that username already exists.'])
+        self.assertEqual(form.errors['email'], ['This email is already registered.'])
+
+        form = RegisterForm({**self.data, 'email': 'someone@example.com'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['email'])
+        self.assertTrue(RegisterForm(self.data).is_valid())
+
+    def test_index_rejects_case_variants(self):
+        """The LOWER(email) index should refuse a second spelling, but allow many blank emails"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='other', email='SOMEONE@example.com', password='x')
+        User.objects.create_user(username='blank1', password='x')
+        User.objects.create_user(username='blank2', password='x')
+
+    def test_race_shows_the_form_error(self):
+        """A signup losing the race to the index should get the form error, not a 500"""
+        check, calls = RegisterForm.validate_unique, []
+
+        def miss_the_first_time(form):
+            calls.append(form)
+            if len(calls) > 1:
+                check(form)
+
+        with mock.patch.object(RegisterForm, 'validate_unique', autospec=True, side_effect=miss_the_first_time):
+            response = self.client.post(reverse('register'), {**self.data, 'email': 'SOMEONE@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'This email is already registered.')
+        self.assertFalse(User.objects.filter(username='newcomer').exists())
+
+
 class LoginTests(TestCase):
     """Test user login functionality"""
 
@@ -149,6 +210,175 @@ class LoginTests(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+@override_settings(INVENTORY_LOGIN_THROTTLE_RATES={'ip': (6, 60), 'username': (3, 60)})
+class LoginThrottleTests(TestCase):
+    """Test the sliding-window limit on failed logins"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.login_url = reverse('login')
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def fail(self, username='testuser', **extra):
+        return self.client.post(self.login_url, {'username': username, 'password': 'wrong'}, **extra)
+
+    def test_username_is_locked_without_hashing(self):
+        """Past the limit, logins for the username should get a 429 before any password check"""
+        for _ in range(3):
+            self.assertEqual(self.fail().status_code, 200)
+
+        with mock.patch('auth_app.views.authenticate') as authenticate:
+            response = self.fail(username=' TestUser')
+            self.client.post(self.login_url, {'username': 'testuser', 'password': 'testpass123'})
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        self.assertContains(response, 'Too many failed logins', status_code=429)
+
+        # other users from the same client are still let through
+        self.assertEqual(self.fail(username='someoneelse').status_code, 200)
+
+    def test_client_is_limited_across_usernames(self):
+        """Failures from one IP should add up whatever usernames they try"""
+        for i in range(6):
+            self.fail(username=f'guess{i}')
+        self.assertEqual(self.fail(username='guess99').status_code, 429)
+        self.assertEqual(self.fail(username='guess99', REMOTE_ADDR='198.51.100.4').status_code, 200)
+
+    def test_success_clears_the_username(self):
+        """A successful login should forget the username's earlier failures"""
+        self.fail()
+        self.fail()
+        self.client.post(self.login_url, {'username': 'testuser', 'password': 'testpass123'})
+        self.client.logout()
+        self.fail()
+        self.fail()
+        self.assertEqual(self.fail().status_code, 200)
+
+    def test_window_slides(self):
+        """The previous window's failures should count less as it slides out"""
+        request = RequestFactory().post(self.login_url)
+        for _ in range(3):
+            throttle.record_failure(request, 'testuser', now=1000)
+        wait = throttle.retry_after(request, 'testuser', now=1010)
+        self.assertEqual(throttle.retry_after(request, 'testuser', now=1010 + wait), 0)
+        self.assertGreater(throttle.retry_after(request, 'testuser', now=1010 + wait - 2), 0)
+
+        # the next window, half-way: the three failures weigh 1.5
+        self.assertEqual(throttle.retry_after(request, 'testuser', now=1050), 0)
+        throttle.record_failure(request, 'testuser', now=1050)
+        self.assertEqual(throttle.retry_after(request, 'testuser', now=1050), 0)
+        throttle.record_failure(request, 'testuser', now=1050)
+        wait = throttle.retry_after(request, 'testuser', now=1050)
+        self.assertTrue(0 < wait < 30)
+        self.assertEqual(throttle.retry_after(request, 'testuser', now=1050 + wait), 0)
+
+
+class PasswordHasherTests(TestCase):
+    """Test the tunable password hashing profile"""
+
+    @override_settings(PASSWORD_HASHERS=['auth_app.hashers.PBKDF2PasswordHasher'], INVENTORY_PBKDF2_ITERATIONS=1000)
+    def test_hashes_are_upgraded_to_the_configured_cost(self):
+        """A login should re-hash a password made at another cost"""
+        user = User.objects.create_user(username='tuned', password='testpass123')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(INVENTORY_PBKDF2_ITERATIONS=2000):
+            self.assertTrue(self.client.login(username='tuned', password='testpass123'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+    @override_settings(
+        PASSWORD_HASHERS=['auth_app.hashers.ScryptPasswordHasher', 'auth_app.hashers.PBKDF2PasswordHasher'],
+        INVENTORY_SCRYPT_WORK_FACTOR=2 ** 10,
+    )
+    def test_profile_hasher_comes_first(self):
+        """New hashes use the profile's hasher; the others still verify"""
+        encoded = make_password('testpass123')
+        self.assertTrue(encoded.startswith('scrypt$1024$'))
+        self.assertTrue(check_password('testpass123', encoded))
+        self.assertTrue(check_password('testpass123', make_password('testpass123', hasher='pbkdf2_sha256')))
+
+
+class SessionProfileTests(TestCase):
+    """Test the cached session and user lookups and the session cleanup"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.home_url = reverse('home')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', INVENTORY_USER_CACHE_TIMEOUT=300)
+    def test_warm_requests_skip_session_and_user_queries(self):
+        """After the first page, the session and the user should come from the cache"""
+        self.client.login(username='testuser', password='testpass123')
+        # the session was cached at login; the user is looked up once
+        with self.assertNumQueries(1):
+            self.client.get(self.home_url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.home_url).status_code, 200)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', INVENTORY_USER_CACHE_TIMEOUT=300)
+    def test_password_change_ends_sessions_at_once(self):
+        """Saving the user should drop the cached copy its sessions are checked against"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(self.home_url)
+
+        self.user.set_password('another-pass-456')
+        self.user.save()
+        response = self.client.get(self.home_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(reverse('login')))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies', INVENTORY_USER_CACHE_TIMEOUT=300)
+    def test_signed_cookie_sessions(self):
+        """Signed-cookie sessions should need no session table at all"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(self.home_url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.home_url).status_code, 200)
+        self.assertFalse(Session.objects.exists())
+
+        out = io.StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn('nothing to do', out.getvalue())
+
+    def test_defaults_do_not_cache_per_process(self):
+        """On the default locmem cache, sessions and users should be read from the database"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(self.home_url)
+        # session + user, every time
+        with self.assertNumQueries(2):
+            self.client.get(self.home_url)
+
+    def test_check_rejects_per_process_caches(self):
+        """cached_db sessions or the user cache on locmem should fail the system check"""
+        self.assertEqual(check_shared_cache(None), [])
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', INVENTORY_USER_CACHE_TIMEOUT=60):
+            self.assertEqual([e.id for e in check_shared_cache(None)], ['auth_app.E001', 'auth_app.E002'])
+        with override_settings(
+            SESSION_ENGINE='django.contrib.sessions.backends.cached_db', INVENTORY_USER_CACHE_TIMEOUT=60,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        ):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_purge_sessions_in_batches(self):
+        """Only expired sessions should go, a batch at a time"""
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1)) for i in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        out = io.StringIO()
+        # a SELECT and a DELETE per batch of 2, then the SELECT that finds none left
+        with self.assertNumQueries(3 * 2 + 1):
+            call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 expired session(s).', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
 class LogoutTests(TestCase):
     """Test user logout functionality"""
 
@@ -289,4 +519,52 @@ class AuthenticationFlowTests(TestCase):
         # Try protected page again (should redirect)
         response = self.client.get(self.protected_url)
         self.assertEqual(response.status_code, 302)
-        self.assertIn('login', response.url)
\ No newline at end of file
+        self.assertIn('login', response.url)
+
+
+class AuthQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Every auth_app URL must run a fixed number of queries and stay within its latency budget"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenants = []
+        # nothing here reads the catalog -- the invApp budgets cover the
+        # large tenants -- so one small tenant keeps the suite quick
+        for size in TENANT_SIZES[:1]:
+            owner = User.objects.create_user(username=f'tenant{size}', password='testpass123')
+            seed_tenant(owner, size)
+            cls.tenants.append((size, owner))
+
+    def test_every_url_has_a_budget(self):
+        """Adding a URL to auth_app.urls should come with a budget here"""
+        from .urls import urlpatterns
+
+        self.assertEqual({p.name for p in urlpatterns}, {'home', 'login', 'logout', 'register'})
+
+    def test_login_and_logout(self):
+        """Password hashing dominates login; the query count must not depend on the tenant"""
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.assertWithinBudget(reverse('login'), queries=0, ms=100)
+                # user lookup, last_login update, session key check and write (with savepoints)
+                self.assertWithinBudget(reverse('login'), {
+                    'username': owner.username, 'password': 'testpass123',
+                }, method='post', status=302, queries=9, ms=1500)
+                # session + user + session delete (in a savepoint)
+                self.assertWithinBudget(reverse('logout'), method='post', status=302, queries=4, ms=100)
+
+    def test_home(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.client.force_login(owner)
+                self.assertWithinBudget(reverse('home'), queries=2, ms=100)
+
+    def test_register(self):
+        self.assertWithinBudget(reverse('register'), queries=0, ms=100)
+        # username and email are checked by one indexed query; the insert runs
+        # in a savepoint so a lost race shows the form error
+        self.assertWithinBudget(reverse('register'), {
+            'username': 'newcomer', 'first_name': 'New', 'last_name': 'Comer', 'email': 'new@example.com',
+            'password': 'Sturdy-pass-2024', 'password_confirm': 'Sturdy-pass-2024',
+        }, method='post', status=302, queries=12, ms=1500)
+
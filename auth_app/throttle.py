@@ -0,0 +1,104 @@
+"""
+Login throttling: a sliding-window limit on failed logins per client IP and
+per username, kept in the cache (INVENTORY_LOGIN_THROTTLE_CACHE) so that a
+rejected attempt costs one cache round trip and no password hashing.
+
+Each (scope, key) counts failures in fixed windows of the scope's length.
+The sliding count is the current window's failures plus the previous
+window's, weighted by how much of it still falls inside the last ``window``
+seconds -- two counters per key, whatever the attack rate. Successful
+logins don't count, and reset the username's counters.
+
+INVENTORY_LOGIN_THROTTLE_RATES maps each scope to (failures, seconds); a
+scope set to None is not limited. With the locmem cache the counters are
+per process -- use the file or redis cache when running several workers.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+DEFAULT_RATES = {
+    'ip': (20, 300),
+    'username': (5, 300),
+}
+
+
+def _rates():
+    rates = {**DEFAULT_RATES, **getattr(settings, 'INVENTORY_LOGIN_THROTTLE_RATES', {})}
+    return {scope: rate for scope, rate in rates.items() if rate}
+
+
+def _cache():
+    return caches[getattr(settings, 'INVENTORY_LOGIN_THROTTLE_CACHE', 'default')]
+
+
+def _identities(request, username):
+    # usernames are hashed: the cache key stays short and safe for any backend
+    normalized = (username or '').strip().lower()
+    return {
+        'ip': request.META.get('REMOTE_ADDR') or 'unknown',
+        'username': hashlib.sha256(normalized.encode()).hexdigest()[:32],
+    }
+
+
+def _windows(request, username, now):
+    """[(scope, (failures, seconds), current key, previous key, elapsed share), ...]"""
+    identities = _identities(request, username)
+    windows = []
+    for scope, (limit, seconds) in _rates().items():
+        index, elapsed = divmod(now, seconds)
+        key = f'login-throttle:{scope}:{identities[scope]}'
+        windows.append((scope, (limit, seconds), f'{key}:{int(index)}', f'{key}:{int(index) - 1}', elapsed / seconds))
+    return windows
+
+
+def retry_after(request, username, now=None):
+    """Seconds until a login for ``username`` from this client may be tried; 0 if it may now."""
+    now = time.time() if now is None else now
+    windows = _windows(request, username, now)
+    counts = _cache().get_many([key for w in windows for key in w[2:4]])
+
+    wait = 0
+    for scope, (limit, seconds), current_key, previous_key, elapsed in windows:
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+        if current + previous * (1 - elapsed) < limit:
+            continue
+        if current >= limit:
+            # the current window alone is over: wait for it to become the
+            # previous one, then for enough of it to slide out
+            remaining = 1 - elapsed + (1 - limit / current)
+        else:
+            # wait for the previous window's share to slide out
+            remaining = (1 - (limit - current) / previous) - elapsed
+        # the count has to drop below the limit, not just reach it (the
+        # rounding keeps float error from landing a second short)
+        wait = max(wait, math.floor(max(remaining, 0) * seconds + 1e-6) + 1)
+    return wait
+
+
+def record_failure(request, username, now=None):
+    """Count a failed login against this client and ``username``."""
+    now = time.time() if now is None else now
+    cache = _cache()
+    for scope, (limit, seconds), current_key, _, _ in _windows(request, username, now):
+        # the key outlives its window by one more: it is the next one's previous
+        cache.add(current_key, 0, timeout=2 * seconds)
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            # evicted between add() and incr()
+            cache.set(current_key, 1, timeout=2 * seconds)
+
+
+def reset(request, username, now=None):
+    """Forget ``username``'s failures after a successful login (the client's stay)."""
+    now = time.time() if now is None else now
+    keys = []
+    for scope, _, current_key, previous_key, _ in _windows(request, username, now):
+        if scope == 'username':
+            keys += [current_key, previous_key]
+    _cache().delete_many(keys)
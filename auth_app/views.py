@@ -15,6 +15,7 @@
 # from django.views import View
 # from django.contrib.auth.models import User
 # from .forms import RegisterForm
+from . import throttle
 
 # # Create your views here.
 
@@ -103,6 +104,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
 from django.contrib.auth.models import User  # (currently unused, but kept if needed later)
+from django.db import IntegrityError, transaction
 from .forms import RegisterForm
 
 
@@ -123,10 +125,17 @@ def register_view(request):
         form = RegisterForm(request.POST)
         if form.is_valid():
             # Let the form handle creating the user properly
-            user = form.save()
-            # Automatically log the user in after successful registration
-            login(request, user)
-            return redirect('home')
+            try:
+                with transaction.atomic():
+                    user = form.save()
+            except IntegrityError:
+                # someone registered the same username/email since the check;
+                # the unique indexes caught it -- check again for the message
+                form.validate_unique()
+            else:
+                # Automatically log the user in after successful registration
+                login(request, user)
+                return redirect('home')
     else:
         form = RegisterForm()
 
@@ -143,14 +152,26 @@ def login_view(request):
         username = request.POST.get('username')
         password = request.POST.get('password')
 
+        # too many failures from this client or for this username: refuse
+        # before hashing anything
+        wait = throttle.retry_after(request, username)
+        if wait:
+            response = render(request, 'accounts/login.html', {
+                'error': 'Too many failed logins. Please try again later.'
+            }, status=429)
+            response['Retry-After'] = str(wait)
+            return response
+
         # authenticate the user
         user = authenticate(request, username=username, password=password)
 
         # if user is authenticated, log them in
         if user is not None:
+            throttle.reset(request, username)
             login(request, user)
             return redirect(request.GET.get('next', '/'))
         else:
+            throttle.record_failure(request, username)
             # wrong password/username → show error
             return render(request, 'accounts/login.html', {
                 'error': 'Invalid username or password'
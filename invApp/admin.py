@@ -1,9 +1,185 @@
-from django.contrib import admin
-from .models import Product
+from collections import defaultdict
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Product, Supplier, InventoryStats, StockMovement, StockHistory, StockAlert, Job
+from .search import get_backend as get_search_backend
+from .forms import BulkActionForm
+from .stock import InsufficientStock
+from . import bulk
+
+
+class ProductActionForm(ActionForm):
+    value = forms.CharField(required=False, max_length=100, label='Value')
+
+
+def _by_owner(queryset):
+    """[(owner, [product ids]), ...] for ``queryset``, at most MAX_SELECTION ids per entry."""
+    selected = defaultdict(list)
+    for pk, owner_id in queryset.order_by().values_list('pk', 'owner_id'):
+        selected[owner_id].append(pk)
+    owners = get_user_model().objects.in_bulk(list(selected))
+    return [
+        (owners[owner_id], ids[i:i + bulk.MAX_SELECTION])
+        for owner_id, ids in selected.items()
+        for i in range(0, len(ids), bulk.MAX_SELECTION)
+    ]
+
+
+def _bulk_action(action, description):
+    # the admin %-formats descriptions with the model's names
+    @admin.action(description=description.replace('%', '%%'), permissions=['change'])
+    def run(modeladmin, request, queryset):
+        modeladmin.apply_bulk_action(request, queryset, action)
+    run.__name__ = action
+    return run
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'sku', 'owner', 'price', 'quantity')
+    list_display = ('name', 'sku', 'owner', 'supplier', 'price', 'quantity', 'reorder_level')
+    list_select_related = ('owner', 'supplier')
+    raw_id_fields = ('supplier',)
+    readonly_fields = ('version',)
     search_fields = ('name', 'sku', 'owner__username')
+    action_form = ProductActionForm
+    actions = [
+        _bulk_action(action, f'{label} (enter the value below)')
+        for action, label in bulk.ACTION_CHOICES if action != bulk.DELETE
+    ]
+
+    def apply_bulk_action(self, request, queryset, action):
+        # the same set-based updates as the product list, one owner at a time
+        selection = _by_owner(queryset)
+        if not selection:
+            return
+        form = BulkActionForm({'action': action, 'value': request.POST.get('value', ''), 'products': selection[0][1]})
+        if not form.is_valid():
+            for errors in form.errors.values():
+                self.message_user(request, ' '.join(errors), messages.ERROR)
+            return
+        try:
+            with transaction.atomic():
+                count = sum(
+                    bulk.apply_action(owner, ids, action, form.cleaned_data['value'])
+                    for owner, ids in selection
+                )
+        except InsufficientStock:
+            self.message_user(request, 'Not enough stock on some of the products -- nothing was changed.', messages.ERROR)
+        except bulk.PriceOutOfRange:
+            self.message_user(
+                request, f'That would price some of the products above {bulk.MAX_PRICE} -- nothing was changed.', messages.ERROR,
+            )
+        else:
+            self.message_user(request, f'{dict(bulk.ACTION_CHOICES)[action]}: {count} product(s) updated.')
+
+    def delete_queryset(self, request, queryset):
+        # "Delete selected": a plain DELETE per owner instead of one
+        # product (and one round of signals) at a time
+        with transaction.atomic():
+            for owner, ids in _by_owner(queryset):
+                bulk.apply_action(owner, ids, bulk.DELETE)
+
+    def get_search_results(self, request, queryset, search_term):
+        # name/SKU/supplier go through the search index instead of LIKE '%x%' scans;
+        # owners are matched by exact username
+        if not search_term:
+            return queryset, False
+        matches = get_search_backend().matching(Product.objects.all(), search_term)
+        queryset = queryset.filter(Q(pk__in=matches.values('pk')) | Q(owner__username=search_term))
+        return queryset, False
+
+
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner')
+    list_select_related = ('owner',)
+    raw_id_fields = ('owner',)
+    search_fields = ('key', 'owner__username')
+
+
+@admin.register(InventoryStats)
+class InventoryStatsAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'total_products', 'low_stock', 'out_of_stock', 'updated_at')
+    readonly_fields = ('owner', 'total_products', 'low_stock', 'out_of_stock', 'updated_at')
+    actions = ['rebuild_stats']
+
+    @admin.action(description='Recount selected owners')
+    def rebuild_stats(self, request, queryset):
+        for owner_id in queryset.values_list('owner_id', flat=True):
+            InventoryStats.rebuild(owner_id)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'product', 'kind', 'delta', 'quantity_after', 'owner')
+    list_filter = ('kind',)
+    list_select_related = ('product', 'owner')
+    raw_id_fields = ('product', 'owner')
+
+    # the ledger is append-only; movements are made through invApp.stock
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockHistory)
+class StockHistoryAdmin(admin.ModelAdmin):
+    list_display = ('product', 'month', 'step', 'owner', 'updated_at')
+    list_select_related = ('product', 'owner')
+    raw_id_fields = ('product', 'owner')
+    # the packed arrays are only meaningful through invApp.history
+    exclude = ('changes',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockAlert)
+class StockAlertAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'product', 'kind', 'quantity', 'reorder_level', 'owner', 'status', 'attempts', 'delivered_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('product', 'owner')
+    raw_id_fields = ('product', 'owner')
+    actions = ['retry']
+
+    @admin.action(description='Deliver again')
+    def retry(self, request, queryset):
+        queryset.update(
+            status=StockAlert.PENDING, delivered_at=None, attempts=0, next_attempt_at=timezone.now(),
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'owner', 'status', 'progress', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    list_select_related = ('owner',)
+    raw_id_fields = ('owner',)
+    actions = ['retry']
+
+    @admin.action(description='Run again')
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), error='', finished_at=None,
+        )
 
+    def has_add_permission(self, request):
+        return False
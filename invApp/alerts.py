@@ -0,0 +1,221 @@
+"""
+Low-stock alerts.
+
+Every product has a ``reorder_level``; it is *low* at or below that level and
+*out* at zero. The write paths (the Product signal handlers, invApp.stock and
+the importer) already know each product's (quantity, reorder_level) before and
+after a change, so they pass those pairs to ``raise_alerts()``, which writes
+a StockAlert for every threshold actually crossed. Nothing ever scans the
+catalog looking for low stock.
+
+StockAlert rows are written in the same transaction as the stock change and
+act as an outbox, together with a ``deliver_alerts`` background job (see
+invApp.jobs) that drains them in batches -- as does ``manage.py
+deliver_alerts`` -- through the backends listed in INVENTORY_ALERT_BACKENDS
+(dotted paths):
+
+- ``invApp.alerts.LoggingBackend``: one line per alert on ``inventory.alerts``.
+- ``invApp.alerts.EmailBackend``: one email per owner per batch.
+- ``invApp.alerts.WebhookBackend``: POSTs the batch as JSON to
+  INVENTORY_ALERT_WEBHOOK_URL.
+
+Delivery is at least once: a batch that fails in any backend is retried
+(with back-off) in all of them, up to INVENTORY_ALERT_MAX_ATTEMPTS times.
+After that the alerts are marked failed (see the StockAlert admin, which
+can send them again).
+"""
+import json
+import logging
+import urllib.request
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .jobs import enqueue
+from .models import StockAlert
+
+
+logger = logging.getLogger('inventory.alerts')
+
+DEFAULT_BATCH_SIZE = 100
+
+# a claimed batch is hidden from other workers for this long
+CLAIM_SECONDS = 300
+# first retry after this many seconds, doubling per attempt
+RETRY_SECONDS = 30
+
+
+def crossed(old_level, new_level):
+    """
+    The StockAlert kind raised by a product going from ``old_level`` to
+    ``new_level`` (both (quantity, reorder_level), None when the product is
+    being created or deleted), or None if no threshold was crossed.
+    """
+    if old_level is None or new_level is None:
+        return None
+    (old_quantity, old_reorder), (new_quantity, new_reorder) = old_level, new_level
+    if new_quantity == 0:
+        return StockAlert.OUT_OF_STOCK if old_quantity > 0 else None
+    if new_quantity <= new_reorder and old_quantity > old_reorder:
+        return StockAlert.LOW_STOCK
+    return None
+
+
+def raise_alerts(owner_id, changes):
+    """
+    Write one StockAlert per threshold crossed in ``changes``, an iterable of
+    (product_id, old_level, new_level). Costs no query when nothing crossed.
+    """
+    alerts = []
+    for product_id, old_level, new_level in changes:
+        kind = crossed(old_level, new_level)
+        if kind:
+            alerts.append(StockAlert(
+                owner_id=owner_id,
+                product_id=product_id,
+                kind=kind,
+                quantity=new_level[0],
+                reorder_level=new_level[1],
+            ))
+    if alerts:
+        StockAlert.objects.bulk_create(alerts)
+        # one waiting job drains everything raised before it runs
+        enqueue('deliver_alerts', unique=True)
+    return alerts
+
+
+class LoggingBackend:
+
+    def send(self, alerts):
+        for alert in alerts:
+            logger.warning(
+                '%s: %s (%s) at %d, reorder level %d',
+                alert.get_kind_display(), alert.product.name, alert.product.sku,
+                alert.quantity, alert.reorder_level,
+            )
+
+
+class EmailBackend:
+    """One summary email per owner with an address; owners without one are skipped."""
+
+    def send(self, alerts):
+        by_owner = defaultdict(list)
+        for alert in alerts:
+            if alert.owner.email:
+                by_owner[alert.owner].append(alert)
+
+        messages = []
+        for owner, owned in by_owner.items():
+            lines = [
+                f'- {a.get_kind_display()}: {a.product.name} (SKU {a.product.sku}), '
+                f'{a.quantity} left, reorder level {a.reorder_level}'
+                for a in owned
+            ]
+            messages.append((
+                f'{len(owned)} stock alert(s)',
+                'These products need restocking:\n\n' + '\n'.join(lines),
+                None,
+                [owner.email],
+            ))
+        send_mass_mail(messages, fail_silently=False)
+
+
+class WebhookBackend:
+
+    def __init__(self, url=None, timeout=None):
+        self.url = url or settings.INVENTORY_ALERT_WEBHOOK_URL
+        self.timeout = timeout or getattr(settings, 'INVENTORY_ALERT_WEBHOOK_TIMEOUT', 5)
+
+    @staticmethod
+    def payload(alerts):
+        return {'alerts': [
+            {
+                'id': a.pk,
+                'kind': a.kind,
+                'owner': a.owner.get_username(),
+                'product_id': a.product_id,
+                'sku': a.product.sku,
+                'name': a.product.name,
+                'quantity': a.quantity,
+                'reorder_level': a.reorder_level,
+                'created_at': a.created_at.isoformat(),
+            }
+            for a in alerts
+        ]}
+
+    def send(self, alerts):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(self.payload(alerts)).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        # urlopen raises for non-2xx responses, which fails (and retries) the batch
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def get_backends():
+    paths = getattr(settings, 'INVENTORY_ALERT_BACKENDS', ['invApp.alerts.LoggingBackend'])
+    return [import_string(path)() for path in paths]
+
+
+def max_attempts():
+    return getattr(settings, 'INVENTORY_ALERT_MAX_ATTEMPTS', 5)
+
+
+def claim(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Take up to ``batch_size`` due alerts, oldest first, and hide them from
+    other workers for CLAIM_SECONDS. The claim is a short transaction of its
+    own, so no lock is held while the backends talk to the network.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # claimed for the last time by a worker that never reported back
+        StockAlert.objects.pending().filter(next_attempt_at__lte=now, attempts__gte=max_attempts()).update(
+            status=StockAlert.FAILED,
+        )
+        due = StockAlert.objects.pending().filter(next_attempt_at__lte=now).order_by('next_attempt_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        StockAlert.objects.filter(pk__in=ids).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS),
+            attempts=F('attempts') + 1,
+        )
+    return list(StockAlert.objects.filter(pk__in=ids).select_related('owner', 'product').order_by('pk'))
+
+
+def deliver_pending(batch_size=DEFAULT_BATCH_SIZE, backends=None):
+    """Claim one batch and hand it to every backend. Returns (delivered, failed)."""
+    alerts = claim(batch_size)
+    if not alerts:
+        return 0, 0
+
+    ids = [a.pk for a in alerts]
+    try:
+        for backend in get_backends() if backends is None else backends:
+            backend.send(alerts)
+    except Exception as e:
+        logger.exception('Delivering %d alert(s) failed', len(alerts))
+        attempts = max(a.attempts for a in alerts)
+        StockAlert.objects.filter(pk__in=ids).update(
+            last_error=f'{type(e).__name__}: {e}'[:1000],
+            next_attempt_at=timezone.now() + timedelta(seconds=RETRY_SECONDS * 2 ** attempts),
+        )
+        StockAlert.objects.filter(pk__in=ids, attempts__gte=max_attempts()).update(status=StockAlert.FAILED)
+        return 0, len(alerts)
+
+    StockAlert.objects.filter(pk__in=ids).update(
+        status=StockAlert.DELIVERED, delivered_at=timezone.now(), last_error='',
+    )
+    return len(alerts), 0
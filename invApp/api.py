@@ -0,0 +1,311 @@
+"""
+JSON API for POS terminals and scanners.
+
+Every read response carries a strong ETag and Last-Modified derived from the
+owner's InventoryStats version, which changes whenever any of their products
+do. A client that sends If-None-Match / If-Modified-Since gets a 304 after a
+single primary-key read -- the products are neither queried nor serialized.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe, require_POST
+
+from .forms import ProductFilterForm, StockHistoryForm, StockMovementForm
+from .models import Product, InventoryStats, Job, Supplier
+from .history import series
+from .pagination import akeyset_paginate, InvalidCursor
+from .stock import apply_movements, InsufficientStock, UnknownProduct
+
+
+API_FIELDS = ('Product_id', 'name', 'sku', 'price', 'quantity', 'supplier__name')
+
+# most movements accepted in one batch request
+MAX_MOVEMENTS_PER_BATCH = 1000
+
+# most names the supplier autocomplete returns
+SUPPLIER_SUGGESTIONS = 10
+
+
+def api_login_required(view_func):
+    """Like login_required, but answers 401 JSON instead of redirecting to a login page."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped(request, *args, **kwargs):
+            # pinned on request.user so nothing downstream loads it synchronously
+            request.user = await request.auser()
+            if not request.user.is_authenticated:
+                return JsonResponse({'detail': 'Authentication required.'}, status=401)
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped
+
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication required.'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return _wrapped
+
+
+def _inventory_stats(request):
+    """The owner's stats row, read at most once per request."""
+    if not hasattr(request, '_inventory_stats'):
+        if InventoryStats.enabled():
+            request._inventory_stats = InventoryStats.get_or_rebuild(request.user.pk)
+        else:
+            request._inventory_stats = None
+    return request._inventory_stats
+
+
+async def _ainventory_stats(request):
+    if not hasattr(request, '_inventory_stats'):
+        if InventoryStats.enabled():
+            request._inventory_stats = await InventoryStats.aget_or_rebuild(request.user.pk)
+        else:
+            request._inventory_stats = None
+    return request._inventory_stats
+
+
+def inventory_etag(request, *args, **kwargs):
+    stats = _inventory_stats(request)
+    if stats is None:
+        return None
+    # the same version serves many URLs (filters, cursors, pks) -- fold the URL in
+    digest = hashlib.blake2b(request.get_full_path().encode(), digest_size=8).hexdigest()
+    return f'"{stats.owner_id}-{stats.version}-{digest}"'
+
+
+def inventory_last_modified(request, *args, **kwargs):
+    stats = _inventory_stats(request)
+    return stats.updated_at if stats else None
+
+
+def inventory_condition(view_func):
+    conditional = condition(etag_func=inventory_etag, last_modified_func=inventory_last_modified)(view_func)
+    if not iscoroutinefunction(view_func):
+        return conditional
+
+    # condition() calls the ETag/Last-Modified functions synchronously, even
+    # for async views -- load the stats row first so they don't hit the DB
+    @wraps(view_func)
+    async def _wrapped(request, *args, **kwargs):
+        await _ainventory_stats(request)
+        return await conditional(request, *args, **kwargs)
+    return _wrapped
+
+
+def serialize_product(product):
+    return {
+        'id': product.Product_id,
+        'name': product.name,
+        'sku': product.sku,
+        'price': str(product.price),
+        'quantity': product.quantity,
+        'supplier': product.supplier.name,
+    }
+
+
+@api_login_required
+@require_safe
+@inventory_condition
+async def product_list_api(request):
+    """
+    GET /api/products/?after=<cursor>&sort=name&per_page=50&supplier=...
+
+    Same filters, sort and keyset pagination as the HTML product list.
+    """
+    filter_form = ProductFilterForm(request.GET)
+    products = filter_form.filter(Product.objects.filter(owner=request.user)).select_related('supplier').only(*API_FIELDS)
+    params = filter_form.cleaned_data if filter_form.is_valid() else {}
+
+    try:
+        page = await akeyset_paginate(
+            products,
+            sort=params.get('sort'),
+            after=request.GET.get('after') or None,
+            before=request.GET.get('before') or None,
+            page_size=params.get('per_page'),
+        )
+    except InvalidCursor:
+        return JsonResponse({'detail': 'Invalid cursor.'}, status=400)
+
+    return JsonResponse({
+        'results': [serialize_product(p) for p in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+async def _product_response(request, **lookup):
+    try:
+        product = await Product.objects.select_related('supplier').only(*API_FIELDS).aget(owner=request.user, **lookup)
+    except Product.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    return JsonResponse(serialize_product(product))
+
+
+@api_login_required
+@require_safe
+@inventory_condition
+async def product_detail_api(request, pk):
+    return await _product_response(request, pk=pk)
+
+
+@api_login_required
+@require_safe
+@inventory_condition
+async def product_sku_api(request, sku):
+    # (owner, sku) is unique -- this is a single index lookup
+    return await _product_response(request, sku=sku)
+
+
+@api_login_required
+@require_safe
+def product_history_api(request, sku):
+    """
+    GET /api/products/sku/<sku>/history/?start=2026-01-01&end=2026-03-31
+
+    The product's snapshotted quantity and price over the range (the last 30
+    days by default). Only the months in the range are read.
+    """
+    form = StockHistoryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'detail': 'Invalid range.', 'errors': form.errors.get_json_data()}, status=400)
+    try:
+        product = Product.objects.only('pk', 'sku').get(owner=request.user, sku=sku)
+    except Product.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    start, end = form.cleaned_data['start'], form.cleaned_data['end']
+    return JsonResponse({
+        'sku': product.sku,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'points': [
+            {'at': at.isoformat(), 'quantity': quantity, 'price': str(price)}
+            for at, quantity, price in series(product, start, end)
+        ],
+    })
+
+
+@api_login_required
+@require_safe
+def supplier_autocomplete_api(request):
+    """
+    GET /api/suppliers/?q=acm
+
+    Up to SUPPLIER_SUGGESTIONS of the owner's supplier names starting with
+    ``q`` (case-insensitive), read off the (owner, key) index as a range scan.
+    """
+    suppliers = Supplier.objects.filter(owner=request.user).prefixed(request.GET.get('q', ''))
+    return JsonResponse({
+        'results': list(suppliers.order_by('key').values_list('name', flat=True)[:SUPPLIER_SUGGESTIONS]),
+    })
+
+
+def _resolve_movements(owner, entries):
+    """
+    Validate raw movement dicts and map their SKUs to product ids (one query).
+    Returns (movements, errors).
+    """
+    movements, errors = [], []
+    skus = {e.get('sku') for e in entries if isinstance(e, dict) and e.get('sku')}
+    ids_by_sku = dict(Product.objects.filter(owner=owner, sku__in=skus).values_list('sku', 'pk'))
+
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append({'index': index, 'errors': {'__all__': ['Expected an object.']}})
+            continue
+
+        form = StockMovementForm(entry)
+        entry_errors = {} if form.is_valid() else form.errors.get_json_data()
+
+        product_id = entry.get('product_id')
+        if product_id is None:
+            product_id = ids_by_sku.get(entry.get('sku'))
+        elif not isinstance(product_id, int) or isinstance(product_id, bool):
+            product_id = None
+        if product_id is None:
+            entry_errors['product'] = [{'message': 'Unknown product or SKU.', 'code': 'unknown'}]
+
+        if entry_errors:
+            errors.append({'index': index, 'errors': entry_errors})
+        else:
+            movements.append({'product_id': product_id, **form.cleaned_data})
+
+    return movements, errors
+
+
+@api_login_required
+@require_POST
+def stock_movements_api(request):
+    """
+    POST /api/stock/movements/
+    {"movements": [{"sku": "SKU1", "kind": "sale", "delta": -2, "note": "..."}, ...]}
+
+    Applies every movement in a single transaction -- all or nothing.
+    """
+    try:
+        entries = json.loads(request.body)['movements']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'detail': 'Expected JSON like {"movements": [...]}.'}, status=400)
+
+    if not isinstance(entries, list) or not entries:
+        return JsonResponse({'detail': '"movements" must be a non-empty list.'}, status=400)
+    if len(entries) > MAX_MOVEMENTS_PER_BATCH:
+        return JsonResponse(
+            {'detail': f'At most {MAX_MOVEMENTS_PER_BATCH} movements per request.'}, status=400
+        )
+
+    movements, errors = _resolve_movements(request.user, entries)
+    if errors:
+        return JsonResponse({'detail': 'Invalid movements.', 'errors': errors}, status=400)
+
+    try:
+        ledger = apply_movements(request.user, movements)
+    except InsufficientStock as e:
+        return JsonResponse(
+            {'detail': str(e), 'product_id': e.product_id, 'delta': e.delta}, status=409
+        )
+    except UnknownProduct as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+
+    return JsonResponse({
+        'applied': len(ledger),
+        'movements': [
+            {
+                'id': m.pk,
+                'product_id': m.product_id,
+                'kind': m.kind,
+                'delta': m.delta,
+                'quantity_after': m.quantity_after,
+            }
+            for m in ledger
+        ],
+    })
+
+
+@api_login_required
+@require_safe
+def job_detail_api(request, pk):
+    """GET /api/jobs/<pk>/ -- poll a background job's progress and result."""
+    try:
+        job = Job.objects.get(pk=pk, owner=request.user)
+    except Job.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    return JsonResponse({
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'progress': job.progress,
+        'progress_message': job.progress_message,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.error_summary if job.status == Job.FAILED else '',
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    })
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class InvappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'invApp'
+
+    def ready(self):
+        from . import signals  # noqa: F401 -- connects the Product receivers
+        from . import tasks  # noqa: F401 -- registers the background tasks
+        from inventory.metrics import register_collector
+        from .cache import prometheus_lines
+
+        register_collector(prometheus_lines)
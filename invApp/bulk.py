@@ -0,0 +1,184 @@
+"""
+Bulk actions on many of an owner's products at once -- the product list's
+checkboxes and ProductAdmin's actions.
+
+Each action is ONE set-based ``UPDATE`` (or ``DELETE``) scoped to the
+owner, in a transaction with the bookkeeping the Product signals would do
+for a save -- QuerySet.update() / delete() skip them. The selected rows are
+read (locked) before and after the write, and the differences go to the
+same incremental paths invApp.stock uses: the InventoryStats counters, the
+valuation rollups, stock alerts and, for quantity changes, adjustment lines
+in the ledger. Every updated row's version is bumped, so edit forms opened
+before the action conflict instead of undoing it.
+"""
+from decimal import Decimal
+
+from django.db import models, router, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Round
+
+from .models import Product, StockMovement, StockHistory, StockAlert, InventoryStats, Supplier
+from .search import get_backend as get_search_backend, indexable
+from .cache import invalidate_owner
+from .alerts import raise_alerts
+from .stock import InsufficientStock
+from . import reports
+
+
+SET_PRICE = 'set_price'
+ADJUST_PRICE = 'adjust_price'
+SET_SUPPLIER = 'set_supplier'
+SET_REORDER_LEVEL = 'set_reorder_level'
+ADJUST_QUANTITY = 'adjust_quantity'
+DELETE = 'delete'
+
+ACTION_CHOICES = [
+    (SET_PRICE, 'Set price'),
+    (ADJUST_PRICE, 'Adjust price by %'),
+    (SET_SUPPLIER, 'Set supplier'),
+    (SET_REORDER_LEVEL, 'Set reorder level'),
+    (ADJUST_QUANTITY, 'Adjust quantity by'),
+    (DELETE, 'Delete'),
+]
+
+# most products one action may touch
+MAX_SELECTION = 1000
+
+_price = Product._meta.get_field('price')
+# the largest price the column holds (99999999.99); Postgres refuses more
+MAX_PRICE = Decimal(10) ** (_price.max_digits - _price.decimal_places) - Decimal(10) ** -_price.decimal_places
+
+# the rows deleted along with a product: its ledger, history and alerts
+CASCADED_MODELS = (StockMovement, StockHistory, StockAlert)
+
+_STATE_FIELDS = ('pk', 'quantity', 'reorder_level', 'price', 'supplier_id')
+
+
+class PriceOutOfRange(Exception):
+
+    def __init__(self, product_id, percent):
+        self.product_id = product_id
+        self.percent = percent
+        super().__init__(f"Adjusting product {product_id} by {percent}% takes its price past {MAX_PRICE}.")
+
+
+def _states(products):
+    """{pk: (quantity, reorder_level, price, supplier_id)} of ``products``."""
+    return {pk: state for pk, *state in products.values_list(*_STATE_FIELDS)}
+
+
+def _changes(action, value):
+    """The UPDATE for one action, as QuerySet.update() keyword arguments."""
+    if action == SET_PRICE:
+        return {'price': value}
+    if action == ADJUST_PRICE:
+        return {'price': Round(F('price') * Value((100 + value) / Decimal(100)), 2)}
+    if action == SET_SUPPLIER:
+        return {'supplier_id': value}
+    if action == SET_REORDER_LEVEL:
+        return {'reorder_level': value}
+    if action == ADJUST_QUANTITY:
+        return {'quantity': F('quantity') + value}
+    raise ValueError(f"Unknown bulk action {action!r}.")
+
+
+def apply_action(owner, product_ids, action, value=None):
+    """
+    Apply ``action`` (one of ACTION_CHOICES) with ``value`` -- the price,
+    percentage, supplier name, reorder level or quantity delta -- to those
+    of ``product_ids`` that belong to ``owner``. Returns how many products
+    it changed. All or nothing: an adjustment that would take any product
+    below zero raises InsufficientStock, and one that would price any above
+    MAX_PRICE raises PriceOutOfRange; either changes none.
+    """
+    products = Product.objects.filter(owner=owner, pk__in=list(product_ids)[:MAX_SELECTION])
+    if action == DELETE:
+        return _delete(owner, products)
+
+    with transaction.atomic():
+        before = _states(products.select_for_update())
+        if not before:
+            return 0
+        if action == SET_SUPPLIER:
+            value = Supplier.objects.named(owner.pk, value).pk
+
+        selected = Product.objects.filter(pk__in=before)
+        changes = _changes(action, value)
+        if action == ADJUST_QUANTITY and value < 0:
+            selected = selected.filter(quantity__gte=-value)
+        if action == ADJUST_PRICE:
+            selected = selected.alias(new_price=changes['price']).filter(new_price__lte=MAX_PRICE)
+        updated = selected.update(**changes, version=F('version') + 1)
+        if updated < len(before):
+            if action == ADJUST_PRICE:
+                factor = (100 + value) / Decimal(100)
+                raise PriceOutOfRange(next(pk for pk, state in before.items() if state[2] * factor > MAX_PRICE), value)
+            product_id = next(pk for pk, state in before.items() if state[0] < -value)
+            raise InsufficientStock(product_id, value)
+
+        after = _states(Product.objects.filter(pk__in=before))
+        pairs = [(pk, before[pk], after[pk]) for pk in before]
+        levels = [(pk, old[:2], new[:2]) for pk, old, new in pairs]
+
+        if action == ADJUST_QUANTITY:
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    owner=owner, product_id=pk, kind=StockMovement.ADJUSTMENT,
+                    delta=value, quantity_after=new[0], note='Bulk adjustment',
+                )
+                for pk, _, new in pairs
+            ])
+        if InventoryStats.enabled():
+            if action in (ADJUST_QUANTITY, SET_REORDER_LEVEL):
+                InventoryStats.apply_changes(owner.pk, [(old, new) for _, old, new in levels])
+            else:
+                # the counters stay, but the API's ETags must change
+                InventoryStats.touch(owner.pk)
+        if reports.enabled():
+            reports.apply_changes(owner.pk, [
+                ((old[3], old[2], old[0]), (new[3], new[2], new[0])) for _, old, new in pairs
+            ])
+        raise_alerts(owner.pk, levels)
+        if action == SET_SUPPLIER:
+            get_search_backend().index(indexable(Product.objects.filter(pk__in=before)))
+        invalidate_owner(owner.pk)
+    return updated
+
+
+def _cascaded_relations():
+    """
+    The relations a product's delete cascades along, all to CASCADED_MODELS.
+    Deleting their rows here stands in for the Collector, so any other kind
+    of reference to Product (PROTECT, SET_NULL, a model with signals...) is
+    refused rather than silently deleted.
+    """
+    relations = Product._meta.related_objects
+    for relation in relations:
+        if relation.related_model not in CASCADED_MODELS or relation.on_delete is not models.CASCADE:
+            raise ValueError(
+                f"Bulk delete doesn't handle {relation.related_model.__name__}.{relation.field.name} "
+                f"({relation.on_delete.__name__}); add it to bulk.CASCADED_MODELS or delete one by one."
+            )
+    return relations
+
+
+def _delete(owner, products):
+    with transaction.atomic():
+        before = _states(products.select_for_update())
+        if not before:
+            return 0
+        # a plain DELETE: QuerySet.delete() would load every product and send
+        # post_delete for each. The rows that cascade go first, set-based too
+        # (none of them has delete signals).
+        for relation in _cascaded_relations():
+            relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': list(before)}).delete()
+        selected = Product.objects.filter(pk__in=before)
+        deleted = selected._raw_delete(router.db_for_write(Product))
+
+        if InventoryStats.enabled():
+            InventoryStats.apply_changes(owner.pk, [(state[:2], None) for state in before.values()])
+        if reports.enabled():
+            reports.apply_changes(owner.pk, [((state[3], state[2], state[0]), None) for state in before.values()])
+        get_search_backend().remove(list(before))
+        invalidate_owner(owner.pk)
+    return deleted
@@ -0,0 +1,142 @@
+"""
+Per-owner fragment cache for the dashboard and product list.
+
+Fragment keys embed a per-owner version number that lives in the cache
+itself, so checking for a cached fragment never touches the database. Any
+change to an owner's products bumps the version (after the transaction
+commits), which orphans every fragment rendered before it; stale entries
+simply age out of the cache.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+
+def _cache():
+    return caches[getattr(settings, 'INVENTORY_CACHE_ALIAS', 'default')]
+
+
+def fragment_timeout():
+    return getattr(settings, 'INVENTORY_FRAGMENT_CACHE_TIMEOUT', 300)
+
+
+class CacheCounters:
+    """Hit/miss counters for this process, per fragment name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = {}
+            self.misses = {}
+
+    def record(self, name, hit):
+        with self._lock:
+            counter = self.hits if hit else self.misses
+            counter[name] = counter.get(name, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            names = sorted(set(self.hits) | set(self.misses))
+            return {
+                name: {'hits': self.hits.get(name, 0), 'misses': self.misses.get(name, 0)}
+                for name in names
+            }
+
+
+counters = CacheCounters()
+
+
+def prometheus_lines():
+    """The hit/miss counters in Prometheus text format, for /metrics."""
+    lines = []
+    for kind in ('hits', 'misses'):
+        name = f'inventory_fragment_cache_{kind}_total'
+        lines += [f'# HELP {name} Fragment cache {kind}.', f'# TYPE {name} counter']
+        for fragment, values in counters.snapshot().items():
+            lines.append(f'{name}{{fragment="{fragment}"}} {values[kind]}')
+    return lines
+
+
+def _version_key(owner_id):
+    return f'inv:owner:{owner_id}:version'
+
+
+def get_owner_version(owner_id):
+    cache = _cache()
+    version = cache.get(_version_key(owner_id))
+    if version is None:
+        # start from the clock so an evicted version never comes back to an old value
+        version = time.time_ns()
+        cache.add(_version_key(owner_id), version, timeout=None)
+        version = cache.get(_version_key(owner_id), version)
+    return version
+
+
+async def aget_owner_version(owner_id):
+    cache = _cache()
+    version = await cache.aget(_version_key(owner_id))
+    if version is None:
+        version = time.time_ns()
+        await cache.aadd(_version_key(owner_id), version, timeout=None)
+        version = await cache.aget(_version_key(owner_id), version)
+    return version
+
+
+def bump_owner_version(owner_id):
+    cache = _cache()
+    try:
+        cache.incr(_version_key(owner_id))
+    except ValueError:  # not cached (yet, or evicted)
+        cache.set(_version_key(owner_id), time.time_ns(), timeout=None)
+
+
+def invalidate_owner(owner_id):
+    """Drop every cached fragment of ``owner_id`` once the current transaction commits."""
+    transaction.on_commit(lambda: bump_owner_version(owner_id))
+
+
+def _fragment_key(owner_id, version, name, parts):
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'inv:frag:{owner_id}:{version}:{name}:{digest}'
+
+
+def fragment_key(owner_id, name, *parts):
+    return _fragment_key(owner_id, get_owner_version(owner_id), name, parts)
+
+
+def cached_fragment(owner_id, name, render, *parts):
+    """
+    Return the cached HTML for fragment ``name`` of ``owner_id`` (varied by
+    ``parts``), calling ``render()`` to build and store it on a miss.
+    """
+    cache = _cache()
+    key = fragment_key(owner_id, name, *parts)
+    html = cache.get(key)
+    counters.record(name, html is not None)
+
+    if html is None:
+        html = render()
+        cache.set(key, html, timeout=fragment_timeout())
+    return mark_safe(html)
+
+
+async def acached_fragment(owner_id, name, render, *parts):
+    """Async cached_fragment(); ``render`` is a coroutine function."""
+    cache = _cache()
+    key = _fragment_key(owner_id, await aget_owner_version(owner_id), name, parts)
+    html = await cache.aget(key)
+    counters.record(name, html is not None)
+
+    if html is None:
+        html = await render()
+        await cache.aset(key, html, timeout=fragment_timeout())
+    return mark_safe(html)
+
@@ -0,0 +1,92 @@
+"""
+Streaming product export.
+
+Rows are pulled from the database in chunks with values_list().iterator() and
+written out one line at a time, so neither model instances nor the whole file
+are ever held in memory.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .forms import ProductFilterForm
+from .importers import IMPORT_FIELDS
+from .models import Product
+from .pagination import parse_sort, sort_lookup
+
+
+# the same columns the importer reads, plus the id -- an export can be re-imported
+EXPORT_FIELDS = ['Product_id', *IMPORT_FIELDS]
+# what each column is read from; the supplier is exported by name
+EXPORT_VALUES = [f'{field}__name' if field == 'supplier' else field for field in EXPORT_FIELDS]
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() just hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(owner, params):
+    """``owner``'s products filtered by ``params`` (list view query string), in list order."""
+    filter_form = ProductFilterForm(params)
+    products = filter_form.filter(Product.objects.filter(owner=owner))
+
+    # same order as the list view; Product_id keeps it stable
+    sort = filter_form.cleaned_data.get('sort') if filter_form.is_valid() else None
+    field, descending = parse_sort(sort or 'Product_id')
+    prefix = '-' if descending else ''
+    return products.order_by(f'{prefix}{sort_lookup(field)}', f'{prefix}Product_id')
+
+
+def export_filename(export_format):
+    return f"products-{timezone.now():%Y%m%d}.{export_format}"
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    return queryset.values_list(*EXPORT_VALUES).iterator(chunk_size=chunk_size)
+
+
+def chunked_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    export_rows() for callers that write to the database while exporting
+    (background jobs reporting progress). The ordered ids are read up front
+    and each chunk is its own short query, so no cursor stays open between
+    chunks -- on SQLite a write issued under an open cursor would hold the
+    write lock until the whole export finished.
+    """
+    ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows = {row[0]: row for row in Product.objects.filter(pk__in=chunk).values_list(*EXPORT_VALUES)}
+        yield from (rows[pk] for pk in chunk if pk in rows)
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def stream_export(queryset, export_format, chunk_size=EXPORT_CHUNK_SIZE, rows=None):
+    """Export lines for ``queryset`` (or for ready-made ``rows``) in ``export_format``."""
+    if rows is None:
+        rows = export_rows(queryset, chunk_size)
+    if export_format == 'ndjson':
+        return stream_ndjson(rows)
+    return stream_csv(rows)
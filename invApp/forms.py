@@ -1,18 +1,56 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django import forms
-from .models import Product
+from django.db import router, transaction
+from django.urls import reverse_lazy
+from django.utils import timezone
+
+from .models import EditConflict, Product, StockMovement, Supplier
+from . import bulk
+
+class SupplierInput(forms.TextInput):
+    """Text input suggesting the owner's suppliers as you type (see product_form.html)."""
+
+    def __init__(self, attrs=None):
+        super().__init__({
+            'list': 'supplier-suggestions',
+            'autocomplete': 'off',
+            'data-autocomplete-url': reverse_lazy('supplier_autocomplete_api'),
+            **(attrs or {}),
+        })
+
 
 class ProductForm(forms.ModelForm):
+    # typed as a name and resolved to (or created as) one of the owner's
+    # Supplier rows on save, so "acme" and "ACME" stay one supplier
+    supplier = forms.CharField(
+        max_length=100,
+        label='Product Supplier',
+        widget=SupplierInput(attrs={'placeholder': 'e.g. Nike', 'class': 'form-control'}),
+    )
+    # optional: left blank, a new product gets the default level and an
+    # existing one keeps its own
+    reorder_level = forms.IntegerField(
+        required=False,
+        min_value=0,
+        label='Reorder Level',
+        widget=forms.NumberInput(attrs={'placeholder': 'e.g. 10', 'class': 'form-control'}),
+    )
+
+    field_order = ['name', 'sku', 'price', 'quantity', 'supplier', 'reorder_level']
+
     class Meta: # this describes the form attributes
         model = Product
         
-        fields = ['name', 'sku', 'price', 'quantity', 'supplier']
+        # version: posted back so the save only applies to the product as it was shown
+        fields = ['name', 'sku', 'price', 'quantity', 'reorder_level', 'version']
         labels = {
             'product_id': 'Product ID',
             'name': 'Product Name',
             'sku': 'SKU',
             'price': 'Selling Price (₦)',
             'quantity': 'Quantity',
-            'supplier': 'Product Supplier',
         }
         # widget used to style the form -- input attrributes
         widgets = {
@@ -21,6 +59,201 @@ class ProductForm(forms.ModelForm):
             'sku': forms.TextInput(attrs={'placeholder': 'e.g. SKU123', 'class': 'form-control'}),
             'price': forms.NumberInput(attrs={'placeholder': 'e.g. 200.40', 'class': 'form-control'}),
             'quantity': forms.NumberInput(attrs={'placeholder': 'e.g. 10', 'class': 'form-control'}),
-            'supplier': forms.TextInput(attrs={'placeholder': 'e.g. Nike', 'class': 'form-control'}),
-        } 
-        
\ No newline at end of file
+            'version': forms.HiddenInput,
+        }
+
+    def __init__(self, *args, owner=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owner_id = owner.pk if owner is not None else self.instance.owner_id
+        if self.instance._state.adding:
+            del self.fields['version']
+        if self.instance.supplier_id:
+            self.initial.setdefault('supplier', self.instance.supplier.name)
+
+    def clean_reorder_level(self):
+        level = self.cleaned_data.get('reorder_level')
+        return self.instance.reorder_level if level is None else level
+
+    def save(self, commit=True):
+        name = self.cleaned_data['supplier']
+        current = self.instance.supplier if self.instance.supplier_id else None
+        # one transaction: a new supplier is only kept if the product saves
+        # (an EditConflict would otherwise leave it behind, unused)
+        with transaction.atomic(using=router.db_for_write(Product, instance=self.instance)):
+            if current is None or current.key != Supplier.normalize(name):
+                self.instance.supplier = Supplier.objects.named(self.owner_id, name)
+            try:
+                return super().save(commit)
+            except EditConflict:
+                self.instance.supplier = current
+                raise
+
+
+class ProductFilterForm(forms.Form):
+    """
+    Query-string filters for the product list (and anything else that lists
+    a user's products). Every filter narrows an index scan on (owner, ...).
+    """
+    SORT_CHOICES = [
+        ('-Product_id', 'Newest'),
+        ('Product_id', 'Oldest'),
+        ('name', 'Name (A-Z)'),
+        ('-name', 'Name (Z-A)'),
+        ('sku', 'SKU'),
+        ('price', 'Price (low-high)'),
+        ('-price', 'Price (high-low)'),
+        ('quantity', 'Quantity (low-high)'),
+        ('-quantity', 'Quantity (high-low)'),
+        ('supplier', 'Supplier (A-Z)'),
+        ('-supplier', 'Supplier (Z-A)'),
+    ]
+
+    name = forms.CharField(required=False, max_length=100)
+    sku = forms.CharField(required=False, max_length=20, label='SKU')
+    supplier = forms.CharField(required=False, max_length=100)
+    min_quantity = forms.IntegerField(required=False, min_value=0, label='Min qty')
+    max_quantity = forms.IntegerField(required=False, min_value=0, label='Max qty')
+    sort = forms.ChoiceField(required=False, choices=SORT_CHOICES)
+    per_page = forms.IntegerField(required=False, min_value=1)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        low = cleaned_data.get('min_quantity')
+        high = cleaned_data.get('max_quantity')
+
+        if low is not None and high is not None and low > high:
+            raise forms.ValidationError("Min qty cannot be greater than max qty.")
+
+        return cleaned_data
+
+    def filter(self, queryset):
+        """
+        Apply the valid filters to ``queryset``. Invalid input is ignored so
+        a bad query string never hides the whole list.
+        """
+        data = self.cleaned_data if self.is_valid() else {}
+
+        if data.get('name'):
+            queryset = queryset.filter(name__icontains=data['name'])
+        if data.get('sku'):
+            queryset = queryset.filter(sku__istartswith=data['sku'])
+        if data.get('supplier'):
+            # (owner, key) unique index, then the (owner, supplier, Product_id) one
+            queryset = queryset.filter(supplier__key=Supplier.normalize(data['supplier']))
+        if data.get('min_quantity') is not None:
+            queryset = queryset.filter(quantity__gte=data['min_quantity'])
+        if data.get('max_quantity') is not None:
+            queryset = queryset.filter(quantity__lte=data['max_quantity'])
+
+        return queryset
+
+
+class ProductImportForm(forms.Form):
+    file = forms.FileField(
+        label='Catalog file',
+        help_text='CSV or XLSX with columns: name, sku, price, quantity, supplier. '
+                  'Existing SKUs are updated.',
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx'}),
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return upload
+
+
+class BulkActionForm(forms.Form):
+    """One bulk action (see invApp.bulk) on the products ticked in the list."""
+
+    # how ``value`` is read for each action; delete takes none
+    VALUE_FIELDS = {
+        bulk.SET_PRICE: forms.DecimalField(max_digits=10, decimal_places=2, min_value=0),
+        bulk.ADJUST_PRICE: forms.DecimalField(
+            max_digits=6, decimal_places=2, min_value=Decimal('-99.99'), max_value=1000,
+        ),
+        bulk.SET_SUPPLIER: forms.CharField(max_length=100),
+        bulk.SET_REORDER_LEVEL: forms.IntegerField(min_value=0),
+        bulk.ADJUST_QUANTITY: forms.IntegerField(),
+    }
+
+    action = forms.ChoiceField(choices=bulk.ACTION_CHOICES)
+    value = forms.CharField(required=False, max_length=100)
+    products = forms.Field(widget=forms.MultipleHiddenInput, error_messages={'required': 'Select some products first.'})
+
+    def clean_products(self):
+        try:
+            ids = {int(pk) for pk in self.cleaned_data['products']}
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid selection.")
+        if len(ids) > bulk.MAX_SELECTION:
+            raise forms.ValidationError(f"Select at most {bulk.MAX_SELECTION} products at a time.")
+        return sorted(ids)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        field = self.VALUE_FIELDS.get(cleaned_data.get('action'))
+        if field is None:
+            cleaned_data['value'] = None
+            return cleaned_data
+        try:
+            cleaned_data['value'] = field.clean(cleaned_data.get('value', ''))
+        except forms.ValidationError as e:
+            self.add_error('value', e)
+        else:
+            if cleaned_data['action'] == bulk.ADJUST_QUANTITY and cleaned_data['value'] == 0:
+                self.add_error('value', "The change cannot be zero.")
+        return cleaned_data
+
+
+class StockMovementForm(forms.ModelForm):
+    class Meta:
+        model = StockMovement
+        fields = ['kind', 'delta', 'note']
+        labels = {
+            'kind': 'Movement',
+            'delta': 'Quantity change',
+            'note': 'Note',
+        }
+        help_texts = {
+            'delta': 'Positive for receipts, negative for sales, either for adjustments.',
+        }
+        widgets = {
+            'delta': forms.NumberInput(attrs={'placeholder': 'e.g. -3', 'class': 'form-control'}),
+            'note': forms.TextInput(attrs={'placeholder': 'e.g. Invoice 1042', 'class': 'form-control'}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        kind = cleaned_data.get('kind')
+        delta = cleaned_data.get('delta')
+
+        if delta == 0:
+            self.add_error('delta', "The change cannot be zero.")
+        elif kind == StockMovement.RECEIPT and delta is not None and delta < 0:
+            self.add_error('delta', "Receipts must add stock (use a positive number).")
+        elif kind == StockMovement.SALE and delta is not None and delta > 0:
+            self.add_error('delta', "Sales must remove stock (use a negative number).")
+
+        return cleaned_data
+
+
+class StockHistoryForm(forms.Form):
+    """Date range for a product's stock history; the last 30 days by default."""
+    DEFAULT_DAYS = 30
+
+    start = forms.DateTimeField(required=False)
+    end = forms.DateTimeField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        end = cleaned_data.get('end') or timezone.now()
+        start = cleaned_data.get('start') or end - timedelta(days=self.DEFAULT_DAYS)
+
+        if start > end:
+            raise forms.ValidationError("The start cannot be after the end.")
+
+        cleaned_data.update(start=start, end=end)
+        return cleaned_data
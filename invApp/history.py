@@ -0,0 +1,215 @@
+"""
+Stock history: periodic snapshots of every product's quantity and price.
+
+``take_snapshot()`` -- run every INVENTORY_SNAPSHOT_INTERVAL ('hour' or
+'day') by ``manage.py snapshot_inventory`` from cron, inline or as queued
+jobs -- records the current values in slot ``i`` of the product's
+StockHistory row for the month, where ``i`` is the hour or day of the
+month. Only changes are stored: ``changes`` is a zlib-compressed packed
+int64 array of (slot, quantity, price in cents) triples, one per slot where
+either value moved, and ``last_slot`` is the latest slot snapshotted. A
+product whose stock didn't move costs nothing but its share of one
+owner-wide ``UPDATE ... SET last_slot``.
+
+A slot's values are those of the latest change at or before it, so a
+snapshot that was never taken (the cron job didn't run) reads as unchanged.
+
+``series()`` reads a product's points over any range from the months it
+spans only (the (product, month) index), never the whole history.
+"""
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import chain
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product, StockHistory
+
+
+STEPS = {'hour': 3600, 'day': 86400}
+
+# products read and written per round trip
+CHUNK_SIZE = 1000
+
+
+def step():
+    """Seconds between snapshots, from INVENTORY_SNAPSHOT_INTERVAL."""
+    return STEPS[getattr(settings, 'INVENTORY_SNAPSHOT_INTERVAL', 'day')]
+
+
+def encode(changes):
+    """Pack [(slot, quantity, cents), ...] as zlib-compressed little-endian int64s."""
+    values = array('q', chain.from_iterable(changes))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return zlib.compress(values.tobytes())
+
+
+def decode(blob):
+    values = array('q')
+    values.frombytes(zlib.decompress(blob))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return list(zip(values[0::3], values[1::3], values[2::3]))
+
+
+def _cents(price):
+    return int(Decimal(price).scaleb(2))
+
+
+def _month_start(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def slot(moment, step):
+    """The (month, slot index) ``moment`` falls in."""
+    moment = moment.astimezone(dt_timezone.utc)
+    month = moment.date().replace(day=1)
+    return month, (moment - _month_start(month)) // timedelta(seconds=step)
+
+
+def _value_at(changes, index):
+    value = None
+    for changed, quantity, cents in changes:
+        if changed > index:
+            break
+        value = quantity, cents
+    return value
+
+
+def _record(changes, index, value, last_slot):
+    """``changes`` with ``value`` recorded at slot ``index``, in order and without repeats."""
+    points = {changed: (quantity, cents) for changed, quantity, cents in changes}
+    # writing into the past: the slots after it keep the value they had
+    if index < last_slot and index + 1 not in points:
+        following = _value_at(changes, index + 1)
+        if following is not None:
+            points[index + 1] = following
+    points[index] = value
+
+    recorded, previous = [], None
+    for changed in sorted(points):
+        if points[changed] != previous:
+            recorded.append((changed, *points[changed]))
+            previous = points[changed]
+    return recorded
+
+
+def take_snapshot(owner_id, at=None):
+    """
+    Record every product of the owner at ``at`` (default now); taking the
+    same slot again overwrites it. Returns the number of products. Costs a
+    few queries per CHUNK_SIZE products, however long the history.
+    """
+    interval = step()
+    month, index = slot(at or timezone.now(), interval)
+    now = timezone.now()
+
+    count, last_pk = 0, 0
+    while True:
+        rows = list(
+            Product.objects.filter(owner_id=owner_id, pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'quantity', 'price')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        count += len(rows)
+
+        existing = {
+            history.product_id: history
+            for history in StockHistory.objects.filter(
+                product_id__in=[pk for pk, _, _ in rows], month=month, step=interval,
+            ).defer('changes')
+        }
+        created, changed = [], []
+        for pk, quantity, price in rows:
+            history = existing.get(pk)
+            if history is None:
+                created.append(StockHistory(
+                    owner_id=owner_id, product_id=pk, month=month, step=interval,
+                    first_slot=index, last_slot=index, quantity=quantity, price=price,
+                    changes=encode([(index, quantity, _cents(price))]), updated_at=now,
+                ))
+            elif (history.quantity, history.price) != (quantity, price) or index < history.last_slot:
+                changed.append((history, (quantity, _cents(price))))
+
+        if changed or created:
+            with transaction.atomic():
+                _update(changed, index, now)
+                StockHistory.objects.bulk_create(created)
+        if len(rows) < CHUNK_SIZE:
+            break
+
+    # everything unchanged carries its last value forward to this slot
+    StockHistory.objects.filter(
+        owner_id=owner_id, month=month, step=interval, last_slot__lt=index,
+    ).update(last_slot=index, updated_at=now)
+    return count
+
+
+def _update(changed, index, now):
+    """Record ``[(history, (quantity, cents)), ...]`` at slot ``index``."""
+    if not changed:
+        return
+    blobs = dict(StockHistory.objects.filter(pk__in=[h.pk for h, _ in changed]).values_list('pk', 'changes'))
+    meta = StockHistory._meta
+    price_field = meta.get_field('price')
+    updated_at = meta.get_field('updated_at').get_db_prep_save(now, connection)
+
+    params = []
+    for history, value in changed:
+        changes = _record(decode(blobs[history.pk]), index, value, history.last_slot)
+        _, quantity, cents = changes[-1]
+        params.append((
+            encode(changes),
+            quantity,
+            price_field.get_db_prep_save(Decimal(cents).scaleb(-2), connection),
+            min(history.first_slot, index),
+            max(history.last_slot, index),
+            updated_at,
+            history.pk,
+        ))
+
+    # one prepared UPDATE run per row: bulk_update() would build a CASE
+    # expression over the whole chunk, which costs far more than the SQL
+    fields = ('changes', 'quantity', 'price', 'first_slot', 'last_slot', 'updated_at')
+    column = lambda name: connection.ops.quote_name(meta.get_field(name).column)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {connection.ops.quote_name(meta.db_table)} '
+            f'SET {", ".join(f"{column(name)} = %s" for name in fields)} '
+            f'WHERE {column("id")} = %s',
+            params,
+        )
+
+
+def series(product, start, end):
+    """
+    [(at, quantity, price), ...] for every slot of ``product`` snapshotted
+    between the aware datetimes ``start`` and ``end`` (inclusive), oldest
+    first.
+    """
+    histories = StockHistory.objects.filter(
+        product=product,
+        month__gte=slot(start, STEPS['day'])[0],
+        month__lte=end.astimezone(dt_timezone.utc).date(),
+    ).only('month', 'step', 'first_slot', 'last_slot', 'changes')
+
+    points = []
+    for history in histories:
+        first, interval = _month_start(history.month), timedelta(seconds=history.step)
+        low = max(history.first_slot, -((first - start) // interval))  # rounded up
+        high = min(history.last_slot, (end - first) // interval)
+        changes, value = decode(history.changes), None
+        for index in range(low, high + 1):
+            while changes and changes[0][0] <= index:
+                value = changes.pop(0)[1:]
+            points.append((first + index * interval, value[0], Decimal(value[1]).scaleb(-2)))
+    points.sort(key=lambda point: point[0])
+    return points
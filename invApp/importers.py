@@ -0,0 +1,232 @@
+"""
+Bulk product import.
+
+Files are parsed one row at a time (csv.reader / openpyxl read-only mode), so
+memory stays flat whatever the catalog size. Every row is validated with the
+same field rules as ProductForm, then valid rows are upserted in batches with
+bulk_create(update_conflicts=True) on the unique_sku_per_owner constraint
+(INSERT ... ON CONFLICT (owner, sku) DO UPDATE). Supplier names are resolved
+to Supplier rows once per batch.
+"""
+import csv
+import io
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+from .forms import ProductForm
+from .models import Product, InventoryStats, Supplier
+from .search import get_backend as get_search_backend, indexable
+from .cache import invalidate_owner
+from .alerts import raise_alerts
+from . import reports
+
+
+# reorder levels are set per product in the UI; an import leaves them alone
+IMPORT_FIELDS = [f for f in ProductForm.field_order if f != 'reorder_level']
+UPDATE_FIELDS = [f for f in IMPORT_FIELDS if f != 'sku']
+DEFAULT_BATCH_SIZE = 2000
+
+# the per-row report keeps this many errors; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFileError(Exception):
+    """The file itself cannot be imported (bad format, missing columns)."""
+
+
+class ImportReport:
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []   # [{'line': 7, 'sku': 'X1', 'errors': {'price': ['...']}}]
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    def add_error(self, line, sku, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'sku': sku, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def _header_map(header):
+    """Map each import field to its column index. Header names are case-insensitive."""
+    columns = {str(name).strip().lower(): i for i, name in enumerate(header) if name is not None}
+    missing = [f for f in IMPORT_FIELDS if f not in columns]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}")
+    return {f: columns[f] for f in IMPORT_FIELDS}
+
+
+def _rows_from_table(rows):
+    """Turn an iterator of header + value rows into (line, {field: value}) pairs."""
+    rows = iter(rows)
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ImportFileError("The file is empty.")
+
+    index = _header_map(header)
+    width = max(index.values()) + 1
+
+    for line, values in enumerate(rows, start=2):
+        if not any(v not in (None, '') for v in values):
+            continue  # blank line
+        if len(values) < width:
+            values = list(values) + [None] * (width - len(values))
+        yield line, {f: values[i] for f, i in index.items()}
+
+
+def iter_csv_rows(fileobj):
+    """Yield (line, row) from a binary CSV file object, one row at a time."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        yield from _rows_from_table(csv.reader(text))
+    except UnicodeDecodeError:
+        raise ImportFileError("CSV files must be UTF-8 encoded.")
+    finally:
+        text.detach()  # leave the underlying file open for the caller
+
+
+def iter_xlsx_rows(fileobj):
+    """Yield (line, row) from the first sheet of an .xlsx workbook."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("Install openpyxl to import .xlsx files.")
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f"Could not read workbook: {e}")
+
+    try:
+        yield from _rows_from_table(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return iter_csv_rows(fileobj)
+    if extension == '.xlsx':
+        return iter_xlsx_rows(fileobj)
+    raise ImportFileError("Only .csv and .xlsx files can be imported.")
+
+
+# ProductForm's own field instances: cleaning with them applies exactly the
+# form's rules (required, max_length, max_digits, min_value, ...) without
+# building a whole bound form per row.
+_FORM_FIELDS = {name: ProductForm.base_fields[name] for name in IMPORT_FIELDS}
+
+
+def validate_row(row):
+    """Return (cleaned_data, errors) for one raw row."""
+    cleaned, errors = {}, {}
+    for name, field in _FORM_FIELDS.items():
+        value = row.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        try:
+            cleaned[name] = field.clean(value)
+        except ValidationError as e:
+            errors[name] = e.messages
+    return cleaned, errors
+
+
+def _upsert(owner, batch, report):
+    """Upsert one batch of {sku: cleaned_data}."""
+    existing = {
+        sku: (pk, (quantity, reorder_level))
+        for sku, pk, quantity, reorder_level in Product.objects.filter(
+            owner=owner, sku__in=batch.keys()
+        ).values_list('sku', 'pk', 'quantity', 'reorder_level')
+    }
+    suppliers = Supplier.objects.resolve(owner.pk, {data['supplier'] for data in batch.values()})
+    Product.objects.bulk_create(
+        [
+            Product(
+                owner_id=owner.pk,
+                supplier_id=suppliers[data['supplier']],
+                **{name: value for name, value in data.items() if name != 'supplier'},
+            )
+            for data in batch.values()
+        ],
+        update_conflicts=True,
+        unique_fields=['owner', 'sku'],
+        update_fields=UPDATE_FIELDS,
+    )
+    report.updated += len(existing)
+    report.created += len(batch) - len(existing)
+    if existing:
+        # an upsert can't increment a column -- invalidate open edit forms here
+        Product.objects.filter(pk__in=[pk for pk, _ in existing.values()]).update(version=F('version') + 1)
+
+    raise_alerts(owner.pk, [
+        (pk, old_level, (batch[sku]['quantity'], old_level[1]))
+        for sku, (pk, old_level) in existing.items()
+    ])
+
+    # bulk_create skips the signals, so index the batch here
+    get_search_backend().index(indexable(Product.objects.filter(owner=owner, sku__in=batch.keys())))
+
+
+def import_products(owner, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Validate and upsert ``rows`` (an iterator of (line, raw_row)) for
+    ``owner``. Returns an ImportReport.
+
+    Each batch commits on its own, so a failure part way through keeps the
+    batches already written. Within a batch the last row for a SKU wins.
+    """
+    report = ImportReport()
+    batch = {}
+
+    for line, row in rows:
+        report.rows += 1
+        data, errors = validate_row(row)
+        if errors:
+            report.add_error(line, row.get('sku'), errors)
+            continue
+
+        batch.pop(data['sku'], None)
+        batch[data['sku']] = data
+        if len(batch) >= batch_size:
+            with transaction.atomic():
+                _upsert(owner, batch, report)
+            batch = {}
+
+    if batch:
+        with transaction.atomic():
+            _upsert(owner, batch, report)
+
+    # bulk_create bypasses the Product signals -- recount once at the end
+    if report.imported:
+        if InventoryStats.enabled():
+            InventoryStats.rebuild(owner.pk)
+        if reports.enabled():
+            reports.rebuild(owner.pk)
+        invalidate_owner(owner.pk)
+
+    return report
+
+
+def import_file(owner, fileobj, filename, batch_size=DEFAULT_BATCH_SIZE):
+    return import_products(owner, iter_rows(fileobj, filename), batch_size=batch_size)
@@ -0,0 +1,195 @@
+"""
+Background jobs with the database as the broker.
+
+Heavy work (large imports, exports, alert fan-out) is registered as a task
+and queued as a Job row instead of running inside a request::
+
+    @task('export_products')
+    def export_products(job, format='csv'):
+        ...
+        job.progress(done, total, 'rows written')
+        return {'path': ...}          # stored as Job.result
+
+    job = enqueue('export_products', owner=request.user, format='ndjson')
+
+``manage.py run_worker`` runs them from a pool of threads (or processes).
+Claiming is a conditional ``UPDATE ... WHERE status = 'queued'`` so two
+workers can never run the same job; PostgreSQL also skips rows another
+worker has locked (``FOR UPDATE SKIP LOCKED``), SQLite relies on its
+single writer. A failing task is retried with exponential back-off up to
+``max_attempts`` times unless it raises PermanentError. A job whose worker
+died is queued again once its lease (``locked_until``) runs out.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger('inventory.jobs')
+
+# name -> (function, max_attempts)
+TASKS = {}
+
+# a running job must report progress (or finish) within this many seconds
+LEASE_SECONDS = 600
+# first retry after this many seconds, doubling per attempt
+RETRY_SECONDS = 10
+# progress is written at most this often
+PROGRESS_INTERVAL = 0.5
+
+
+class PermanentError(Exception):
+    """Raised by a task for failures a retry cannot fix (e.g. a malformed file)."""
+
+
+def files():
+    """Storage for files handed to and produced by jobs (uploads, exports)."""
+    return FileSystemStorage(location=settings.INVENTORY_JOB_FILES_DIR)
+
+
+def task(name, max_attempts=3):
+    """Register ``function(job, **payload)`` as the task ``name``."""
+    def register(function):
+        TASKS[name] = (function, max_attempts)
+        return function
+    return register
+
+
+def enqueue(name, owner=None, *, run_after=None, unique=False, **payload):
+    """
+    Queue task ``name`` with ``payload`` (JSON-serializable keyword
+    arguments). With ``unique`` nothing is queued if the same task is already
+    waiting for the same owner; that job is returned instead.
+    """
+    if name not in TASKS:
+        raise KeyError(f"Unknown task {name!r}.")
+    if unique:
+        waiting = Job.objects.filter(name=name, owner=owner, status=Job.QUEUED).first()
+        if waiting:
+            return waiting
+    return Job.objects.create(
+        name=name,
+        owner=owner,
+        payload=payload,
+        max_attempts=TASKS[name][1],
+        run_after=run_after or timezone.now(),
+    )
+
+
+class JobContext:
+    """What a task receives as ``job``: the Job row plus progress reporting."""
+
+    def __init__(self, job):
+        self.job = job
+        self.pk = job.pk
+        self.owner = job.owner
+        self._reported = 0.0
+
+    @property
+    def final_attempt(self):
+        """True when a failure now fails the job for good (no retry is left)."""
+        return self.job.attempts >= self.job.max_attempts
+
+    def progress(self, done, total=None, message=''):
+        """Record progress (``done`` of ``total``), throttled to PROGRESS_INTERVAL."""
+        now = time.monotonic()
+        if now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        percent = min(99, int(done * 100 / total)) if total else self.job.progress
+        Job.objects.filter(pk=self.pk).update(
+            progress=percent,
+            progress_message=message[:200],
+            # still alive: extend the lease
+            locked_until=timezone.now() + timedelta(seconds=LEASE_SECONDS),
+        )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def requeue_stale():
+    """Queue again the running jobs whose worker stopped renewing the lease."""
+    return Job.objects.filter(status=Job.RUNNING, locked_until__lt=timezone.now()).update(
+        status=Job.QUEUED, locked_by='', locked_until=None,
+    )
+
+
+def claim(worker):
+    """Take the oldest due job for ``worker``, or return None."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        pk = due.values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker[:100],
+            locked_until=now + timedelta(seconds=LEASE_SECONDS),
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+    if not claimed:
+        return None  # another worker got there first
+    return Job.objects.select_related('owner').get(pk=pk)
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns the final status."""
+    function, _ = TASKS.get(job.name, (None, 0))
+    try:
+        if function is None:
+            raise PermanentError(f"Unknown task {job.name!r}.")
+        result = function(JobContext(job), **job.payload)
+    except Exception as e:
+        permanent = isinstance(e, PermanentError) or job.attempts >= job.max_attempts
+        logger.warning('Job %s failed (attempt %d): %s', job, job.attempts, e)
+        fields = {
+            'error': str(e) if isinstance(e, PermanentError) else traceback.format_exc(),
+            'locked_by': '',
+            'locked_until': None,
+        }
+        if permanent:
+            fields.update(status=Job.FAILED, finished_at=timezone.now())
+        else:
+            fields.update(
+                status=Job.QUEUED,
+                run_after=timezone.now() + timedelta(seconds=RETRY_SECONDS * 2 ** (job.attempts - 1)),
+            )
+        Job.objects.filter(pk=job.pk).update(**fields)
+        return fields['status']
+
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.SUCCEEDED,
+        result=result,
+        progress=100,
+        error='',
+        locked_by='',
+        locked_until=None,
+        finished_at=timezone.now(),
+    )
+    return Job.SUCCEEDED
+
+
+def run_next(worker=None):
+    """Claim and run one job. Returns the Job (as claimed), or None if nothing was due."""
+    job = claim(worker or worker_name())
+    if job is not None:
+        run(job)
+    return job
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.databases import PROFILES
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent write throughput across the INVENTORY_DB profiles by "
+        "running bench_stock_movements once per profile in a fresh process. SQLite "
+        "profiles run against a scratch database file; postgres uses the PG* settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='sqlite-rollback,sqlite',
+            help=f"Comma-separated profiles to compare (any of {', '.join(PROFILES)}).",
+        )
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--movements', type=int, default=200, help="Movements per writer.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def run_profile(self, profile, scratch_dir, options):
+        env = {**os.environ, 'INVENTORY_DB': profile}
+        if profile.startswith('sqlite'):
+            env['INVENTORY_DB_NAME'] = str(Path(scratch_dir) / f'{profile}.sqlite3')
+
+        manage = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py')]
+        migrate = subprocess.run([*manage, 'migrate', '-v', '0'], env=env, capture_output=True, text=True)
+        if migrate.returncode:
+            return {'profile': profile, 'error': migrate.stderr.strip().splitlines()[-1]}
+
+        bench = subprocess.run(
+            [*manage, 'bench_stock_movements', '--json',
+             '--writers', str(options['writers']), '--movements', str(options['movements'])],
+            env=env, capture_output=True, text=True,
+        )
+        if not bench.stdout.strip():
+            return {'profile': profile, 'error': bench.stderr.strip().splitlines()[-1]}
+        return {'profile': profile, **json.loads(bench.stdout)}
+
+    def handle(self, *args, **options):
+        profiles = [p.strip() for p in options['profiles'].split(',') if p.strip()]
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}.")
+
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            results = [self.run_profile(p, scratch_dir, options) for p in profiles]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+
+        columns = ('profile', 'movements_per_second', 'p50_ms', 'p99_ms', 'retries', 'correct')
+        self.stdout.write('  '.join(f'{c:>20}' for c in columns))
+        for result in results:
+            if 'error' in result:
+                self.stdout.write(f"{result['profile']:>20}  failed: {result['error']}")
+                continue
+            self.stdout.write('  '.join(f'{result[c]!s:>20}' for c in columns))
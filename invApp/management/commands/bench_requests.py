@@ -0,0 +1,242 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from invApp.models import Product
+
+
+FLOWS = ('dashboard', 'list', 'create', 'update', 'login', 'attack')
+LIST_SORTS = ('', 'name', '-price', 'quantity', 'supplier')
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the real URLconf in-process with the Django test client from several "
+        "threads (WSGI handler), or with --asgi from concurrent coroutines (ASGI "
+        "handler), and report requests/s and p50/p95/p99 per flow (dashboard, list, "
+        "create, update, login, and attack: wrong passwords for guessed usernames, one "
+        "IP per client, which the login throttle answers with 429s once over its limit). "
+        "Use --concurrency 1 for logins per second per core. Run seed_inventory first; "
+        "writes go to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help="Username prefix used by seed_inventory.")
+        parser.add_argument('--password', default='seedpass123', help="Password of the seeded users.")
+        parser.add_argument('--flows', default=','.join(FLOWS), help=f"Comma-separated, any of {', '.join(FLOWS)}.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent clients.")
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help="Use the ASGI handler with one coroutine per client instead of one thread each.",
+        )
+        parser.add_argument('--requests', type=int, default=200, help="Requests per flow.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        flows = [f.strip() for f in options['flows'].split(',') if f.strip()]
+        unknown = set(flows) - set(FLOWS)
+        if unknown:
+            raise CommandError(f"Unknown flow(s): {', '.join(sorted(unknown))}.")
+
+        users = list(get_user_model().objects.filter(username__startswith=f"{options['prefix']}-").order_by('pk'))
+        if not users:
+            raise CommandError(f"No users named {options['prefix']}-*; run seed_inventory first.")
+        # (pk, sku) pairs to update, loaded up front so the flows don't query for them
+        product_ids = {
+            user.pk: list(Product.objects.filter(owner=user).values_list('pk', 'sku')[:500])
+            for user in users
+        }
+
+        # the test clients talk as "testserver", like under setup_test_environment()
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+        # one JSON log line per request would swamp the measurement
+        if options['verbosity'] < 2:
+            logging.getLogger('inventory.performance').setLevel(logging.WARNING)
+            # ...as would a warning per throttled login
+            logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        results = {}
+        for flow in flows:
+            if options['asgi']:
+                results[flow] = asyncio.run(self.arun_flow(flow, users, product_ids, options))
+            else:
+                results[flow] = self.run_flow(flow, users, product_ids, options)
+
+        report = {
+            'revision': _git_revision(),
+            'vendor': connection.vendor,
+            'handler': 'asgi' if options['asgi'] else 'wsgi',
+            'concurrency': options['concurrency'],
+            'cpus': os.cpu_count(),
+            'users': len(users),
+            'flows': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+
+        self.stdout.write(
+            f"{report['vendor']} @ {report['revision']}, {report['handler']}, concurrency {report['concurrency']}"
+        )
+        self.stdout.write(
+            f"{'flow':>10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'429s':>7}"
+        )
+        for flow, r in results.items():
+            self.stdout.write(
+                f"{flow:>10} {r['requests_per_second']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+                f"{r['p99_ms']:>8} {r['errors']:>7} {r['throttled']:>7}"
+            )
+
+    def request(self, flow, client, user, password, product_ids, rng, sequence):
+        """Issue one request; returns (response, expected statuses). With an AsyncClient the response is awaitable."""
+        if flow == 'dashboard':
+            return client.get(reverse('home_view')), (200,)
+        if flow == 'list':
+            return client.get(reverse('product_list_view'), {'sort': rng.choice(LIST_SORTS)}), (200,)
+        if flow == 'create':
+            return client.post(reverse('product_create_view'), {
+                'name': 'Bench product', 'sku': f'BN{time.time_ns() % 10**10:010d}{sequence % 10**6:06d}',
+                'price': '9.99', 'quantity': rng.randint(0, 50), 'supplier': 'Bench Supply',
+            }), (302,)
+        if flow == 'update':
+            pk, sku = rng.choice(product_ids)
+            url = reverse('product_update_view', args=[pk])
+            data = {
+                'name': f'Updated {sequence}', 'sku': sku,
+                'price': '12.50', 'quantity': rng.randint(0, 50), 'supplier': 'Bench Supply',
+            }
+            # an editor posts back the version its form showed: read it just
+            # before posting (two clients editing one product still conflict)
+            versions = Product.objects.filter(pk=pk).values_list('version', flat=True)
+            if isinstance(client, AsyncClient):
+                async def post():
+                    return await client.post(url, {**data, 'version': await versions.aget()})
+                return post(), (302,)
+            return client.post(url, {**data, 'version': versions.get()}), (302,)
+        if flow == 'attack':
+            # a failed login until the client's IP is over its limit, then a 429
+            username = f'{user.username}-guess{rng.randrange(1000)}'
+            return client.post(reverse('login'), {'username': username, 'password': 'not-the-password'}), (200, 429)
+        # login
+        return client.post(reverse('login'), {'username': user.username, 'password': password}), (302,)
+
+    def run_flow(self, flow, users, product_ids, options):
+        if flow == 'update':
+            users = [u for u in users if product_ids[u.pk]]
+            if not users:
+                raise CommandError("The update flow needs seeded users with products.")
+
+        counter = itertools.count()
+        lock = threading.Lock()
+        latencies, statuses, errors = [], [], []
+
+        def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            user = users[index % len(users)]
+            client = Client(**self.client_defaults(flow, index))
+            if flow not in ('login', 'attack'):
+                client.force_login(user)
+            try:
+                while (sequence := next(counter)) < options['requests']:
+                    started = time.perf_counter()
+                    response, expected = self.request(
+                        flow, client, user, options['password'], product_ids[user.pk], rng, sequence,
+                    )
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses.append(response.status_code)
+                        if response.status_code not in expected:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['concurrency'])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+
+        return self.summarize(latencies, statuses, errors, wall)
+
+    async def arun_flow(self, flow, users, product_ids, options):
+        if flow == 'update':
+            users = [u for u in users if product_ids[u.pk]]
+            if not users:
+                raise CommandError("The update flow needs seeded users with products.")
+
+        counter = itertools.count()
+        latencies, statuses, errors = [], [], []
+
+        async def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            user = users[index % len(users)]
+            client = AsyncClient(**self.client_defaults(flow, index))
+            if flow not in ('login', 'attack'):
+                await client.aforce_login(user)
+            while (sequence := next(counter)) < options['requests']:
+                started = time.perf_counter()
+                response, expected = self.request(
+                    flow, client, user, options['password'], product_ids[user.pk], rng, sequence,
+                )
+                response = await response
+                latencies.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+                if response.status_code not in expected:
+                    errors.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(options['concurrency'])])
+        return self.summarize(latencies, statuses, errors, time.perf_counter() - started)
+
+    @staticmethod
+    def client_defaults(flow, index):
+        # each attacking client from an address of its own (TEST-NET-3), so
+        # the login flow's 127.0.0.1 isn't throttled by them
+        return {'REMOTE_ADDR': f'203.0.113.{index % 254 + 1}'} if flow == 'attack' else {}
+
+    @staticmethod
+    def summarize(latencies, statuses, errors, wall):
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': len(errors),
+            'throttled': statuses.count(429),
+            'seconds': round(wall, 3),
+            'requests_per_second': round(len(latencies) / wall, 1) if wall else 0,
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2),
+        }
@@ -0,0 +1,121 @@
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+
+from invApp.models import Product, StockMovement, Supplier
+from invApp.stock import apply_movement, InsufficientStock
+
+
+BENCH_USERNAME = 'bench-stock-movements'
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a handful of products with concurrent stock movements from many "
+        "threads, then check that no update was lost and stock never went negative."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Concurrent writer threads.")
+        parser.add_argument('--movements', type=int, default=200, help="Movements per writer.")
+        parser.add_argument('--products', type=int, default=4, help="Products shared by all writers.")
+        parser.add_argument('--start-quantity', type=int, default=50)
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark user and data.")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if User.objects.filter(username=BENCH_USERNAME).exists():
+            raise CommandError(f"User {BENCH_USERNAME!r} already exists (left over from --keep) -- delete it first.")
+
+        owner = User.objects.create_user(username=BENCH_USERNAME)
+        supplier = Supplier.objects.named(owner.pk, 'Bench')
+        products = Product.objects.bulk_create([
+            Product(owner=owner, name=f'Bench {i}', sku=f'BENCH{i}', price=Decimal('1.00'),
+                    quantity=options['start_quantity'], supplier=supplier)
+            for i in range(options['products'])
+        ])
+        product_ids = [p.pk for p in products]
+
+        lock = threading.Lock()
+        totals = {'applied': 0, 'applied_delta': 0, 'rejected': 0, 'retries': 0, 'latencies': []}
+
+        def writer(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(options['movements']):
+                    product_id = rng.choice(product_ids)
+                    # sales are a bit bigger than receipts, so stock regularly hits zero
+                    if rng.random() < 0.5:
+                        kind, delta = StockMovement.RECEIPT, rng.randint(1, 5)
+                    else:
+                        kind, delta = StockMovement.SALE, -rng.randint(1, 6)
+
+                    while True:
+                        started = time.perf_counter()
+                        try:
+                            apply_movement(owner, product_id, kind, delta)
+                        except InsufficientStock:
+                            with lock:
+                                totals['rejected'] += 1
+                            break
+                        except OperationalError:
+                            # e.g. SQLite "database is locked" -- back off and retry
+                            with lock:
+                                totals['retries'] += 1
+                            time.sleep(rng.uniform(0.001, 0.01))
+                            continue
+                        with lock:
+                            totals['applied'] += 1
+                            totals['applied_delta'] += delta
+                            totals['latencies'].append(time.perf_counter() - started)
+                        break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        expected = options['start_quantity'] * len(product_ids) + totals['applied_delta']
+        actual = sum(Product.objects.filter(pk__in=product_ids).values_list('quantity', flat=True))
+        ledger = sum(StockMovement.objects.filter(owner=owner).values_list('delta', flat=True))
+        latencies = sorted(totals['latencies']) or [0]
+
+        result = {
+            'vendor': connection.vendor,
+            'writers': options['writers'],
+            'applied': totals['applied'],
+            'rejected_insufficient_stock': totals['rejected'],
+            'retries': totals['retries'],
+            'seconds': round(elapsed, 3),
+            'movements_per_second': round(totals['applied'] / elapsed, 1) if elapsed else 0,
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+            'expected_total': expected,
+            'actual_total': actual,
+            'ledger_matches': ledger == totals['applied_delta'],
+            'correct': actual == expected and ledger == totals['applied_delta'],
+        }
+
+        if not options['keep']:
+            owner.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+        else:
+            for key, value in result.items():
+                self.stdout.write(f"{key:>28}: {value}")
+
+        if not result['correct']:
+            raise CommandError("Stock totals do not match the ledger -- updates were lost.")
@@ -0,0 +1,117 @@
+import json
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from auth_app.forms import RegisterForm
+from inventory.rendering import warm_templates
+from invApp.forms import ProductForm
+from invApp.models import Product, Supplier
+
+
+OPTIONS = {key: value for key, value in settings.TEMPLATES[0]['OPTIONS'].items() if key != 'loaders'}
+LOADERS = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+
+# (TEMPLATES, FORM_RENDERER, warm up first)
+PROFILES = {
+    # the old settings: APP_DIRS (Django caches implicitly), plain form renderer
+    'app-dirs': (
+        [{**settings.TEMPLATES[0], 'APP_DIRS': True, 'OPTIONS': OPTIONS}],
+        'django.forms.renderers.DjangoTemplates', False,
+    ),
+    # every render reads and parses its templates again
+    'uncached': (
+        [{**settings.TEMPLATES[0], 'OPTIONS': {**OPTIONS, 'loaders': LOADERS}}],
+        'django.forms.renderers.DjangoTemplates', False,
+    ),
+    # the current settings, warmed up like a worker at start-up
+    'current': (settings.TEMPLATES, settings.FORM_RENDERER, True),
+}
+
+
+def _pages():
+    """{page: (template, context, user)}, built without the database."""
+    owner = get_user_model()(pk=1, username='bench')
+    product = Product(
+        pk=1, owner=owner, name='Socks', sku='SKU00001', price=Decimal('200.40'), quantity=12,
+        reorder_level=5, version=3, supplier=Supplier(pk=1, owner=owner, name='Acme'),
+    )
+    product._state.adding = False
+    return {
+        'product_create': ('invApp/product_form.html', lambda: {'form': ProductForm(owner=owner)}, owner),
+        'product_edit': ('invApp/product_form.html', lambda: {'form': ProductForm(instance=product, owner=owner)}, owner),
+        'login': ('accounts/login.html', dict, AnonymousUser()),
+        'register': ('accounts/register.html', lambda: {'form': RegisterForm()}, AnonymousUser()),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time template rendering per page under each template profile: the old APP_DIRS "
+        "settings, uncached loaders, and the current cached loaders with the memoizing "
+        "form renderer after warm_templates(). Reports the first render in a fresh "
+        "engine and the mean of the rest. Renders only; no database needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default=','.join(PROFILES), help=f"Any of {', '.join(PROFILES)}.")
+        parser.add_argument('--renders', type=int, default=200, help="Renders per page and profile.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def render_times(self, profile, renders):
+        templates, form_renderer, warm = PROFILES[profile]
+        factory = RequestFactory()
+        results = {}
+        # fresh engines and renderer for the profile; DEBUG off, as in production
+        with override_settings(TEMPLATES=templates, FORM_RENDERER=form_renderer, DEBUG=False):
+            if warm:
+                warm_templates()
+            for page, (template, context, user) in _pages().items():
+                timings = []
+                for _ in range(renders):
+                    request = factory.get('/')
+                    request.user = user
+                    get_token(request)
+                    started = time.perf_counter()
+                    render_to_string(template, context(), request=request)
+                    timings.append(time.perf_counter() - started)
+                results[page] = {
+                    'first_ms': round(timings[0] * 1000, 3),
+                    'mean_ms': round(sum(timings[1:]) / max(len(timings) - 1, 1) * 1000, 3),
+                }
+        return results
+
+    def handle(self, *args, **options):
+        profiles = [p.strip() for p in options['profiles'].split(',') if p.strip()]
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}.")
+        if options['renders'] < 2:
+            raise CommandError("--renders must be at least 2.")
+
+        report = {profile: self.render_times(profile, options['renders']) for profile in profiles}
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+
+        self.stdout.write(f"{'page':>16}" + ''.join(f'{p + " first/mean ms":>30}' for p in profiles))
+        for page in report[profiles[0]]:
+            cells = ''.join(
+                f"{report[p][page]['first_ms']:>20.2f} / {report[p][page]['mean_ms']:>7.2f}" for p in profiles
+            )
+            self.stdout.write(f'{page:>16}{cells}')
+        if 'app-dirs' in report and 'current' in report:
+            for page in report['current']:
+                before, after = report['app-dirs'][page], report['current'][page]
+                self.stdout.write(
+                    f"{page}: first render {before['first_ms']:.2f} -> {after['first_ms']:.2f} ms, "
+                    f"mean {before['mean_ms']:.2f} -> {after['mean_ms']:.2f} ms "
+                    f"({after['mean_ms'] / before['mean_ms'] - 1:+.0%})"
+                )
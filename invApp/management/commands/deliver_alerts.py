@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from invApp.alerts import DEFAULT_BATCH_SIZE, deliver_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver pending stock alerts through INVENTORY_ALERT_BACKENDS in batches. "
+        "Runs until interrupted, or with --once until nothing is due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when nothing is due.")
+        parser.add_argument('--once', action='store_true', help="Drain what is due now, then exit.")
+
+    def handle(self, *args, **options):
+        total_delivered = total_failed = 0
+        try:
+            while True:
+                delivered, failed = deliver_pending(options['batch_size'])
+                total_delivered += delivered
+                total_failed += failed
+                if delivered or failed:
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"Delivered {delivered}, failed {failed}.")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Delivered {total_delivered} alert(s); {total_failed} failed and will be retried."
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from invApp.importers import import_file, ImportFileError, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Import (create or update) products for one owner from a CSV or XLSX file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .csv or .xlsx file.")
+        parser.add_argument('--owner', required=True, help="Username that will own the products.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--show-errors', type=int, default=20,
+            help="How many rejected rows to print (default: 20)."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            owner = get_user_model().objects.get(username=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['owner']!r}.")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as f:
+                report = import_file(owner, f, options['path'], batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except ImportFileError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for error in report.errors[:options['show_errors']]:
+            details = '; '.join(f"{field}: {' '.join(msgs)}" for field, msgs in error['errors'].items())
+            self.stderr.write(f"line {error['line']} ({error['sku'] or 'no sku'}): {details}")
+
+        rate = report.rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s): "
+            f"{report.created} created, {report.updated} updated, {report.error_count} rejected."
+        ))
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from invApp.models import InventoryStats
+
+
+class Command(BaseCommand):
+    help = "Recount the per-owner InventoryStats rows from the Product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help="Only rebuild these owners (default: every user)."
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        count = 0
+        for owner_id in users.values_list('pk', flat=True).iterator():
+            InventoryStats.rebuild(owner_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt inventory stats for {count} owner(s)."))
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from invApp.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index from the Product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help="Only reindex these owners (default: everything)."
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+
+        if not options['usernames']:
+            backend.reindex()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt the whole index ({type(backend).__name__})."))
+            return
+
+        owners = get_user_model().objects.filter(username__in=options['usernames'])
+        for owner_id in owners.values_list('pk', flat=True):
+            backend.reindex(owner_id)
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {len(owners)} owner(s)."))
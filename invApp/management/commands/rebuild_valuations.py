@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from invApp import reports
+from invApp.jobs import enqueue
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-owner and per-supplier valuation rollups from the Product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help="Only rebuild these owners (default: every user)."
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue one rebuild_valuation job per owner for run_worker instead.",
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        count = 0
+        for user in users.iterator():
+            if options['background']:
+                enqueue('rebuild_valuation', user, unique=True)
+            else:
+                reports.rebuild(user.pk)
+            count += 1
+
+        verb = "Queued valuation rebuilds" if options['background'] else "Rebuilt valuations"
+        self.stdout.write(self.style.SUCCESS(f"{verb} for {count} owner(s)."))
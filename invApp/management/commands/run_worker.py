@@ -0,0 +1,106 @@
+import logging
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from invApp.jobs import requeue_stale, run_next
+from invApp.models import Job
+
+
+logger = logging.getLogger('inventory.jobs')
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (imports, exports, alert delivery) from a pool "
+        "of threads, or of processes with --processes. Runs until interrupted, or "
+        "with --once until nothing is due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help="Worker threads (per process).")
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help="Worker processes, each running --threads threads. Use for CPU-heavy jobs.",
+        )
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when nothing is due.")
+        parser.add_argument('--once', action='store_true', help="Run what is due now, then exit.")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['processes'] < 1:
+            raise CommandError("--threads and --processes must be at least 1.")
+        if options['processes'] > 1:
+            return self.run_processes(options)
+
+        requeue_stale()
+        stop = threading.Event()
+        counts = {status: 0 for status, _ in Job.STATUS_CHOICES}
+        lock = threading.Lock()
+
+        threads = [
+            threading.Thread(target=self.work, args=(stop, options, counts, lock), daemon=True)
+            for _ in range(options['threads'])
+        ]
+        logger.info('Worker started with %d thread(s)', len(threads))
+        for t in threads:
+            t.start()
+        try:
+            while any(t.is_alive() for t in threads):
+                for t in threads:
+                    t.join(0.5)
+        except KeyboardInterrupt:
+            # let the running jobs finish; a second ^C kills them (their lease expires)
+            stop.set()
+            for t in threads:
+                t.join()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {counts[Job.SUCCEEDED] + counts[Job.FAILED] + counts[Job.QUEUED]} job(s): "
+            f"{counts[Job.SUCCEEDED]} succeeded, {counts[Job.FAILED]} failed, "
+            f"{counts[Job.QUEUED]} to be retried."
+        ))
+
+    @staticmethod
+    def work(stop, options, counts, lock):
+        try:
+            while not stop.is_set():
+                try:
+                    job = run_next()
+                except DatabaseError:
+                    # e.g. the database is busy or restarting -- try again shortly
+                    logger.exception('Could not claim a job')
+                    stop.wait(options['interval'])
+                    continue
+                if job is not None:
+                    job.refresh_from_db(fields=['status'])
+                    with lock:
+                        counts[job.status] += 1
+                    continue
+                if options['once']:
+                    break
+                requeue_stale()
+                stop.wait(options['interval'])
+        finally:
+            connection.close()
+
+    def run_processes(self, options):
+        command = [
+            sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'run_worker',
+            '--threads', str(options['threads']), '--interval', str(options['interval']),
+        ]
+        if options['once']:
+            command.append('--once')
+
+        children = [subprocess.Popen(command) for _ in range(options['processes'])]
+        try:
+            codes = [child.wait() for child in children]
+        except KeyboardInterrupt:
+            # the children got the same SIGINT and finish their current jobs
+            codes = [child.wait() for child in children]
+        if any(codes):
+            raise CommandError(f"A worker process exited with {max(codes)}.")
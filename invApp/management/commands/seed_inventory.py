@@ -0,0 +1,125 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from invApp import reports
+from invApp.cache import invalidate_owner
+from invApp.models import Product, InventoryStats, Supplier
+from invApp.search import get_backend as get_search_backend
+
+
+ADJECTIVES = (
+    'Classic', 'Compact', 'Deluxe', 'Eco', 'Heavy-Duty', 'Large', 'Mini', 'Organic', 'Portable',
+    'Premium', 'Pro', 'Slim', 'Smart', 'Standard', 'Travel', 'Ultra', 'Vintage', 'Wireless',
+)
+NOUNS = (
+    ('BAG', 'Backpack'), ('BOT', 'Water Bottle'), ('CAB', 'USB Cable'), ('CHR', 'Charger'),
+    ('CUP', 'Coffee Mug'), ('HDP', 'Headphones'), ('KBD', 'Keyboard'), ('LMP', 'Desk Lamp'),
+    ('MOU', 'Mouse'), ('NBK', 'Notebook'), ('PEN', 'Ballpoint Pen'), ('SCK', 'Socks'),
+    ('SHO', 'Running Shoes'), ('SPK', 'Speaker'), ('TEE', 'T-Shirt'), ('TWL', 'Towel'),
+)
+SUPPLIERS = (
+    'Acme Trading', 'Blue Harbor Imports', 'Crescent Wholesale', 'Delta Goods', 'Evergreen Supply',
+    'Falcon Distribution', 'Granite & Co', 'Horizon Merchants', 'Ivory Coast Traders', 'Juniper Ltd',
+    'Kestrel Logistics', 'Lagos Market Hub', 'Meridian Sourcing', 'Northwind', 'Oakridge Partners',
+)
+
+
+def generate_products(owner, count, rng, suppliers):
+    """
+    Yield ``count`` unsaved, plausible-looking products; SKUs are unique per
+    owner. ``suppliers`` maps each of SUPPLIERS to the owner's Supplier id.
+    """
+    for i in range(count):
+        code, noun = rng.choice(NOUNS)
+        roll = rng.random()
+        if roll < 0.08:
+            quantity = 0
+        elif roll < 0.28:
+            quantity = rng.randint(1, 10)
+        else:
+            quantity = rng.randint(11, 500)
+
+        yield Product(
+            owner=owner,
+            name=f'{rng.choice(ADJECTIVES)} {noun}',
+            sku=f'{code}-{i:07d}',
+            price=Decimal(max(1, int(rng.lognormvariate(3, 1)))) - Decimal('0.01'),
+            quantity=quantity,
+            supplier_id=suppliers[rng.choice(SUPPLIERS)],
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic tenants (users) and products at a configurable scale, "
+        "for load tests and capacity planning. Deterministic for a given --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of tenants to create.")
+        parser.add_argument('--products', type=int, default=1000, help="Products per tenant.")
+        parser.add_argument(
+            '--sizes',
+            help="Comma-separated products per tenant, cycled over the users (e.g. 10,1000,100000). "
+                 "Overrides --products.",
+        )
+        parser.add_argument('--prefix', default='seed', help="Usernames are <prefix>-0001, <prefix>-0002, ...")
+        parser.add_argument('--password', default='seedpass123', help="Password for every seeded user.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--replace', action='store_true', help="Delete existing users with this prefix first.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=f'{prefix}-')
+        if existing.exists():
+            if not options['replace']:
+                raise CommandError(f"Users named {prefix}-* already exist; use --replace or another --prefix.")
+            existing.delete()
+
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',')] if options['sizes'] else [options['products']]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+
+        rng = random.Random(options['seed'])
+        # hashing is deliberately slow -- do it once for everyone
+        password = make_password(options['password'])
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{n:04d}', email=f'{prefix}-{n:04d}@example.com', password=password)
+            for n in range(1, options['users'] + 1)
+        ])
+
+        started = time.perf_counter()
+        total = 0
+        for n, user in enumerate(users):
+            count = sizes[n % len(sizes)]
+            products = generate_products(user, count, rng, Supplier.objects.resolve(user.pk, SUPPLIERS))
+            for start in range(0, count, options['batch_size']):
+                batch = [next(products) for _ in range(min(options['batch_size'], count - start))]
+                with transaction.atomic():
+                    Product.objects.bulk_create(batch)
+
+            # bulk_create skips the Product signals
+            if InventoryStats.enabled():
+                InventoryStats.rebuild(user.pk)
+            if reports.enabled():
+                reports.rebuild(user.pk)
+            get_search_backend().reindex(user.pk)
+            invalidate_owner(user.pk)
+
+            total += count
+            self.stdout.write(f"{user.username}: {count} products")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} user(s) and {total} products in {elapsed:.1f}s "
+            f"({total / elapsed if elapsed else 0:.0f} products/s)."
+        ))
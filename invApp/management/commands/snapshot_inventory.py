@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from invApp import history
+from invApp.jobs import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Record every product's quantity and price in the stock history. Run it "
+        "from cron every INVENTORY_SNAPSHOT_INTERVAL (an hour or a day); running "
+        "it again within the same interval overwrites that snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help="Only snapshot these owners (default: every user)."
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue one snapshot_inventory job per owner for run_worker instead.",
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        # every owner's snapshot lands in the same slot, however long the run takes
+        at = timezone.now()
+        owners = products = 0
+        for user in users.iterator():
+            if options['background']:
+                enqueue('snapshot_inventory', user, at=at.isoformat())
+            else:
+                products += history.take_snapshot(user.pk, at)
+            owners += 1
+
+        if options['background']:
+            self.stdout.write(self.style.SUCCESS(f"Queued snapshots for {owners} owner(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Recorded {products} product(s) for {owners} owner(s)."))
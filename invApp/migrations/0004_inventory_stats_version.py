@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invApp', '0003_inventory_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorystats',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+# The DDL as it stood when this migration was written -- literal, so later
+# changes to invApp.search don't rewrite history.
+FTS_TABLE = 'invapp_product_fts'
+CREATE_FTS_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "owner, name, sku, supplier, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# GIN over the same expression PostgresSearchBackend.vector() builds (name
+# and sku weighted A, supplier B), so that searches can use it
+CREATE_VECTOR_INDEX = (
+    'CREATE INDEX "product_search_vector_idx" ON "invApp_product" USING gin (('
+    "(setweight(to_tsvector('simple'::regconfig, COALESCE(\"name\", '')), 'A')"
+    " || setweight(to_tsvector('simple'::regconfig, COALESCE(\"sku\", '')), 'A'))"
+    " || setweight(to_tsvector('simple'::regconfig, COALESCE(\"supplier\", '')), 'B')"
+    '))'
+)
+CREATE_TRIGRAM_INDEX = 'CREATE INDEX "product_name_trgm_idx" ON "invApp_product" USING gin ("name" gin_trgm_ops)'
+DROP_INDEXES = ('DROP INDEX IF EXISTS "product_search_vector_idx"', 'DROP INDEX IF EXISTS "product_name_trgm_idx"')
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    Product = apps.get_model('invApp', 'Product')
+
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(CREATE_FTS_TABLE)
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, owner, name, sku, supplier) VALUES (%s, %s, %s, %s, %s)',
+                (
+                    (pk, f'o{owner_id}', name, sku, supplier)
+                    for pk, owner_id, name, sku, supplier in Product.objects.values_list(
+                        'pk', 'owner_id', 'name', 'sku', 'supplier'
+                    ).iterator(chunk_size=2000)
+                ),
+            )
+
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(CREATE_VECTOR_INDEX)
+        schema_editor.execute(CREATE_TRIGRAM_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        for statement in DROP_INDEXES:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invApp', '0005_stock_movement'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
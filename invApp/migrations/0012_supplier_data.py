@@ -0,0 +1,66 @@
+"""
+Turn the free-text Product.supplier values into Supplier rows: one per owner
+and spelling-insensitive name, named after its most used spelling. Products
+are linked in batches of BATCH_SIZE, one UPDATE per supplier in the batch.
+"""
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+
+BATCH_SIZE = 5000
+
+
+def _clean(name):
+    return ' '.join(str(name).split())
+
+
+def link_suppliers(apps, schema_editor):
+    Product = apps.get_model('invApp', 'Product')
+    Supplier = apps.get_model('invApp', 'Supplier')
+
+    names = {}
+    spellings = Product.objects.values('owner_id', 'supplier').annotate(uses=Count('pk')).order_by('-uses', 'supplier')
+    for row in spellings.iterator():
+        names.setdefault((row['owner_id'], _clean(row['supplier']).lower()), _clean(row['supplier']))
+    Supplier.objects.bulk_create(
+        [Supplier(owner_id=owner_id, key=key, name=name) for (owner_id, key), name in names.items()],
+        batch_size=BATCH_SIZE,
+    )
+    ids = {(owner_id, key): pk for pk, owner_id, key in Supplier.objects.values_list('pk', 'owner_id', 'key')}
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Product.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'owner_id', 'supplier')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        batch = defaultdict(list)
+        for pk, owner_id, supplier in rows:
+            batch[ids[(owner_id, _clean(supplier).lower())]].append(pk)
+        for supplier_id, pks in batch.items():
+            Product.objects.filter(pk__in=pks).update(supplier_ref_id=supplier_id)
+
+
+def unlink_suppliers(apps, schema_editor):
+    Product = apps.get_model('invApp', 'Product')
+    Supplier = apps.get_model('invApp', 'Supplier')
+
+    for pk, name in Supplier.objects.values_list('pk', 'name').iterator():
+        Product.objects.filter(supplier_ref_id=pk).update(supplier=name, supplier_ref=None)
+    Supplier.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invApp', '0011_supplier'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_suppliers, unlink_suppliers),
+    ]
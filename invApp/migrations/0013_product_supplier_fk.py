@@ -0,0 +1,93 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_valuations(apps, schema_editor):
+    # keyed by supplier name until now; invApp.reports rebuilds an owner's
+    # rollups on first use
+    apps.get_model('invApp', 'SupplierValuation').objects.all().delete()
+    apps.get_model('invApp', 'OwnerValuation').objects.all().delete()
+
+
+# the tsvector index without the supplier column (literal, like 0006's): the
+# supplier is matched through its own table now
+CREATE_VECTOR_INDEX = (
+    'CREATE INDEX "product_search_vector_idx" ON "invApp_product" USING gin (('
+    "setweight(to_tsvector('simple'::regconfig, COALESCE(\"name\", '')), 'A')"
+    " || setweight(to_tsvector('simple'::regconfig, COALESCE(\"sku\", '')), 'A')"
+    '))'
+)
+
+
+def recreate_search_index(apps, schema_editor):
+    # dropping the supplier column dropped the tsvector index built over it
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS "product_search_vector_idx"')
+        schema_editor.execute(CREATE_VECTOR_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invApp', '0012_supplier_data'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_owner_supplier_idx',
+        ),
+        # a default, so that migrating back can add the text column again
+        migrations.AlterField(
+            model_name='product',
+            name='supplier',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='supplier',
+        ),
+        migrations.RenameField(
+            model_name='product',
+            old_name='supplier_ref',
+            new_name='supplier',
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='supplier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='products', to='invApp.supplier'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['owner', 'supplier', 'Product_id'], name='product_owner_supplier_idx'),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+
+        migrations.RunPython(clear_valuations, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='suppliervaluation',
+            name='supplier_value_idx',
+        ),
+        migrations.RemoveConstraint(
+            model_name='suppliervaluation',
+            name='unique_supplier_valuation',
+        ),
+        migrations.RemoveField(
+            model_name='suppliervaluation',
+            name='supplier',
+        ),
+        migrations.AddField(
+            model_name='suppliervaluation',
+            name='supplier',
+            field=models.ForeignKey(default=0, on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='invApp.supplier'),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='suppliervaluation',
+            constraint=models.UniqueConstraint(fields=('owner', 'supplier'), name='unique_supplier_valuation'),
+        ),
+        migrations.AddIndex(
+            model_name='suppliervaluation',
+            index=models.Index(fields=['owner', '-stock_value', 'supplier'], name='supplier_value_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_statuses(apps, schema_editor):
+    # what the outbox used to leave implicit: delivered_at set, or out of attempts
+    StockAlert = apps.get_model('invApp', 'StockAlert')
+    StockAlert.objects.filter(delivered_at__isnull=False).update(status='delivered')
+    StockAlert.objects.filter(
+        delivered_at__isnull=True, attempts__gte=getattr(settings, 'INVENTORY_ALERT_MAX_ATTEMPTS', 5),
+    ).update(status='failed')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invApp', '0014_product_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stockalert',
+            name='stock_alert_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.RunPython(set_statuses, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at', 'id'], name='stock_alert_pending_idx'),
+        ),
+    ]
@@ -1,5 +1,118 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, router, transaction
+from django.db.models import Count, F, Q
 from django.conf import settings  # 👈 this will reference your custom AUTH_USER_MODEL safely
+from django.utils import timezone
+
+
+# default reorder level: products at or below their reorder level count as
+# "low stock" on the dashboard and raise a low-stock alert
+LOW_STOCK_THRESHOLD = 10
+
+
+class ProductQuerySet(models.QuerySet):
+
+    @staticmethod
+    def _summary_counts():
+        return {
+            'total_products': Count('pk'),
+            'low_stock': Count('pk', filter=Q(quantity__lte=F('reorder_level'))),
+            'out_of_stock': Count('pk', filter=Q(quantity=0)),
+        }
+
+    def stock_summary(self):
+        """
+        Dashboard counters in ONE conditional aggregation query instead of
+        a separate COUNT(*) per card.
+        """
+        return self.aggregate(**self._summary_counts())
+
+    async def astock_summary(self):
+        return await self.aaggregate(**self._summary_counts())
+
+
+class SupplierQuerySet(models.QuerySet):
+
+    def prefixed(self, text):
+        """
+        Suppliers whose name starts with ``text``, in any case: a range scan
+        on the (owner, key) unique index rather than a LIKE.
+        """
+        key = Supplier.normalize(text)
+        return self.filter(key__gte=key, key__lt=key + '\U0010ffff') if key else self
+
+    def named(self, owner_id, name):
+        """The owner's supplier called ``name`` (in any spelling), created if new."""
+        supplier, _ = self.get_or_create(
+            owner_id=owner_id, key=Supplier.normalize(name), defaults={'name': Supplier.clean_name(name)},
+        )
+        return supplier
+
+    def resolve(self, owner_id, names):
+        """
+        ``{name: supplier_id}`` for many names at once, creating the missing
+        suppliers: two queries, three when some are new.
+        """
+        wanted = {}
+        for name in names:
+            # a new supplier is named by its first spelling
+            wanted.setdefault(Supplier.normalize(name), Supplier.clean_name(name))
+        ids = dict(self.filter(owner_id=owner_id, key__in=wanted).values_list('key', 'pk'))
+        missing = [key for key in wanted if key not in ids]
+        if missing:
+            self.bulk_create(
+                [Supplier(owner_id=owner_id, name=wanted[key], key=key) for key in missing],
+                ignore_conflicts=True,
+            )
+            ids.update(self.filter(owner_id=owner_id, key__in=missing).values_list('key', 'pk'))
+        return {name: ids[Supplier.normalize(name)] for name in names}
+
+
+class Supplier(models.Model):
+    """
+    A supplier of an owner's products. Names are matched ignoring case and
+    spacing -- "ACME  Ltd" and "Acme Ltd" are one supplier -- through
+    ``key``, which is unique per owner and also serves prefix lookups.
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='suppliers'
+    )
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, editable=False)
+
+    objects = SupplierQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='unique_supplier_per_owner'),
+        ]
+
+    @staticmethod
+    def clean_name(name):
+        return ' '.join(str(name).split())
+
+    @classmethod
+    def normalize(cls, name):
+        return cls.clean_name(name).lower()
+
+    def save(self, *args, **kwargs):
+        self.name = self.clean_name(self.name)
+        self.key = self.normalize(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class EditConflict(Exception):
+    """The product was changed or deleted since the copy being saved was read."""
+
+    def __init__(self, product_id):
+        self.product_id = product_id
+        super().__init__(f"Product {product_id} was changed by someone else.")
+
 
 class Product(models.Model):
     owner = models.ForeignKey(
@@ -12,7 +125,29 @@ class Product(models.Model):
     sku = models.CharField(max_length=20)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField()
-    supplier = models.CharField(max_length=100)
+    # RESTRICT: a supplier can't be deleted while it has products, but
+    # deleting the owner takes both with it
+    supplier = models.ForeignKey(
+        Supplier,
+        on_delete=models.RESTRICT,
+        related_name='products'
+    )
+    reorder_level = models.PositiveIntegerField(
+        default=LOW_STOCK_THRESHOLD,
+        help_text='Stock at or below this level is low and raises an alert.'
+    )
+    # bumped by every write (saves, stock movements, imports); a save only
+    # applies to the version it was read at -- see save()
+    version = models.PositiveIntegerField(default=1)
+    # price * quantity, kept by the database itself; indexed for the
+    # top-N products by value on the reports page
+    stock_value = models.GeneratedField(
+        expression=F('price') * F('quantity'),
+        output_field=models.DecimalField(max_digits=18, decimal_places=2),
+        db_persist=True,
+    )
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -21,6 +156,509 @@ class Product(models.Model):
                 name='unique_sku_per_owner'
             )
         ]
+        # composite indexes backing the sortable/filterable product list;
+        # Product_id is the keyset tie breaker (owner + sku is already unique)
+        indexes = [
+            models.Index(fields=['owner', 'name', 'Product_id'], name='product_owner_name_idx'),
+            models.Index(fields=['owner', 'price', 'Product_id'], name='product_owner_price_idx'),
+            models.Index(fields=['owner', 'quantity', 'Product_id'], name='product_owner_qty_idx'),
+            models.Index(fields=['owner', 'supplier', 'Product_id'], name='product_owner_supplier_idx'),
+            models.Index(fields=['owner', '-stock_value', 'Product_id'], name='product_owner_value_idx'),
+            # only the (few) products at or below their reorder level
+            models.Index(
+                fields=['owner', 'quantity'],
+                condition=Q(quantity__lte=F('reorder_level')),
+                name='product_low_stock_idx',
+            ),
+        ]
+
+    # fields whose value as loaded from the DB is remembered, so the signal
+    # handlers can work out what a save actually changed without re-reading the row
+    TRACKED_FIELDS = ('owner_id', 'quantity', 'reorder_level', 'price', 'name', 'sku', 'supplier_id')
+
+    # a change to any of these means the search index row must be rewritten
+    SEARCH_FIELDS = ('owner_id', 'name', 'sku', 'supplier_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+
+    def remember_state(self, fields=None):
+        """Record the tracked values as they are in the DB now (only ``fields``' if given)."""
+        if fields is None or self.loaded_state is None:
+            self._loaded_state = {f: self.__dict__.get(f) for f in self.TRACKED_FIELDS}
+            return
+        for f in {self._meta.get_field(name).attname for name in fields} & set(self.TRACKED_FIELDS):
+            self._loaded_state[f] = self.__dict__.get(f)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # the fresh values are what the next save() is diffed against --
+        # otherwise a movement applied meanwhile would be counted twice
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.remember_state(fields)
+
+    @property
+    def loaded_state(self):
+        """Tracked values as last read from / written to the DB (None if new)."""
+        return getattr(self, '_loaded_state', None)
+
+    def save(self, *args, **kwargs):
+        """
+        Optimistic concurrency: an existing product is written with a single
+        ``UPDATE ... WHERE id = %s AND version = %s`` against the version it
+        was read at (or the one a form posted back), and raises EditConflict
+        if someone else wrote it in between. Nothing is locked while a user
+        edits.
+        """
+        self._saving_version = None if self._state.adding else self.version
+        if self._saving_version is None:
+            return super().save(*args, **kwargs)
+
+        self.version = self._saving_version + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        try:
+            # a failed save marks the enclosing transaction for rollback; its
+            # own block (a savepoint inside another one) keeps the caller's usable
+            with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Product, instance=self)):
+                super().save(*args, **kwargs)
+        except EditConflict:
+            self.version = self._saving_version
+            raise
+
+    # Model._do_update is private API; the signature is Django 5.2's, and
+    # EditConflictTests pins it so an upgrade that changes it fails loudly
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_saving_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if not super()._do_update(base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update):
+            # changed (or deleted) since it was read -- never fall back to an INSERT
+            raise EditConflict(pk_val)
+        return True
+
+    @property
+    def stock_level(self):
+        """(quantity, reorder_level) -- what InventoryStats and the alerts compare."""
+        return self.quantity, self.reorder_level
+
+    @property
+    def loaded_stock_level(self):
+        before = self.loaded_state
+        return (before['quantity'], before['reorder_level']) if before else None
+
+    @property
+    def valuation(self):
+        """(supplier_id, price, quantity) -- what the valuation rollups add up."""
+        return self.supplier_id, self.price, self.quantity
+
+    @property
+    def loaded_valuation(self):
+        before = self.loaded_state
+        return (before['supplier_id'], before['price'], before['quantity']) if before else None
 
     def __str__(self):
         return self.name
+
+
+class InventoryStats(models.Model):
+    """
+    Per-owner dashboard counters, kept current incrementally by the Product
+    signal handlers so the dashboard is a single primary-key read.
+
+    ``version`` goes up by one on every change to the owner's products; the
+    JSON API uses it (and ``updated_at``) for ETag / Last-Modified.
+    """
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='inventory_stats'
+    )
+    total_products = models.PositiveIntegerField(default=0)
+    low_stock = models.PositiveIntegerField(default=0)
+    out_of_stock = models.PositiveIntegerField(default=0)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'inventory stats'
+
+    def __str__(self):
+        return f'Inventory stats for {self.owner_id}'
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'INVENTORY_STATS_TABLE', True)
+
+    @classmethod
+    def rebuild(cls, owner_id):
+        """
+        Recount an owner's products from scratch (one aggregate query) and
+        bump the version. Used after bulk writes that bypass the signals.
+        """
+        summary = Product.objects.filter(owner_id=owner_id).stock_summary()
+        updated = cls.objects.filter(owner_id=owner_id).update(
+            **summary, version=F('version') + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            return cls.objects.create(owner_id=owner_id, **summary)
+        return cls.objects.get(owner_id=owner_id)
+
+    @classmethod
+    def get_or_rebuild(cls, owner_id):
+        try:
+            return cls.objects.get(pk=owner_id)
+        except cls.DoesNotExist:
+            return cls.rebuild(owner_id)
+
+    @classmethod
+    def for_owner(cls, owner):
+        """
+        Dashboard counters for ``owner`` as a dict. Reads the summary row when
+        the stats table is enabled, otherwise aggregates live.
+        """
+        if not cls.enabled():
+            return Product.objects.filter(owner=owner).stock_summary()
+        return cls.get_or_rebuild(owner.pk).counters()
+
+    @classmethod
+    async def aget_or_rebuild(cls, owner_id):
+        try:
+            return await cls.objects.aget(pk=owner_id)
+        except cls.DoesNotExist:
+            # rare (first visit, or row deleted); the rebuild is a short write transaction
+            return await sync_to_async(cls.rebuild)(owner_id)
+
+    @classmethod
+    async def afor_owner(cls, owner):
+        """Async for_owner(), for the ASGI views."""
+        if not cls.enabled():
+            return await Product.objects.filter(owner=owner).astock_summary()
+        return (await cls.aget_or_rebuild(owner.pk)).counters()
+
+    def counters(self):
+        return {
+            'total_products': self.total_products,
+            'low_stock': self.low_stock,
+            'out_of_stock': self.out_of_stock,
+        }
+
+    @classmethod
+    def apply_change(cls, owner_id, old_level, new_level):
+        """
+        Shift the counters for one product whose (quantity, reorder_level)
+        went from ``old_level`` to ``new_level`` and bump the version. None
+        means the product did not exist before (created) or no longer exists
+        (deleted).
+        """
+        cls.apply_changes(owner_id, [(old_level, new_level)])
+
+    @classmethod
+    def touch(cls, owner_id):
+        """
+        Bump the version for a change that shows in the owner's products but
+        not in the counters (a price, a supplier's name).
+        """
+        cls.objects.filter(owner_id=owner_id).update(version=F('version') + 1, updated_at=timezone.now())
+
+    @classmethod
+    def apply_changes(cls, owner_id, changes):
+        """apply_change() for many (old_level, new_level) pairs in one UPDATE."""
+        def flags(level):
+            if level is None:
+                return 0, 0, 0
+            quantity, reorder_level = level
+            return 1, int(quantity <= reorder_level), int(quantity == 0)
+
+        total = low = out = 0
+        creates_or_updates = False
+        for old_level, new_level in changes:
+            old, new = flags(old_level), flags(new_level)
+            total += new[0] - old[0]
+            low += new[1] - old[1]
+            out += new[2] - old[2]
+            creates_or_updates = creates_or_updates or new_level is not None
+
+        updated = cls.objects.filter(owner_id=owner_id).update(
+            total_products=F('total_products') + total,
+            low_stock=F('low_stock') + low,
+            out_of_stock=F('out_of_stock') + out,
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+
+        # no summary row yet: build it from the table (already includes these
+        # changes). Deletes skip this -- the owner may be going away too.
+        if not updated and creates_or_updates:
+            cls.rebuild(owner_id)
+
+
+class OwnerValuation(models.Model):
+    """
+    Per-owner stock valuation totals, kept current incrementally (see
+    invApp.reports) so the reports page never aggregates the Product table.
+    """
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='valuation'
+    )
+    products = models.PositiveIntegerField(default=0)
+    units = models.PositiveBigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'Valuation for {self.owner_id}'
+
+
+class SupplierValuation(models.Model):
+    """The same totals per (owner, supplier)."""
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='supplier_valuations'
+    )
+    supplier = models.ForeignKey(
+        Supplier,
+        on_delete=models.CASCADE,
+        related_name='valuations'
+    )
+    products = models.PositiveIntegerField(default=0)
+    units = models.PositiveBigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'supplier'], name='unique_supplier_valuation'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-stock_value', 'supplier'], name='supplier_value_idx'),
+        ]
+
+    def __str__(self):
+        return f'Valuation of supplier {self.supplier_id} for {self.owner_id}'
+
+
+class StockMovement(models.Model):
+    """
+    One line of the stock ledger. The product's quantity is only ever moved
+    by ``delta`` with an atomic UPDATE (see invApp.stock), never overwritten.
+    """
+    RECEIPT = 'receipt'
+    SALE = 'sale'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (RECEIPT, 'Receipt'),
+        (SALE, 'Sale'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='stock_movements'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='movements'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    delta = models.IntegerField()
+    quantity_after = models.PositiveIntegerField()
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='movement_product_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.delta:+d} ({self.product_id})'
+
+
+class StockHistory(models.Model):
+    """
+    One product's snapshotted quantity and price for one month. Slot ``i``
+    of the month is its ``i``-th hour or day (per ``step``); only the slots
+    where a value changed are stored, packed into ``changes`` (see
+    invApp.history), so stock that doesn't move costs no writes and a year of
+    hourly snapshots is 12 small rows per product.
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='stock_history'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='history'
+    )
+    month = models.DateField()  # first day of the month (UTC)
+    step = models.PositiveIntegerField()  # seconds between slots
+    first_slot = models.PositiveIntegerField()
+    last_slot = models.PositiveIntegerField()
+    # the values at the latest change, so unchanged products are skipped
+    # without unpacking ``changes``
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    changes = models.BinaryField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # also the index a product's series over a date range is read from
+            models.UniqueConstraint(fields=['product', 'month', 'step'], name='unique_stock_history'),
+        ]
+
+    def __str__(self):
+        return f'History of {self.product_id} for {self.month:%Y-%m}'
+
+
+class StockAlertQuerySet(models.QuerySet):
+
+    def pending(self):
+        """Alerts still to deliver (served by the partial stock_alert_pending_idx)."""
+        return self.filter(status=StockAlert.PENDING)
+
+
+class StockAlert(models.Model):
+    """
+    A product crossed its reorder level (or ran out). Rows are written in the
+    same transaction as the stock change and form an outbox: the
+    deliver_alerts worker hands pending ones to the configured backends
+    (see invApp.alerts) and marks them delivered -- or failed, once
+    INVENTORY_ALERT_MAX_ATTEMPTS deliveries have failed.
+    """
+    LOW_STOCK = 'low_stock'
+    OUT_OF_STOCK = 'out_of_stock'
+    KIND_CHOICES = [
+        (LOW_STOCK, 'Low stock'),
+        (OUT_OF_STOCK, 'Out of stock'),
+    ]
+
+    PENDING = 'pending'
+    DELIVERED = 'delivered'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DELIVERED, 'Delivered'),
+        (FAILED, 'Failed'),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='stock_alerts'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='alerts'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.PositiveIntegerField()
+    reorder_level = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    # delivery bookkeeping: a worker claims a batch by pushing next_attempt_at
+    # forward, so a crashed worker's batch is simply picked up again later
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    objects = StockAlertQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=Q(status='pending'),
+                name='stock_alert_pending_idx',
+            ),
+            models.Index(fields=['owner', '-created_at'], name='stock_alert_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.product_id} at {self.quantity}'
+
+
+class Job(models.Model):
+    """
+    A unit of background work; the table itself is the queue (see invApp.jobs).
+
+    Workers claim a queued, due job by flipping its status to running with a
+    conditional UPDATE and a lease (``locked_until``); a job whose worker
+    died is picked up again once the lease runs out.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the broker's "next due job" scan only ever touches queued rows
+            models.Index(
+                fields=['run_after', 'id'],
+                condition=Q(status='queued'),
+                name='job_queued_idx',
+            ),
+            models.Index(
+                fields=['locked_until'],
+                condition=Q(status='running'),
+                name='job_running_idx',
+            ),
+            models.Index(fields=['owner', '-created_at'], name='job_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+    @property
+    def finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @property
+    def error_summary(self):
+        """The last line of ``error`` -- the message, without the traceback."""
+        lines = self.error.strip().splitlines()
+        return lines[-1] if lines else ''
@@ -0,0 +1,174 @@
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+from .models import Product, Supplier
+
+
+# Columns the product list can be sorted by. Every entry is backed by an
+# (owner, column, Product_id) index on Product so each page is an index range scan.
+SORTABLE_FIELDS = ('Product_id', 'name', 'sku', 'price', 'quantity', 'supplier')
+
+# Sorts on a related column: the lookup, the model field that parses its
+# cursor value, and a filter (true for every row) that lets the planner drive
+# the join from the related table's index. 'supplier' is alphabetical by the
+# supplier's normalized name: Supplier's (owner, key) index, then per supplier
+# the (owner, supplier, Product_id) one. The planner needs table statistics
+# to pick that over sorting -- Postgres keeps them; on SQLite run ANALYZE.
+RELATED_SORTS = {
+    'supplier': ('supplier__key', Supplier._meta.get_field('key'), Q(supplier__owner=F('owner'))),
+}
+# the annotation carrying a related sort's value to encode_cursor()
+SORT_VALUE = 'sort_value'
+
+DEFAULT_SORT = '-Product_id'
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+CURSOR_SALT = 'invApp.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def parse_sort(sort):
+    """
+    Turn "name" / "-price" into (field, descending).
+    Unknown columns fall back to the default sort.
+    """
+    sort = sort or DEFAULT_SORT
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in SORTABLE_FIELDS:
+        return parse_sort(DEFAULT_SORT)
+    return field, descending
+
+
+def clamp_page_size(page_size):
+    if not page_size:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+
+def sort_lookup(field):
+    """What to order by for the sortable ``field`` ('supplier' -> 'supplier__key')."""
+    return RELATED_SORTS[field][0] if field in RELATED_SORTS else field
+
+
+def encode_cursor(product, field):
+    if field in RELATED_SORTS:
+        value = getattr(product, SORT_VALUE)
+    else:
+        value = getattr(product, field)
+    # Decimals are not JSON serializable -- keep them as strings
+    if field == 'price':
+        value = str(value)
+    # the field is signed in too: a cursor only continues the sort it came from
+    return signing.dumps([field, value, product.pk], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor, field):
+    try:
+        cursor_field, value, pk = signing.loads(cursor, salt=CURSOR_SALT)
+        if cursor_field != field:
+            raise ValueError(f"Cursor is for sort {cursor_field!r}, not {field!r}.")
+        model_field = RELATED_SORTS[field][1] if field in RELATED_SORTS else Product._meta.get_field(field)
+        value = model_field.to_python(value)
+    except (signing.BadSignature, ValidationError, ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    return value, pk
+
+
+class KeysetPage:
+    """
+    One page of a keyset (cursor) paginated queryset.
+
+    Unlike Paginator there is no COUNT(*) and no OFFSET, so the cost of a
+    page does not depend on how deep into the catalog it is.
+    """
+
+    def __init__(self, object_list, sort, has_next, has_previous):
+        self.object_list = object_list
+        self.sort = sort
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+        field, _ = parse_sort(sort)
+        self.next_cursor = encode_cursor(object_list[-1], field) if has_next else None
+        self.previous_cursor = encode_cursor(object_list[0], field) if has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _seek(field, descending, value, pk, forward):
+    """
+    Build the WHERE clause that continues after (value, pk) in sort order.
+    Product_id is the tie breaker so pages never skip or repeat rows.
+    """
+    op = 'gt' if forward != descending else 'lt'
+    if field == 'Product_id':
+        return Q(**{f'Product_id__{op}': pk})
+    lookup = sort_lookup(field)
+    return Q(**{f'{lookup}__{op}': value}) | Q(**{lookup: value, f'Product_id__{op}': pk})
+
+
+def _page_query(queryset, sort, after, before, page_size):
+    field, descending = parse_sort(sort)
+    sort = f"{'-' if descending else ''}{field}"
+    page_size = clamp_page_size(page_size)
+
+    forward = before is None
+    cursor = after if forward else before
+
+    if field in RELATED_SORTS:
+        lookup, _, join_filter = RELATED_SORTS[field]
+        queryset = queryset.filter(join_filter).annotate(**{SORT_VALUE: F(lookup)})
+    if cursor:
+        value, pk = decode_cursor(cursor, field)
+        queryset = queryset.filter(_seek(field, descending, value, pk, forward))
+
+    # walking backwards means reading the index in the opposite direction
+    reverse = descending == forward
+    ordering = [f"{'-' if reverse else ''}{sort_lookup(field)}"]
+    if field != 'Product_id':
+        ordering.append(f"{'-' if reverse else ''}Product_id")
+
+    return queryset.order_by(*ordering)[:page_size + 1], (sort, page_size, forward, cursor)
+
+
+def _make_page(rows, sort, page_size, forward, cursor):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if forward:
+        has_next, has_previous = has_more, bool(cursor)
+    else:
+        rows.reverse()
+        has_next, has_previous = bool(cursor), has_more
+
+    if not rows:
+        has_next = has_previous = False
+
+    return KeysetPage(rows, sort, has_next, has_previous)
+
+
+def keyset_paginate(queryset, sort=None, after=None, before=None, page_size=None):
+    """
+    Return a KeysetPage of ``queryset`` ordered by ``sort``.
+
+    ``after`` moves forward from a next_cursor, ``before`` moves back from a
+    previous_cursor. Raises InvalidCursor for tampered or stale cursors.
+    """
+    query, state = _page_query(queryset, sort, after, before, page_size)
+    return _make_page(list(query), *state)
+
+
+async def akeyset_paginate(queryset, sort=None, after=None, before=None, page_size=None):
+    """Async keyset_paginate(), for the ASGI views."""
+    query, state = _page_query(queryset, sort, after, before, page_size)
+    return _make_page([row async for row in query], *state)
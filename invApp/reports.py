@@ -0,0 +1,180 @@
+"""
+Inventory valuation: stock value (price * quantity) per owner and per
+supplier, plus the top products by value.
+
+The totals live in two rollup tables, OwnerValuation and SupplierValuation,
+which the write paths keep current the same way as InventoryStats: the
+Product signal handlers and invApp.stock pass each product's (supplier_id,
+price, quantity) before and after the change to ``apply_changes()``, which
+shifts the affected rows with ``UPDATE ... SET x = x + delta``. Bulk writers
+(the importer, seed commands) call ``rebuild()`` instead, as does
+``manage.py rebuild_valuations``.
+
+``valuation_report()`` reads one owner row, the top suppliers and the top
+products -- the latter off the indexed ``Product.stock_value`` generated
+column -- so the reports page costs the same for 10 or 100,000 products.
+Set INVENTORY_VALUATION_ROLLUPS = False to aggregate live instead.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Product, OwnerValuation, Supplier, SupplierValuation
+
+
+TOP_DEFAULT = 10
+TOP_MAX = 100
+
+
+def enabled():
+    return getattr(settings, 'INVENTORY_VALUATION_ROLLUPS', True)
+
+
+def _supplier_totals(owner_id, supplier_ids=None):
+    products = Product.objects.filter(owner_id=owner_id)
+    if supplier_ids is not None:
+        products = products.filter(supplier_id__in=supplier_ids)
+    return products.values('supplier').annotate(
+        product_count=Count('pk'), unit_count=Sum('quantity'), value=Sum('stock_value'),
+    ).order_by()
+
+
+def rebuild(owner_id):
+    """Recompute an owner's rollups from the Product table (one grouped query)."""
+    now = timezone.now()
+    suppliers = [
+        SupplierValuation(
+            owner_id=owner_id,
+            supplier_id=row['supplier'],
+            products=row['product_count'],
+            units=row['unit_count'] or 0,
+            stock_value=row['value'] or 0,
+            updated_at=now,
+        )
+        for row in _supplier_totals(owner_id)
+    ]
+    totals = {
+        'products': sum(s.products for s in suppliers),
+        'units': sum(s.units for s in suppliers),
+        'stock_value': sum((Decimal(s.stock_value) for s in suppliers), Decimal(0)),
+        'updated_at': now,
+    }
+    with transaction.atomic():
+        SupplierValuation.objects.filter(owner_id=owner_id).delete()
+        SupplierValuation.objects.bulk_create(suppliers)
+        # a plain UPDATE first: update_or_create() would lock and re-read the row
+        if not OwnerValuation.objects.filter(owner_id=owner_id).update(**totals):
+            OwnerValuation.objects.create(owner_id=owner_id, **totals)
+
+
+def _shift(products, units, value, now):
+    return {
+        'products': F('products') + products,
+        'units': F('units') + units,
+        'stock_value': F('stock_value') + value,
+        'updated_at': now,
+    }
+
+
+def apply_changes(owner_id, changes):
+    """
+    Shift the rollups for ``changes``, an iterable of (old, new) valuation
+    states -- (supplier_id, price, quantity), None for a created / deleted
+    product. Changes that don't move any total (a rename) cost no query.
+    """
+    deltas = defaultdict(lambda: [0, 0, Decimal(0)])
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is not None:
+                supplier, price, quantity = state
+                delta = deltas[supplier]
+                delta[0] += sign
+                delta[1] += sign * quantity
+                delta[2] += sign * Decimal(price) * quantity
+    deltas = {supplier: delta for supplier, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    now = timezone.now()
+    totals = [sum(delta[i] for delta in deltas.values()) for i in range(3)]
+    if not OwnerValuation.objects.filter(owner_id=owner_id).update(**_shift(*totals, now)):
+        # never built: build from the table, which already includes these
+        # changes. Deletes skip this -- the owner may be going away too.
+        if any(new is not None for _, new in changes):
+            rebuild(owner_id)
+        return
+
+    for supplier, delta in deltas.items():
+        rows = SupplierValuation.objects.filter(owner_id=owner_id, supplier_id=supplier)
+        if not rows.update(**_shift(*delta, now)):
+            # the supplier's first product
+            SupplierValuation.objects.bulk_create(
+                [SupplierValuation(owner_id=owner_id, supplier_id=supplier)], ignore_conflicts=True,
+            )
+            rows.update(**_shift(*delta, now))
+
+
+def _live_report(owner, top):
+    suppliers = sorted(_supplier_totals(owner.pk), key=lambda row: (-(row['value'] or 0), row['supplier']))
+    names = dict(Supplier.objects.filter(pk__in=[row['supplier'] for row in suppliers[:top]]).values_list('pk', 'name'))
+    return {
+        'products': sum(row['product_count'] for row in suppliers),
+        'units': sum(row['unit_count'] or 0 for row in suppliers),
+        'stock_value': sum((row['value'] or 0 for row in suppliers), Decimal(0)),
+        'suppliers': [
+            {'supplier': names[row['supplier']], 'products': row['product_count'],
+             'units': row['unit_count'] or 0, 'stock_value': row['value'] or 0}
+            for row in suppliers[:top]
+        ],
+    }
+
+
+def valuation_report(owner, top=TOP_DEFAULT):
+    """Totals, the ``top`` suppliers and the ``top`` products by stock value."""
+    top = max(1, min(top, TOP_MAX))
+    if enabled():
+        try:
+            totals = OwnerValuation.objects.get(pk=owner.pk)
+        except OwnerValuation.DoesNotExist:
+            rebuild(owner.pk)
+            totals = OwnerValuation.objects.get(pk=owner.pk)
+        report = {
+            'products': totals.products,
+            'units': totals.units,
+            'stock_value': totals.stock_value,
+            'suppliers': [
+                {'supplier': row.pop('supplier__name'), **row}
+                for row in SupplierValuation.objects.filter(owner=owner, products__gt=0)
+                .order_by('-stock_value', 'supplier')
+                .values('supplier__name', 'products', 'units', 'stock_value')[:top]
+            ],
+        }
+    else:
+        report = _live_report(owner, top)
+
+    report['top_products'] = list(
+        Product.objects.filter(owner=owner).select_related('supplier')
+        .order_by('-stock_value', 'Product_id')
+        .only('name', 'sku', 'supplier__name', 'price', 'quantity', 'stock_value')[:top]
+    )
+    report['top'] = top
+    return report
+
+
+def supplier_totals(owner, supplier_ids):
+    """{supplier_id: (products, units, stock_value)} for some of the owner's suppliers."""
+    if enabled():
+        if not OwnerValuation.objects.filter(pk=owner.pk).exists():
+            rebuild(owner.pk)
+        rows = SupplierValuation.objects.filter(owner=owner, supplier_id__in=supplier_ids).values_list(
+            'supplier_id', 'products', 'units', 'stock_value',
+        )
+        return {supplier_id: totals for supplier_id, *totals in rows}
+    return {
+        row['supplier']: (row['product_count'], row['unit_count'] or 0, row['value'] or 0)
+        for row in _supplier_totals(owner.pk, supplier_ids)
+    }
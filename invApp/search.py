@@ -0,0 +1,231 @@
+"""
+Per-owner product search.
+
+The backend is picked from the database in use (or INVENTORY_SEARCH_BACKEND):
+
+- SQLite: an FTS5 table ``invapp_product_fts`` keyed by Product_id. The owner
+  is indexed as a token so the full-text engine itself narrows to one tenant.
+- PostgreSQL: a GIN index over a weighted ``tsvector`` expression plus a
+  pg_trgm index on name for misspellings (created by migration 0006).
+- Anything else: plain ``icontains`` filters.
+
+The index follows Product saves/deletes (and supplier renames) through the
+signal handlers; bulk writers call ``reindex()`` for the owner they touched.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import CharField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Product, Supplier
+
+
+# at most this many words of a query are used
+MAX_TERMS = 8
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(text):
+    return TOKEN_RE.findall((text or '').lower())[:MAX_TERMS]
+
+
+def indexable(queryset):
+    """``queryset`` loading just what an index row needs, supplier name included."""
+    return queryset.select_related('supplier').only('owner_id', 'name', 'sku', 'supplier__name')
+
+
+class IContainsSearchBackend:
+    """Fallback: every term must appear in name, SKU or supplier. Unranked."""
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def reindex(self, owner_id=None):
+        pass
+
+    def matching(self, queryset, text):
+        for term in search_terms(text):
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(sku__icontains=term) | Q(supplier__name__icontains=term)
+            )
+        return queryset
+
+    def search(self, text, owner_id, limit, offset=0):
+        """Product ids for ``owner_id`` matching ``text``, best match first."""
+        if not search_terms(text):
+            return []
+        queryset = self.matching(Product.objects.filter(owner_id=owner_id), text)
+        return list(queryset.order_by('name', 'Product_id').values_list('pk', flat=True)[offset:offset + limit])
+
+
+class SQLiteFTSSearchBackend(IContainsSearchBackend):
+    table = 'invapp_product_fts'
+
+    # bm25 column weights: owner, name, sku, supplier
+    RANK = f'bm25({table}, 0.0, 10.0, 6.0, 2.0)'
+
+    @classmethod
+    def create_table(cls, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {cls.table} USING fts5("
+            f"owner, name, sku, supplier, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+    @staticmethod
+    def _row(product):
+        return (product.pk, f'o{product.owner_id}', product.name, product.sku, product.supplier.name)
+
+    def index(self, products):
+        rows = [self._row(p) for p in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(r[0],) for r in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, owner, name, sku, supplier) VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in product_ids])
+
+    def reindex(self, owner_id=None):
+        """Rebuild the index rows for one owner (or everyone) from the Product table."""
+        products = indexable(Product.objects.all())
+        with connection.cursor() as cursor:
+            if owner_id is None:
+                cursor.execute(f'DELETE FROM {self.table}')
+            else:
+                products = products.filter(owner_id=owner_id)
+                cursor.execute(f'DELETE FROM {self.table} WHERE {self.table} MATCH %s', [f'owner : o{owner_id}'])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, owner, name, sku, supplier) VALUES (%s, %s, %s, %s, %s)',
+                (self._row(p) for p in products.iterator(chunk_size=2000)),
+            )
+
+    def match_expression(self, text, owner_id=None):
+        terms = search_terms(text)
+        if not terms:
+            return None
+        # each term is a quoted prefix query, restricted to the text columns
+        expression = '{name sku supplier} : (%s)' % ' AND '.join(f'"{t}"*' for t in terms)
+        if owner_id is not None:
+            expression = f'owner : o{owner_id} AND {expression}'
+        return expression
+
+    def matching(self, queryset, text):
+        expression = self.match_expression(text)
+        if expression is None:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [expression]
+        ))
+
+    def search(self, text, owner_id, limit, offset=0):
+        expression = self.match_expression(text, owner_id)
+        if expression is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY {self.RANK} LIMIT %s OFFSET %s',
+                [expression, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(IContainsSearchBackend):
+    """
+    tsvector + pg_trgm. The GIN indexes are over expressions, so PostgreSQL
+    keeps them current by itself and index()/remove() have nothing to do.
+    Supplier names live in another table, outside the vector: a query also
+    matches the products of suppliers whose name starts with it.
+    """
+
+    # names of the indexes created in migration 0006
+    VECTOR_INDEX = 'product_search_vector_idx'
+    TRIGRAM_INDEX = 'product_name_trgm_idx'
+
+    def __init__(self):
+        from django.contrib.postgres.lookups import TrigramSimilar
+
+        # normally done by django.contrib.postgres' AppConfig, which we don't install
+        CharField.register_lookup(TrigramSimilar)
+
+    @staticmethod
+    def vector():
+        from django.contrib.postgres.search import SearchVector
+
+        return (
+            SearchVector('name', weight='A', config='simple')
+            + SearchVector('sku', weight='A', config='simple')
+        )
+
+    @classmethod
+    def indexes(cls):
+        from django.contrib.postgres.indexes import GinIndex, OpClass
+
+        return [
+            GinIndex(cls.vector(), name=cls.VECTOR_INDEX),
+            GinIndex(OpClass('name', name='gin_trgm_ops'), name=cls.TRIGRAM_INDEX),
+        ]
+
+    def _query(self, text):
+        from django.contrib.postgres.search import SearchQuery
+
+        terms = search_terms(text)
+        if not terms:
+            return None
+        # every term as a prefix match: socks:* & nike:*
+        return SearchQuery(' & '.join(f'{t}:*' for t in terms), search_type='raw', config='simple')
+
+    def _filter(self, queryset, text):
+        query = self._query(text)
+        if query is None:
+            return queryset, None
+        queryset = queryset.annotate(search=self.vector()).filter(
+            Q(search=query) | Q(name__trigram_similar=text)
+            | Q(supplier__in=Supplier.objects.prefixed(text))
+        )
+        return queryset, query
+
+    def matching(self, queryset, text):
+        return self._filter(queryset, text)[0]
+
+    def search(self, text, owner_id, limit, offset=0):
+        from django.contrib.postgres.search import SearchRank, TrigramSimilarity
+
+        queryset, query = self._filter(Product.objects.filter(owner_id=owner_id), text)
+        if query is None:
+            return []
+        queryset = queryset.annotate(
+            rank=SearchRank(self.vector(), query),
+            similarity=TrigramSimilarity('name', text),
+        ).order_by('-rank', '-similarity', 'Product_id')
+        return list(queryset.values_list('pk', flat=True)[offset:offset + limit])
+
+
+def get_backend():
+    path = getattr(settings, 'INVENTORY_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return IContainsSearchBackend()
+
+
+def search_products(owner, text, limit, offset=0):
+    """Ranked Product instances for ``owner`` matching ``text``."""
+    ids = get_backend().search(text, owner.pk, limit, offset)
+    products = Product.objects.select_related('supplier').in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
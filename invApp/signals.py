@@ -0,0 +1,79 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Product, InventoryStats, Supplier
+from .search import get_backend as get_search_backend, indexable
+from .cache import invalidate_owner
+from .alerts import raise_alerts
+from . import reports
+
+
+# These run for every save/delete that goes through the ORM one object at a
+# time -- ProductForm views, the admin (including "delete selected") and
+# cascades. Bulk paths (QuerySet.update, bulk_create) must refresh themselves.
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+
+    before = instance.loaded_state if not created else None
+    old_level = instance.loaded_stock_level if not created else None
+
+    if InventoryStats.enabled():
+        if before is None and not created:
+            # updated without having been loaded first -- nothing to diff against
+            InventoryStats.rebuild(instance.owner_id)
+        elif before and before['owner_id'] != instance.owner_id:
+            # moved to another owner in the admin
+            InventoryStats.apply_change(before['owner_id'], old_level, None)
+            InventoryStats.apply_change(instance.owner_id, None, instance.stock_level)
+        else:
+            InventoryStats.apply_change(instance.owner_id, old_level, instance.stock_level)
+
+    if reports.enabled():
+        if before is None and not created:
+            reports.rebuild(instance.owner_id)
+        elif before and before['owner_id'] != instance.owner_id:
+            reports.apply_changes(before['owner_id'], [(instance.loaded_valuation, None)])
+            reports.apply_changes(instance.owner_id, [(None, instance.valuation)])
+        else:
+            reports.apply_changes(instance.owner_id, [(instance.loaded_valuation, instance.valuation)])
+
+    if before and before['owner_id'] == instance.owner_id:
+        raise_alerts(instance.owner_id, [(instance.pk, old_level, instance.stock_level)])
+
+    if before is None or any(before[f] != getattr(instance, f) for f in Product.SEARCH_FIELDS):
+        get_search_backend().index([instance])
+
+    invalidate_owner(instance.owner_id)
+    if before and before['owner_id'] != instance.owner_id:
+        invalidate_owner(before['owner_id'])
+
+    instance.remember_state()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    before = instance.loaded_state or {'owner_id': instance.owner_id}
+
+    if InventoryStats.enabled():
+        InventoryStats.apply_change(before['owner_id'], instance.loaded_stock_level or instance.stock_level, None)
+
+    if reports.enabled():
+        reports.apply_changes(before['owner_id'], [(instance.loaded_valuation or instance.valuation, None)])
+
+    get_search_backend().remove([instance.pk])
+    invalidate_owner(before['owner_id'])
+
+
+@receiver(post_save, sender=Supplier)
+def supplier_saved(sender, instance, created, raw=False, **kwargs):
+    # a rename shows in every product row and search entry of the supplier
+    if raw or created:
+        return
+    get_search_backend().index(indexable(instance.products.all()))
+    if InventoryStats.enabled():
+        # the API's ETags come from the version
+        InventoryStats.touch(instance.owner_id)
+    invalidate_owner(instance.owner_id)
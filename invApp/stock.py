@@ -0,0 +1,92 @@
+"""
+Concurrency-safe stock changes.
+
+Quantities are moved with ``UPDATE ... SET quantity = quantity + delta WHERE
+quantity >= -delta`` inside a transaction, so concurrent clerks never lose
+each other's changes and stock can never go below zero. Every change is
+recorded as a StockMovement.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import Product, StockMovement, InventoryStats
+from .cache import invalidate_owner
+from .alerts import raise_alerts
+from . import reports
+
+
+class StockError(Exception):
+    pass
+
+
+class InsufficientStock(StockError):
+
+    def __init__(self, product_id, delta):
+        self.product_id = product_id
+        self.delta = delta
+        super().__init__(f"Not enough stock on product {product_id} to apply {delta:+d}.")
+
+
+class UnknownProduct(StockError):
+    pass
+
+
+def _move(owner, product_id, delta):
+    """Move one product's quantity by ``delta``; return its new (quantity, reorder_level, price, supplier_id)."""
+    updated = Product.objects.filter(
+        pk=product_id, owner=owner, quantity__gte=max(0, -delta)
+    ).update(quantity=F('quantity') + delta, version=F('version') + 1)
+
+    if not updated:
+        if Product.objects.filter(pk=product_id, owner=owner).exists():
+            raise InsufficientStock(product_id, delta)
+        raise UnknownProduct(f"No product {product_id} for this owner.")
+
+    # the row stays write-locked until commit, so this is the value we produced
+    return Product.objects.filter(pk=product_id).values_list('quantity', 'reorder_level', 'price', 'supplier_id').get()
+
+
+def apply_movement(owner, product_id, kind, delta, note=''):
+    """Apply one movement atomically and return the saved StockMovement."""
+    return apply_movements(owner, [
+        {'product_id': product_id, 'kind': kind, 'delta': delta, 'note': note},
+    ])[0]
+
+
+def apply_movements(owner, movements):
+    """
+    Apply many movements in ONE transaction: either all of them are applied
+    or none is. ``movements`` is a list of dicts with product_id, kind, delta
+    and optionally note. Raises InsufficientStock / UnknownProduct.
+    """
+    ledger = []
+    changes = []
+    valuation_changes = []
+
+    with transaction.atomic():
+        for movement in movements:
+            delta = movement['delta']
+            quantity, reorder_level, price, supplier = _move(owner, movement['product_id'], delta)
+            changes.append((movement['product_id'], (quantity - delta, reorder_level), (quantity, reorder_level)))
+            valuation_changes.append(((supplier, price, quantity - delta), (supplier, price, quantity)))
+            ledger.append(StockMovement(
+                owner=owner,
+                product_id=movement['product_id'],
+                kind=movement['kind'],
+                delta=delta,
+                quantity_after=quantity,
+                note=movement.get('note', ''),
+            ))
+
+        StockMovement.objects.bulk_create(ledger)
+
+        # QuerySet.update() skips the Product signals -- shift the counters
+        # and raise any alerts here
+        if InventoryStats.enabled():
+            InventoryStats.apply_changes(owner.pk, [(old, new) for _, old, new in changes])
+        if reports.enabled():
+            reports.apply_changes(owner.pk, valuation_changes)
+        raise_alerts(owner.pk, changes)
+        invalidate_owner(owner.pk)
+
+    return ledger
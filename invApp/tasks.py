@@ -0,0 +1,90 @@
+"""
+Background tasks run by ``manage.py run_worker`` (see invApp.jobs).
+Imported by InvappConfig.ready() so the registry is filled in every process.
+"""
+import os
+
+from django.utils.dateparse import parse_datetime
+
+from . import alerts, exporters, history, importers, reports
+from .jobs import PermanentError, files, task
+
+
+# progress is reported every this many rows
+PROGRESS_EVERY = 1000
+
+
+def _reporting(job, rows, fileobj, size):
+    """Pass ``rows`` through, reporting how far into the file the reader is."""
+    for n, row in enumerate(rows, start=1):
+        if n % PROGRESS_EVERY == 0:
+            job.progress(fileobj.tell(), size, f'{n} rows read')
+        yield row
+
+
+@task('import_products')
+def import_products(job, path, filename):
+    """Import an uploaded catalog saved under ``path``; the result is the import report."""
+    storage = files()
+    try:
+        with storage.open(path, 'rb') as fileobj:
+            rows = importers.iter_rows(fileobj, filename)
+            report = importers.import_products(job.owner, _reporting(job, rows, fileobj, storage.size(path)))
+    except importers.ImportFileError as e:
+        storage.delete(path)
+        raise PermanentError(str(e)) from e
+    except Exception:
+        # a retry reads the file again; after the last attempt nothing will
+        if job.final_attempt:
+            storage.delete(path)
+        raise
+
+    storage.delete(path)
+    return report.as_dict()
+
+
+@task('export_products')
+def export_products(job, format='csv', params=None):
+    """Write the owner's (filtered) products to a file the owner can download from the job page."""
+    queryset = exporters.export_queryset(job.owner, params or {})
+    total = queryset.count()
+    filename = exporters.export_filename(format)
+    path = f'exports/{job.pk}/{filename}'
+
+    full_path = files().path(path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w', encoding='utf-8', newline='') as out:
+        lines = exporters.stream_export(queryset, format, rows=exporters.chunked_export_rows(queryset))
+        for n, line in enumerate(lines):
+            out.write(line)
+            if n % PROGRESS_EVERY == 0:
+                job.progress(n, total, f'{n} of {total} rows written')
+
+    return {'path': path, 'filename': filename, 'rows': total}
+
+
+@task('deliver_alerts')
+def deliver_alerts(job):
+    """Drain the stock alert outbox (queued whenever new alerts are raised)."""
+    delivered = failed = 0
+    while True:
+        batch_delivered, batch_failed = alerts.deliver_pending()
+        if not batch_delivered and not batch_failed:
+            break
+        delivered += batch_delivered
+        failed += batch_failed
+    return {'delivered': delivered, 'failed': failed}
+
+
+@task('rebuild_valuation')
+def rebuild_valuation(job):
+    """Recompute the owner's valuation rollups (``manage.py rebuild_valuations --background``)."""
+    reports.rebuild(job.owner.pk)
+    return {'owner': job.owner.pk}
+
+
+@task('snapshot_inventory')
+def snapshot_inventory(job, at=None):
+    """Record the owner's stock levels in their history (``manage.py snapshot_inventory``)."""
+    at = parse_datetime(at) if at else None
+    return {'products': history.take_snapshot(job.owner.pk, at)}
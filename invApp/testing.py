@@ -0,0 +1,67 @@
+"""
+Helpers for the query-budget tests.
+
+``QueryBudgetMixin.assertWithinBudget`` makes one request and checks both
+the exact number of queries (so an N+1 -- say a template reading
+``product.owner`` in a loop -- fails immediately) and a wall-time budget.
+
+Latency budgets are for an unloaded developer machine; slower CI runners
+can scale them with INVENTORY_LATENCY_BUDGET_FACTOR (e.g. ``3``).
+"""
+import os
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from . import reports
+from .models import Product, InventoryStats, Supplier
+from .search import get_backend as get_search_backend
+
+
+# products per seeded tenant
+TENANT_SIZES = (10, 1_000, 100_000)
+
+LATENCY_BUDGET_FACTOR = float(os.environ.get('INVENTORY_LATENCY_BUDGET_FACTOR', 1))
+
+
+def seed_tenant(owner, count, batch_size=5000):
+    """Give ``owner`` ``count`` products, with stats, valuation and search rows in place."""
+    suppliers = Supplier.objects.resolve(owner.pk, [f'Supplier {i}' for i in range(50)])
+    for start in range(0, count, batch_size):
+        Product.objects.bulk_create([
+            Product(
+                owner=owner,
+                name=f'Product {i:06d}',
+                sku=f'SKU{i:06d}',
+                price=Decimal('10.00') + i % 500,
+                quantity=i % 25,
+                supplier_id=suppliers[f'Supplier {i % 50}'],
+            )
+            for i in range(start, min(start + batch_size, count))
+        ])
+    InventoryStats.rebuild(owner.pk)
+    reports.rebuild(owner.pk)
+    get_search_backend().reindex(owner.pk)
+
+
+class QueryBudgetMixin:
+
+    def assertWithinBudget(self, url, data=None, *, queries, ms, method='get', status=200, **extra):
+        """Request ``url`` cold (empty cache) and check its query count and wall time."""
+        cache.clear()
+        request = getattr(self.client, method)
+
+        started = time.perf_counter()
+        with self.assertNumQueries(queries):
+            response = request(url, data, **extra) if data is not None else request(url, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.assertEqual(response.status_code, status, url)
+        self.assertLess(
+            elapsed_ms, ms * LATENCY_BUDGET_FACTOR,
+            f'{method.upper()} {url} took {elapsed_ms:.0f} ms (budget {ms} ms)',
+        )
+        return response
@@ -1,3 +1,2149 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import inspect
+import io
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django import forms
+from django.core.management import call_command, CommandError
+from django.template import Context, Template, engines
+from django.db import connection, models
+from django.db.models import RestrictedError
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+
+from .models import (
+    EditConflict, Product, Supplier, InventoryStats, StockMovement, StockHistory, StockAlert, Job,
+    OwnerValuation, SupplierValuation,
+)
+from .alerts import EmailBackend, deliver_pending
+from .forms import ProductForm
+from .pagination import CURSOR_SALT, keyset_paginate, InvalidCursor
+from .importers import import_file, ImportFileError
+from .stock import apply_movement, apply_movements, InsufficientStock
+from .search import get_backend as get_search_backend, search_products
+from . import cache as fragment_cache
+from . import bulk, history, jobs, reports
+from .testing import QueryBudgetMixin, TENANT_SIZES, seed_tenant
+from inventory import metrics, staticfiles
+from inventory.rendering import CachedFormRenderer, warm_templates
+from inventory.databases import database_config
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+def make_products(owner, count, **overrides):
+    """Bulk-create ``count`` products for ``owner`` with predictable values."""
+    names = [overrides.get('supplier', f'Supplier {i % 3}') for i in range(count)]
+    suppliers = Supplier.objects.resolve(owner.pk, set(names))
+    products = [
+        Product(
+            owner=owner,
+            name=overrides.get('name', f'Product {i:05d}'),
+            sku=f'SKU{i:05d}',
+            price=overrides.get('price', Decimal('10.00') + i),
+            quantity=overrides.get('quantity', i % 25),
+            supplier_id=suppliers[names[i]],
+        )
+        for i in range(count)
+    ]
+    return Product.objects.bulk_create(products)
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor based pagination of the product list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', password='testpass123')
+        make_products(cls.user, 53)
+
+    def walk(self, sort, page_size=10):
+        """Follow next cursors until the end and return every pk seen."""
+        queryset = Product.objects.filter(owner=self.user)
+        seen = []
+        page = keyset_paginate(queryset, sort=sort, page_size=page_size)
+        seen.extend(p.pk for p in page)
+        while page.has_next:
+            page = keyset_paginate(queryset, sort=sort, after=page.next_cursor, page_size=page_size)
+            seen.extend(p.pk for p in page)
+        return seen
+
+    def test_walk_visits_every_row_once_in_order(self):
+        """Following next cursors should return every product exactly once"""
+        for sort in ['Product_id', '-Product_id', 'quantity', '-quantity', 'supplier', '-price']:
+            column = sort.replace('supplier', 'supplier__key')
+            expected = list(
+                Product.objects.filter(owner=self.user)
+                .order_by(column, ('-' if sort.startswith('-') else '') + 'Product_id')
+                .values_list('pk', flat=True)
+            )
+            self.assertEqual(self.walk(sort), expected, sort)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Going forward then back should land on the same page"""
+        queryset = Product.objects.filter(owner=self.user)
+        first = keyset_paginate(queryset, sort='quantity', page_size=10)
+        second = keyset_paginate(queryset, sort='quantity', after=first.next_cursor, page_size=10)
+        back = keyset_paginate(queryset, sort='quantity', before=second.previous_cursor, page_size=10)
+
+        self.assertEqual([p.pk for p in back], [p.pk for p in first])
+        self.assertFalse(back.has_previous)
+        self.assertTrue(back.has_next)
+
+    def test_supplier_sort_is_alphabetical(self):
+        """Sorting by supplier should follow the names, not the order suppliers were created in"""
+        owner = User.objects.create_user(username='sorted', password='testpass123')
+        products = make_products(owner, 8)
+        # created out of alphabetical order, so their ids aren't
+        for i, name in enumerate(['Zeta', 'alpha', 'Mid', 'Beta']):
+            supplier = Supplier.objects.named(owner.pk, name)
+            Product.objects.filter(pk__in=[p.pk for p in products[2 * i:2 * i + 2]]).update(supplier=supplier)
+        queryset = Product.objects.filter(owner=owner).select_related('supplier')
+
+        for sort, expected in [('supplier', ['alpha', 'Beta', 'Mid', 'Zeta']), ('-supplier', ['Zeta', 'Mid', 'Beta', 'alpha'])]:
+            names = []
+            page = keyset_paginate(queryset, sort=sort, page_size=3)
+            names += [p.supplier.name for p in page]
+            while page.has_next:
+                page = keyset_paginate(queryset, sort=sort, after=page.next_cursor, page_size=3)
+                names += [p.supplier.name for p in page]
+            self.assertEqual(names, [name for name in expected for _ in range(2)], sort)
+
+    def test_page_size_is_capped(self):
+        """A huge per_page should be clamped to the maximum"""
+        page = keyset_paginate(Product.objects.filter(owner=self.user), page_size=10_000)
+        self.assertLessEqual(len(page), 100)
+
+    def test_tampered_cursor_is_rejected(self):
+        """Cursors are signed, so editing one should raise InvalidCursor"""
+        with self.assertRaises(InvalidCursor):
+            keyset_paginate(Product.objects.all(), after='not-a-cursor')
+
+    def test_cursor_only_continues_its_own_sort(self):
+        """A cursor from one sort replayed with another should raise InvalidCursor, not a 500"""
+        queryset = Product.objects.filter(owner=self.user)
+        cursor = keyset_paginate(queryset, sort='name', page_size=10).next_cursor
+        with self.assertRaises(InvalidCursor):
+            keyset_paginate(queryset, sort='price', after=cursor)
+        # a signed value the field can't parse
+        with self.assertRaises(InvalidCursor):
+            keyset_paginate(queryset, sort='price', after=signing.dumps(['price', 'abc', 1], salt=CURSOR_SALT))
+
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('product_list_view'), {'sort': 'price', 'after': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page'].has_previous)
+        response = client.get(reverse('product_list_api'), {'sort': 'price', 'after': cursor})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductListViewTests(TestCase):
+    """Test the filtered, paginated product list view"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('product_list_view')
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        make_products(self.user, 30)
+        make_products(self.other, 5, name='Not mine')
+        self.client.login(username='owner', password='testpass123')
+
+    def test_list_only_shows_own_products(self):
+        """Products of other users should never be listed"""
+        response = self.client.get(self.url, {'per_page': 100})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), 30)
+        self.assertNotContains(response, 'Not mine')
+
+    def test_list_is_paginated(self):
+        """The first page should hold the default page size and link onwards"""
+        response = self.client.get(self.url)
+        page = response.context['page']
+        self.assertEqual(len(page), 25)
+        self.assertTrue(page.has_next)
+
+        response = self.client.get(self.url, {'after': page.next_cursor})
+        self.assertEqual(len(response.context['page']), 5)
+
+    def test_filters_by_quantity_range_and_supplier(self):
+        """Quantity range and supplier filters should narrow the list"""
+        response = self.client.get(self.url, {
+            'min_quantity': 5,
+            'max_quantity': 9,
+            'supplier': 'supplier 1',
+            'per_page': 100,
+        })
+        products = list(response.context['products'])
+        self.assertTrue(products)
+        for product in products:
+            self.assertTrue(5 <= product.quantity <= 9)
+            self.assertEqual(product.supplier.name, 'Supplier 1')
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        """A stale cursor in the URL should not break the page"""
+        response = self.client.get(self.url, {'after': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page'].has_previous)
+
+
+class InventoryStatsTests(TestCase):
+    """Test the incrementally maintained dashboard counters"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+
+    def assertStatsMatchTable(self):
+        stats = InventoryStats.objects.get(pk=self.user.pk)
+        live = Product.objects.filter(owner=self.user).stock_summary()
+        self.assertEqual(
+            (stats.total_products, stats.low_stock, stats.out_of_stock),
+            (live['total_products'], live['low_stock'], live['out_of_stock']),
+        )
+
+    def test_stats_follow_create_update_delete(self):
+        """Counters should track products created, edited and deleted via the views"""
+        self.client.post(reverse('product_create_view'), {
+            'name': 'Socks', 'sku': 'S1', 'price': '5.00', 'quantity': 50, 'supplier': 'Nike',
+        })
+        self.client.post(reverse('product_create_view'), {
+            'name': 'Shoes', 'sku': 'S2', 'price': '50.00', 'quantity': 0, 'supplier': 'Nike',
+        })
+        self.assertStatsMatchTable()
+
+        socks = Product.objects.get(sku='S1')
+        self.client.post(reverse('product_update_view', args=[socks.pk]), {
+            'name': 'Socks', 'sku': 'S1', 'price': '5.00', 'quantity': 3, 'supplier': 'Nike', 'version': socks.version,
+        })
+        self.assertStatsMatchTable()
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).low_stock, 2)
+
+        self.client.post(reverse('product_delete_view', args=[socks.pk]))
+        self.assertStatsMatchTable()
+
+    def test_dashboard_reads_counters(self):
+        """The dashboard should show the counters with a bounded number of queries"""
+        make_products(self.user, 40)
+        InventoryStats.rebuild(self.user.pk)
+
+        # session + user + stats row + latest products
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('home_view'))
+
+        self.assertEqual(response.context['total_products'], 40)
+        self.assertEqual(response.context['out_of_stock'], 2)
+
+    def test_dashboard_builds_missing_row(self):
+        """A missing summary row should be rebuilt on the first dashboard hit"""
+        make_products(self.user, 12)
+        InventoryStats.objects.filter(pk=self.user.pk).delete()
+
+        response = self.client.get(reverse('home_view'))
+        self.assertEqual(response.context['total_products'], 12)
+        self.assertStatsMatchTable()
+
+
+class EditConflictTests(TestCase):
+    """Test the optimistic concurrency check on product edits"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+        self.socks = make_products(self.user, 1, supplier='Nike', quantity=10)[0]
+        self.url = reverse('product_update_view', args=[self.socks.pk])
+        self.data = {'name': 'Socks', 'sku': self.socks.sku, 'price': '5.00', 'quantity': 10, 'supplier': 'Nike'}
+
+    def test_every_write_bumps_the_version(self):
+        """Saves, stock movements and imports should all move the version on"""
+        self.assertContains(self.client.get(self.url), 'name="version" value="1"')
+        self.assertEqual(self.client.post(self.url, {**self.data, 'version': 1}).status_code, 302)
+        apply_movement(self.user, self.socks.pk, StockMovement.RECEIPT, 5)
+        import_file(self.user, io.BytesIO(f"name,sku,price,quantity,supplier\nSocks,{self.socks.sku},5,3,Nike\n".encode()), 'x.csv')
+
+        self.socks.refresh_from_db()
+        self.assertEqual(self.socks.version, 4)
+
+    def test_stale_edit_is_rejected(self):
+        """A form posted from an older version should get a 409 and change nothing"""
+        self.client.post(self.url, {**self.data, 'name': 'First', 'version': 1})
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -4)
+
+        response = self.client.post(self.url, {**self.data, 'name': 'Second', 'version': 1})
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'Someone else changed this product', status_code=409)
+        self.assertContains(response, 'name="version" value="3"', status_code=409)
+
+        self.socks.refresh_from_db()
+        self.assertEqual((self.socks.name, self.socks.quantity), ('First', 6))
+        # the failed save must not have shifted the counters either
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).low_stock, 1)
+        self.assertEqual(OwnerValuation.objects.get(pk=self.user.pk).units, 6)
+
+        # saving the conflict form again overwrites deliberately
+        response = self.client.post(self.url, {**self.data, 'name': 'Second', 'version': 3})
+        self.assertEqual(response.status_code, 302)
+        self.socks.refresh_from_db()
+        self.assertEqual((self.socks.name, self.socks.quantity, self.socks.version), ('Second', 10, 4))
+
+    def test_model_save_checks_the_version(self):
+        """Two copies of a product: the second save should raise, not overwrite"""
+        first, second = Product.objects.get(pk=self.socks.pk), Product.objects.get(pk=self.socks.pk)
+        first.name = 'First'
+        first.save()
+        second.name = 'Second'
+        with self.assertRaises(EditConflict):
+            second.save(update_fields=['name'])
+        self.assertEqual(second.version, 1)
+        self.assertEqual(Product.objects.get(pk=self.socks.pk).name, 'First')
+
+        Product.objects.filter(pk=self.socks.pk).delete()
+        with self.assertRaises(EditConflict):
+            first.save()
+        self.assertFalse(Product.objects.filter(pk=self.socks.pk).exists())
+
+    def test_stale_edit_creates_no_supplier(self):
+        """A supplier typed into a rejected edit should not be created"""
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -4)
+        response = self.client.post(self.url, {**self.data, 'supplier': 'Brand New', 'version': 1})
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Supplier.objects.filter(owner=self.user, key='brand new').exists())
+
+    def test_do_update_override_matches_django(self):
+        """Product._do_update overrides private API: its signature must match Django's"""
+        self.assertEqual(
+            list(inspect.signature(Product._do_update).parameters),
+            list(inspect.signature(models.Model._do_update).parameters),
+        )
+
+
+class FragmentCacheTests(TestCase):
+    """Test the per-owner dashboard and product list fragment cache"""
+
+    def setUp(self):
+        cache.clear()
+        fragment_cache.counters.reset()
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+        make_products(self.user, 30)
+        InventoryStats.rebuild(self.user.pk)
+
+    def test_repeat_dashboard_runs_no_product_queries(self):
+        """A second dashboard hit should be served from the cache"""
+        self.client.get(reverse('home_view'))
+
+        # session + user only
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('home_view'))
+
+        self.assertContains(response, 'SKU00029')
+        self.assertEqual(fragment_cache.counters.snapshot()['dashboard_stats'], {'hits': 1, 'misses': 1})
+
+    def test_list_pages_are_cached_per_query_string(self):
+        """Each filter/cursor combination should be cached on its own"""
+        url = reverse('product_list_view')
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+        response = self.client.get(url, {'supplier': 'Supplier 1'})
+        self.assertNotContains(response, 'Supplier 2')
+        self.assertEqual(fragment_cache.counters.snapshot()['product_table'], {'hits': 1, 'misses': 2})
+
+    def test_saving_a_product_invalidates_owner_fragments(self):
+        """Editing a product should bump the owner's version once committed"""
+        self.client.get(reverse('home_view'))
+
+        product = Product.objects.get(owner=self.user, sku='SKU00029')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('product_update_view', args=[product.pk]), {
+                'name': 'Renamed widget', 'sku': 'SKU00029', 'price': '5.00', 'quantity': 0, 'supplier': 'Nike',
+                'version': product.version,
+            })
+
+        response = self.client.get(reverse('home_view'))
+        self.assertContains(response, 'Renamed widget')
+        self.assertEqual(fragment_cache.counters.snapshot()['latest_products'], {'hits': 0, 'misses': 2})
+
+    def test_bulk_paths_invalidate_owner_fragments(self):
+        """Stock movements and imports bypass signals but must still invalidate"""
+        version = fragment_cache.get_owner_version(self.user.pk)
+        product = Product.objects.get(owner=self.user, sku='SKU00003')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(self.user, product.pk, StockMovement.RECEIPT, 5)
+        self.assertNotEqual(fragment_cache.get_owner_version(self.user.pk), version)
+
+        version = fragment_cache.get_owner_version(self.user.pk)
+        upload = io.BytesIO(b'name,sku,price,quantity,supplier\nNew,NEW1,1.00,1,Acme\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            import_file(self.user, upload, 'products.csv')
+        self.assertNotEqual(fragment_cache.get_owner_version(self.user.pk), version)
+
+    def test_other_owners_keep_their_fragments(self):
+        """A change for one owner should not invalidate anyone else's cache"""
+        other = User.objects.create_user(username='other')
+        version = fragment_cache.get_owner_version(other.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(owner=self.user).first().delete()
+
+        self.assertEqual(fragment_cache.get_owner_version(other.pk), version)
+
+    def test_cache_stats_are_staff_only(self):
+        """The hit/miss counters should only be exposed to staff"""
+        response = self.client.get(reverse('cache_stats_view'))
+        self.assertEqual(response.status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(reverse('home_view'))
+        response = self.client.get(reverse('cache_stats_view'))
+        self.assertEqual(response.json()['dashboard_stats'], {'hits': 0, 'misses': 1})
+
+
+class DatabaseProfileTests(TestCase):
+    """Test the INVENTORY_DB database profiles"""
+
+    def test_sqlite_profile_is_tuned_for_concurrent_writes(self):
+        """The default profile should use WAL, a busy timeout and BEGIN IMMEDIATE"""
+        config = database_config(Path('/srv'), environ={})
+        self.assertEqual(config['NAME'], Path('/srv/db.sqlite3'))
+        self.assertIn('PRAGMA journal_mode=WAL;', config['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA synchronous=NORMAL;', config['OPTIONS']['init_command'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite only")
+    def test_sqlite_pragmas_apply_to_connections(self):
+        """Every new connection should run the init command"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+    def test_postgres_profile_pools_or_persists_connections(self):
+        """Postgres should use a pool, or persistent connections when the pool is off"""
+        pooled = database_config(Path('/srv'), environ={'INVENTORY_DB': 'postgres'})
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], 10)
+        self.assertTrue(pooled['CONN_HEALTH_CHECKS'])
+
+        persistent = database_config(Path('/srv'), environ={
+            'INVENTORY_DB': 'postgres', 'INVENTORY_DB_POOL_MAX': '0', 'INVENTORY_DB_CONN_MAX_AGE': '120',
+        })
+        self.assertNotIn('pool', persistent['OPTIONS'])
+        self.assertEqual(persistent['CONN_MAX_AGE'], 120)
+
+    def test_unknown_profile_is_rejected(self):
+        """An unknown INVENTORY_DB value should fail loudly at startup"""
+        with self.assertRaises(ImproperlyConfigured):
+            database_config(Path('/srv'), environ={'INVENTORY_DB': 'mysql'})
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """Test the request instrumentation and the /metrics endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+        make_products(self.user, 5)
+        InventoryStats.rebuild(self.user.pk)
+
+    def test_server_timing_header(self):
+        """Measured responses should report app, DB and template time"""
+        response = self.client.get(reverse('home_view'))
+        timing = response['Server-Timing']
+        self.assertIn('app;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('tpl;dur=', timing)
+
+    def test_histograms_per_url_name(self):
+        """Each request should land in the histograms under its URL name"""
+        self.client.get(reverse('home_view'))
+        self.client.get(reverse('home_view'))
+
+        self.assertEqual(metrics.request_duration.samples('home_view')['count'], 2)
+        # session + user + stats row + latest products, then session + user from the cache
+        self.assertEqual(metrics.db_queries.samples('home_view')['sum'], 4 + 2)
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('inventory_request_duration_seconds_count{view="home_view"} 2', body)
+        self.assertIn('inventory_fragment_cache_hits_total{fragment="dashboard_stats"} 1', body)
+
+    def test_logs_one_json_line(self):
+        """A measured request should log a structured line"""
+        with self.assertLogs('inventory.performance', 'INFO') as logs:
+            self.client.get(reverse('product_list_view'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'product_list_view')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['bytes'], 0)
+
+    @override_settings(INVENTORY_PERF_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_pass_through(self):
+        """With sampling off nothing should be measured"""
+        response = self.client.get(reverse('home_view'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertIsNone(metrics.request_duration.samples('home_view'))
+
+    def test_metrics_restricted_to_allowed_ips(self):
+        """Only allowed addresses may scrape /metrics"""
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'inventory.staticfiles.CompressedManifestStaticFilesStorage'},
+})
+class StaticAssetTests(TestCase):
+    """Test the hashed, pre-compressed static files and the middleware serving them"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(root.cleanup)
+        cls.root = Path(root.name)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.css_url = Template("{% load static %}{% static 'styles/styles.css' %}").render(Context())
+
+    def setUp(self):
+        self.enterContext(override_settings(INVENTORY_SERVE_STATIC=True))
+        self.client = Client()
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        """{% static %} should name the hashed file, with a .gz next to it"""
+        self.assertRegex(self.css_url, r'^/static/styles/styles\.[0-9a-f]{12}\.css$')
+        hashed = self.root / self.css_url.removeprefix('/static/')
+        self.assertEqual(gzip.decompress(Path(f'{hashed}.gz').read_bytes()), hashed.read_bytes())
+        self.assertEqual(Path(f'{hashed}.br').exists(), staticfiles.brotli is not None)
+        # files too small to be worth it get no variants
+        small = [path for path in self.root.rglob('*.css') if path.stat().st_size < staticfiles.MIN_COMPRESS_BYTES]
+        self.assertTrue(small)
+        self.assertFalse([path for path in small if Path(f'{path}.gz').exists()])
+
+    def test_hashed_file_is_immutable(self):
+        """A hashed name should be served for a year, gzipped when accepted"""
+        response = self.client.get(self.css_url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertEqual(gzip.decompress(body), (self.root / self.css_url.removeprefix('/static/')).read_bytes())
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_identity_when_not_accepted(self):
+        """Clients that refuse gzip should get the plain file"""
+        response = self.client.get(self.css_url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'{', b''.join(response.streaming_content))
+
+    def test_not_modified(self):
+        """A matching If-None-Match should get a bodiless 304"""
+        etag = self.client.get(self.css_url)['ETag']
+        response = self.client.get(self.css_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_head_has_no_body(self):
+        response = self.client.head(self.css_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertGreater(int(response['Content-Length']), 0)
+
+    @override_settings(INVENTORY_STATIC_MAX_AGE=120)
+    def test_unhashed_name_is_short_lived(self):
+        """The original name may change under the same URL, so it is only cached briefly"""
+        response = self.client.get('/static/styles/styles.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=120')
+
+    def test_unknown_files_fall_through(self):
+        """Anything not collected should reach the normal URL routing"""
+        self.assertEqual(self.client.get('/static/styles/missing.css').status_code, 404)
+        self.assertEqual(self.client.post(self.css_url).status_code, 404)
+
+    @override_settings(INVENTORY_SERVE_STATIC=False)
+    def test_off_by_default(self):
+        self.assertEqual(Client().get(self.css_url).status_code, 404)
+
+
+class TemplateRenderingTests(TestCase):
+    """Test the template warm-up and the memoizing form renderer"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+
+    def test_warm_templates_compiles_pages_and_widgets(self):
+        """Warm-up should leave the app, account and widget templates compiled"""
+        warmed = warm_templates()
+        for name in ('invApp/layout.html', 'invApp/product_form.html', 'accounts/login.html',
+                     'django/forms/widgets/input.html'):
+            self.assertIn(name, warmed)
+        self.assertNotIn('admin/base.html', warmed)
+
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIn('invApp/product_form.html', loader.get_template_cache)
+
+    def test_widgets_rendered_once_per_context(self):
+        """The same widget context should reuse its HTML; another value renders anew"""
+        renderer = CachedFormRenderer()
+        first = str(ProductForm(owner=self.user, renderer=renderer)['name'])
+        entries = len(renderer._rendered)
+        self.assertEqual(str(ProductForm(owner=self.user, renderer=renderer)['name']), first)
+        self.assertEqual(len(renderer._rendered), entries)
+
+        other = str(ProductForm({'name': 'Socks'}, owner=self.user, renderer=renderer)['name'])
+        self.assertIn('value="Socks"', other)
+        self.assertEqual(len(renderer._rendered), entries + 1)
+
+    def test_equal_but_different_values_not_confused(self):
+        """True and 1 compare equal but render differently"""
+        renderer = CachedFormRenderer()
+        flag = forms.TextInput(attrs={'data-x': True}).render('x', None, renderer=renderer)
+        one = forms.TextInput(attrs={'data-x': 1}).render('x', None, renderer=renderer)
+        self.assertIn('data-x>', flag)
+        self.assertIn('data-x="1"', one)
+
+    @override_settings(DEBUG=True)
+    def test_not_memoized_in_debug(self):
+        renderer = CachedFormRenderer()
+        forms.TextInput().render('x', 'y', renderer=renderer)
+        self.assertEqual(renderer._rendered, {})
+
+    def test_bench_templates(self):
+        """The benchmark should time every page under every profile"""
+        out = io.StringIO()
+        call_command('bench_templates', '--renders', '2', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report), {'app-dirs', 'uncached', 'current'})
+        self.assertEqual(set(report['current']), {'product_create', 'product_edit', 'login', 'register'})
+        self.assertGreater(report['current']['product_edit']['mean_ms'], 0)
+
+
+class ProductImportTests(TestCase):
+    """Test the bulk CSV/XLSX import pipeline"""
+
+    CSV = (
+        "Name,SKU,Price,Quantity,Supplier\n"
+        "Socks,S1,5.00,50,Nike\n"
+        "Shoes,S2,50.00,0,Nike\n"
+        "Broken,,abc,-3,\n"
+        "Socks v2,S1,6.00,40,Nike\n"
+    )
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+
+    def test_valid_rows_are_upserted_and_errors_reported(self):
+        """Valid rows should be saved, bad rows reported with their line number"""
+        report = import_file(self.user, io.BytesIO(self.CSV.encode()), 'catalog.csv')
+
+        self.assertEqual(report.rows, 4)
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.error_count, 1)
+        self.assertEqual(report.errors[0]['line'], 4)
+        self.assertEqual(set(report.errors[0]['errors']), {'sku', 'price', 'quantity', 'supplier'})
+
+        # last row for a SKU wins
+        socks = Product.objects.get(owner=self.user, sku='S1')
+        self.assertEqual((socks.name, socks.quantity), ('Socks v2', 40))
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).total_products, 2)
+
+    def test_reimport_updates_existing_skus(self):
+        """Importing the same SKUs again should update rather than duplicate"""
+        import_file(self.user, io.BytesIO(self.CSV.encode()), 'catalog.csv')
+        report = import_file(
+            self.user, io.BytesIO(b"name,sku,price,quantity,supplier\nSocks,S1,7.50,9,Adidas\n"), 'again.csv'
+        )
+
+        self.assertEqual((report.created, report.updated), (0, 1))
+        self.assertEqual(Product.objects.filter(owner=self.user).count(), 2)
+        self.assertEqual(Product.objects.get(owner=self.user, sku='S1').supplier.name, 'Adidas')
+
+    def test_batches_are_flushed(self):
+        """Rows spanning several batches should all be written"""
+        lines = ["name,sku,price,quantity,supplier"]
+        lines += [f"Item {i},K{i},1.00,{i},Acme" for i in range(25)]
+        report = import_file(self.user, io.BytesIO("\n".join(lines).encode()), 'big.csv', batch_size=10)
+
+        self.assertEqual(report.created, 25)
+        self.assertEqual(Product.objects.filter(owner=self.user).count(), 25)
+
+    def test_missing_columns_are_rejected(self):
+        """A file without the required header should fail as a whole"""
+        with self.assertRaises(ImportFileError):
+            import_file(self.user, io.BytesIO(b"name,sku\nSocks,S1\n"), 'catalog.csv')
+
+    @skipUnless(openpyxl, "openpyxl is not installed")
+    def test_xlsx_import(self):
+        """XLSX workbooks should import like CSV"""
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['name', 'sku', 'price', 'quantity', 'supplier'])
+        sheet.append(['Socks', 'S1', 5.5, 12, 'Nike'])
+        data = io.BytesIO()
+        workbook.save(data)
+        data.seek(0)
+
+        report = import_file(self.user, data, 'catalog.xlsx')
+        self.assertEqual(report.created, 1)
+        self.assertEqual(Product.objects.get(sku='S1').price, Decimal('5.50'))
+
+    def test_import_view(self):
+        """Uploading through the import page should show the report"""
+        self.client.login(username='owner', password='testpass123')
+        upload = SimpleUploadedFile('catalog.csv', self.CSV.encode(), content_type='text/csv')
+
+        response = self.client.post(reverse('product_import_view'), {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].created, 2)
+        self.assertContains(response, 'This field is required.')
+
+
+class ProductExportTests(TestCase):
+    """Test the streaming CSV/NDJSON export"""
+
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('product_export_view')
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        make_products(self.user, 30)
+        make_products(other, 5, name='Not mine')
+        self.client.login(username='owner', password='testpass123')
+
+    def test_csv_export_streams_every_product(self):
+        """CSV export should stream a header plus one line per product"""
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Product_id,name,sku,price,quantity,supplier')
+        self.assertEqual(len(lines), 31)
+        self.assertNotIn('Not mine', '\n'.join(lines))
+
+    def test_ndjson_export_applies_list_filters(self):
+        """NDJSON export should honour the same filters and sort as the list"""
+        response = self.client.get(self.url, {'format': 'ndjson', 'max_quantity': 4, 'sort': '-quantity'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertTrue(rows)
+        self.assertTrue(all(row['quantity'] <= 4 for row in rows))
+        self.assertEqual([r['quantity'] for r in rows], sorted((r['quantity'] for r in rows), reverse=True))
+        self.assertEqual(rows[0]['price'], str(Product.objects.get(pk=rows[0]['Product_id']).price))
+
+    def test_supplier_sort_matches_the_list(self):
+        """Exports sorted by supplier should come out in the list's (alphabetical) order"""
+        products = Product.objects.filter(owner=self.user).order_by('pk')
+        # created out of alphabetical order, so their ids aren't
+        for name, chunk in zip(['Zeta', 'alpha', 'Mid'], (products[:10], products[10:20], products[20:])):
+            Product.objects.filter(pk__in=[p.pk for p in chunk]).update(supplier=Supplier.objects.named(self.user.pk, name))
+
+        for sort in ('supplier', '-supplier'):
+            with self.subTest(sort=sort):
+                response = self.client.get(self.url, {'format': 'ndjson', 'sort': sort})
+                rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+                expected = ['alpha', 'Mid', 'Zeta'] if sort == 'supplier' else ['Zeta', 'Mid', 'alpha']
+                self.assertEqual([row['supplier'] for row in rows][::10], expected)
+
+                listed = self.client.get(reverse('product_list_view'), {'sort': sort, 'per_page': 100})
+                self.assertEqual([row['Product_id'] for row in rows], [p.pk for p in listed.context['products']])
+
+    def test_export_round_trips_through_import(self):
+        """An exported CSV should re-import without errors"""
+        data = b''.join(self.client.get(self.url).streaming_content)
+        report = import_file(self.user, io.BytesIO(data), 'export.csv')
+        self.assertEqual((report.updated, report.error_count), (30, 0))
+
+
+class ProductApiTests(TestCase):
+    """Test the read-only JSON API and its conditional GET support"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.products = make_products(self.user, 30)
+        self.foreign = make_products(other, 1)[0]
+        self.client.login(username='owner', password='testpass123')
+
+    def test_requires_authentication(self):
+        """Anonymous clients should get a 401, not a login redirect"""
+        self.client.logout()
+        response = self.client.get(reverse('product_list_api'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_is_keyset_paginated(self):
+        """The list should page with cursors like the HTML list"""
+        response = self.client.get(reverse('product_list_api'), {'per_page': 20, 'sort': 'sku'})
+        data = response.json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0]['sku'], 'SKU00000')
+
+        data = self.client.get(reverse('product_list_api'), {
+            'per_page': 20, 'sort': 'sku', 'after': data['next'],
+        }).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['next'])
+
+    def test_retrieve_by_pk_and_sku(self):
+        """Products can be fetched by id or SKU, but only the owner's"""
+        product = self.products[3]
+        by_pk = self.client.get(reverse('product_detail_api', args=[product.pk])).json()
+        by_sku = self.client.get(reverse('product_sku_api', args=[product.sku])).json()
+        self.assertEqual(by_pk, by_sku)
+        self.assertEqual(by_pk['price'], str(product.price))
+
+        response = self.client.get(reverse('product_detail_api', args=[self.foreign.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_matching_etag_returns_304_without_product_queries(self):
+        """If-None-Match with the current ETag should be answered from the version alone"""
+        url = reverse('product_list_api')
+        etag = self.client.get(url)['ETag']
+
+        # session + user + stats row; the products are never touched
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_changes_when_inventory_changes(self):
+        """Saving any product should invalidate previously issued ETags"""
+        url = reverse('product_detail_api', args=[self.products[0].pk])
+        etag = self.client.get(url)['ETag']
+
+        product = Product.objects.get(pk=self.products[5].pk)
+        product.price = Decimal('99.99')
+        product.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class AsyncViewTests(TestCase):
+    """Test the async dashboard, list and API views through the ASGI handler"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.products = make_products(self.user, 30)
+        InventoryStats.rebuild(self.user.pk)
+
+    async def test_dashboard(self):
+        """The dashboard should render under ASGI with the same query count as WSGI"""
+        await self.async_client.aforce_login(self.user)
+
+        # counted by PerformanceMiddleware (assertNumQueries can't be used from async code)
+        # session + user + stats row + latest products
+        response = await self.async_client.get(reverse('home_view'))
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+        self.assertContains(response, 'SKU00029')
+        self.assertContains(response, '<p class="mt-2 text-3xl font-semibold">30</p>', html=True)
+
+        response = await self.async_client.get(reverse('home_view'))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    async def test_dashboard_requires_login(self):
+        response = await self.async_client.get(reverse('home_view'))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_product_list_pages(self):
+        """Keyset pagination should work through the async ORM"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('product_list_view'), {'sort': 'sku'})
+        page = response.context['page']
+        self.assertEqual(len(page), 25)
+
+        response = await self.async_client.get(reverse('product_list_view'), {'sort': 'sku', 'after': page.next_cursor})
+        self.assertEqual([p.sku for p in response.context['page']][-1], 'SKU00029')
+
+    async def test_api_conditional_get(self):
+        """The API should answer 304 from the stats row alone under ASGI"""
+        await self.async_client.aforce_login(self.user)
+        url = reverse('product_detail_api', args=[self.products[0].pk])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()['sku'], 'SKU00000')
+
+        # session + user + stats row
+        response = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    async def test_api_requires_authentication(self):
+        response = await self.async_client.get(reverse('product_list_api'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_concurrent_polling(self):
+        """Many clients polling at once should all be served"""
+        await self.async_client.aforce_login(self.user)
+        responses = await asyncio.gather(*[
+            self.async_client.get(reverse('product_sku_api', args=[f'SKU{i:05d}'])) for i in range(30)
+        ])
+        self.assertEqual(sorted(r.json()['sku'] for r in responses), [f'SKU{i:05d}' for i in range(30)])
+
+
+class ValuationReportTests(TestCase):
+    """Test the stock valuation rollups and the reports page"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+
+    def assertRollupsMatchTable(self):
+        live = reports._live_report(self.user, reports.TOP_MAX)
+        totals = OwnerValuation.objects.get(pk=self.user.pk)
+        self.assertEqual((totals.products, totals.units, totals.stock_value),
+                         (live['products'], live['units'], live['stock_value']))
+        rollups = {
+            row['supplier__name']: (row['products'], row['units'], row['stock_value'])
+            for row in SupplierValuation.objects.filter(owner=self.user, products__gt=0).values(
+                'supplier__name', 'products', 'units', 'stock_value',
+            )
+        }
+        self.assertEqual(rollups, {
+            row['supplier']: (row['products'], row['units'], row['stock_value']) for row in live['suppliers']
+        })
+
+    def test_rollups_follow_create_update_delete(self):
+        """Totals should track products created, edited, restocked and deleted"""
+        self.client.post(reverse('product_create_view'), {
+            'name': 'Socks', 'sku': 'S1', 'price': '5.00', 'quantity': 50, 'supplier': 'Nike',
+        })
+        self.client.post(reverse('product_create_view'), {
+            'name': 'Shoes', 'sku': 'S2', 'price': '50.00', 'quantity': 3, 'supplier': 'Nike',
+        })
+        self.assertEqual(OwnerValuation.objects.get(pk=self.user.pk).stock_value, Decimal('400.00'))
+
+        socks = Product.objects.get(sku='S1')
+        self.client.post(reverse('product_update_view', args=[socks.pk]), {
+            'name': 'Socks', 'sku': 'S1', 'price': '6.00', 'quantity': 40, 'supplier': 'Adidas',
+            'version': socks.version,
+        })
+        self.assertRollupsMatchTable()
+
+        apply_movement(self.user, socks.pk, StockMovement.SALE, -15)
+        self.assertRollupsMatchTable()
+        self.assertEqual(SupplierValuation.objects.get(supplier__name='Adidas').stock_value, Decimal('150.00'))
+
+        self.client.post(reverse('product_delete_view', args=[socks.pk]))
+        self.assertRollupsMatchTable()
+        self.assertEqual(OwnerValuation.objects.get(pk=self.user.pk).stock_value, Decimal('150.00'))
+
+    def test_report_reads_rollups_only(self):
+        """The reports page should cost the same number of queries at any size"""
+        make_products(self.user, 60)
+        reports.rebuild(self.user.pk)
+
+        # session + user + owner totals + top suppliers + top products
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('inventory_report_view'), {'top': 5})
+
+        self.assertRollupsMatchTable()
+        self.assertEqual(len(response.context['suppliers']), 3)
+        values = [p.stock_value for p in response.context['top_products']]
+        self.assertEqual(len(values), 5)
+        self.assertEqual(values, sorted(values, reverse=True))
+        self.assertEqual(values[0], max(p.price * p.quantity for p in Product.objects.all()))
+
+    def test_live_mode_matches_rollups(self):
+        """With the rollups disabled the report should aggregate to the same numbers"""
+        make_products(self.user, 30)
+        reports.rebuild(self.user.pk)
+        expected = reports.valuation_report(self.user)
+
+        with override_settings(INVENTORY_VALUATION_ROLLUPS=False):
+            live = reports.valuation_report(self.user)
+
+        self.assertEqual(live['stock_value'], expected['stock_value'])
+        self.assertEqual([r['supplier'] for r in live['suppliers']], [r['supplier'] for r in expected['suppliers']])
+
+    def test_rebuild_valuations_command(self):
+        """The command should rebuild missing rollups, or queue jobs with --background"""
+        make_products(self.user, 12)
+        OwnerValuation.objects.all().delete()
+        SupplierValuation.objects.all().delete()
+
+        call_command('rebuild_valuations', 'owner', stdout=io.StringIO())
+        self.assertRollupsMatchTable()
+
+        call_command('rebuild_valuations', '--background', stdout=io.StringIO())
+        self.assertEqual(Job.objects.filter(name='rebuild_valuation', owner=self.user).count(), 1)
+
+
+class StockHistoryTests(TestCase):
+    """Test the packed stock history snapshots and the history API"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+        self.product = Product.objects.create(
+            owner=self.user, name='Socks', sku='S1', price=Decimal('5.00'), quantity=50,
+            supplier=Supplier.objects.named(self.user.pk, 'Nike'),
+        )
+        self.day = datetime(2026, 3, 1, 12, tzinfo=dt_timezone.utc)
+
+    def test_codec_round_trip(self):
+        """Packing the changes should be lossless"""
+        changes = [(0, 50, 500), (3, 0, 500), (700, 2**40, -1)]
+        self.assertEqual(history.decode(history.encode(changes)), changes)
+
+    def test_unchanged_stock_stores_nothing_new(self):
+        """Snapshots of stock that doesn't move should only extend the row"""
+        for day in range(10):
+            with self.assertNumQueries(6 if day == 0 else 3):
+                history.take_snapshot(self.user.pk, self.day + timedelta(days=day))
+
+        row = StockHistory.objects.get()
+        self.assertEqual((row.first_slot, row.last_slot), (0, 9))
+        self.assertEqual(history.decode(row.changes), [(0, 50, 500)])
+        points = history.series(self.product, self.day.replace(hour=0), self.day + timedelta(days=30))
+        self.assertEqual([q for _, q, _ in points], [50] * 10)
+
+    def test_backfill_keeps_later_slots(self):
+        """Recording an earlier slot should not change the slots after it"""
+        for day in range(5):
+            history.take_snapshot(self.user.pk, self.day + timedelta(days=day))
+        self.product.quantity = 7
+        self.product.save()
+        history.take_snapshot(self.user.pk, self.day + timedelta(days=2))
+
+        points = history.series(self.product, self.day.replace(hour=0), self.day + timedelta(days=30))
+        self.assertEqual([q for _, q, _ in points], [50, 50, 7, 50, 50])
+
+    def test_one_row_per_product_per_month(self):
+        """Daily snapshots should fill slots of a single monthly row"""
+        for day in range(10):
+            self.product.quantity = 50 - day
+            self.product.save()
+            history.take_snapshot(self.user.pk, self.day + timedelta(days=day))
+        # taking the same slot again overwrites it
+        history.take_snapshot(self.user.pk, self.day + timedelta(days=9, hours=6))
+
+        self.assertEqual(StockHistory.objects.count(), 1)
+        # daily slots start at midnight
+        points = history.series(self.product, self.day.replace(hour=0), self.day + timedelta(days=30))
+        self.assertEqual([q for _, q, _ in points], list(range(50, 40, -1)))
+        self.assertEqual(points[0], (self.day.replace(hour=0), 50, Decimal('5.00')))
+
+    def test_series_reads_only_months_in_range(self):
+        """A range should read the rows of the months it spans, across month ends"""
+        for month in (1, 2, 3, 4):
+            self.product.price = Decimal(month)
+            self.product.save()
+            history.take_snapshot(self.user.pk, self.day.replace(month=month, day=28))
+
+        with self.assertNumQueries(1):
+            points = history.series(self.product, self.day.replace(month=2, day=20), self.day.replace(day=30))
+        self.assertEqual([p for _, _, p in points], [Decimal('2.00'), Decimal('3.00')])
+
+    @override_settings(INVENTORY_SNAPSHOT_INTERVAL='hour')
+    def test_hourly_snapshots(self):
+        """Hourly snapshots should land in hour slots of the month"""
+        for hour in range(3):
+            history.take_snapshot(self.user.pk, self.day + timedelta(hours=hour, minutes=30))
+        points = history.series(self.product, self.day, self.day + timedelta(hours=5))
+        self.assertEqual([at.hour for at, _, _ in points], [12, 13, 14])
+
+    def test_history_api(self):
+        """The API should return a SKU's series for the requested range"""
+        history.take_snapshot(self.user.pk, self.day)
+        url = reverse('product_history_api', args=['S1'])
+
+        response = self.client.get(url, {'start': '2026-03-01', 'end': '2026-03-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['points'], [
+            {'at': '2026-03-01T00:00:00+00:00', 'quantity': 50, 'price': '5.00'},
+        ])
+        self.assertEqual(self.client.get(url, {'start': '2026-04-01', 'end': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('product_history_api', args=['NOPE'])).status_code, 404)
+
+    def test_snapshot_inventory_command(self):
+        """The command should snapshot inline, or queue one job per owner with --background"""
+        call_command('snapshot_inventory', stdout=io.StringIO())
+        self.assertEqual(StockHistory.objects.filter(product=self.product).count(), 1)
+
+        call_command('snapshot_inventory', '--background', stdout=io.StringIO())
+        job = Job.objects.get(name='snapshot_inventory', owner=self.user)
+        self.assertEqual(jobs.run(jobs.claim('test')), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'products': 1})
+
+
+class StockMovementTests(TestCase):
+    """Test the atomic stock ledger"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.socks, self.shoes = make_products(self.user, 2, quantity=20)
+        InventoryStats.rebuild(self.user.pk)
+        self.client.login(username='owner', password='testpass123')
+
+    def test_movement_adjusts_quantity_and_records_ledger(self):
+        """A sale should decrement stock and write a ledger line"""
+        movement = apply_movement(self.user, self.socks.pk, StockMovement.SALE, -15)
+
+        self.socks.refresh_from_db()
+        self.assertEqual(self.socks.quantity, 5)
+        self.assertEqual(movement.quantity_after, 5)
+        self.assertEqual(StockMovement.objects.get().delta, -15)
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).low_stock, 1)
+
+    def test_save_after_refresh_diffs_against_fresh_values(self):
+        """A refreshed product's save should not count a movement's stock change again"""
+        self.socks.quantity = 5
+        self.socks.save()
+        apply_movement(self.user, self.socks.pk, StockMovement.RECEIPT, 10)
+
+        self.socks.refresh_from_db()
+        self.socks.name = 'Renamed socks'
+        self.socks.save()
+
+        stats = InventoryStats.objects.get(pk=self.user.pk)
+        live = Product.objects.filter(owner=self.user).stock_summary()
+        self.assertEqual((stats.low_stock, stats.out_of_stock), (live['low_stock'], live['out_of_stock']))
+
+    def test_stock_never_goes_negative(self):
+        """Selling more than is in stock should be refused"""
+        with self.assertRaises(InsufficientStock):
+            apply_movement(self.user, self.socks.pk, StockMovement.SALE, -21)
+
+        self.socks.refresh_from_db()
+        self.assertEqual(self.socks.quantity, 20)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_batch_is_all_or_nothing(self):
+        """One failing movement should roll back the whole batch"""
+        with self.assertRaises(InsufficientStock):
+            apply_movements(self.user, [
+                {'product_id': self.socks.pk, 'kind': StockMovement.RECEIPT, 'delta': 10},
+                {'product_id': self.shoes.pk, 'kind': StockMovement.SALE, 'delta': -50},
+            ])
+
+        self.socks.refresh_from_db()
+        self.assertEqual(self.socks.quantity, 20)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_batch_api(self):
+        """The batch endpoint should apply many movements in one request"""
+        url = reverse('stock_movements_api')
+        payload = {'movements': [
+            {'sku': self.socks.sku, 'kind': 'receipt', 'delta': 5},
+            {'product_id': self.shoes.pk, 'kind': 'sale', 'delta': -2, 'note': 'till 3'},
+        ] + [{'sku': self.socks.sku, 'kind': 'sale', 'delta': -1}] * 25}
+
+        response = self.client.post(url, json.dumps(payload), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['applied'], 27)
+        self.socks.refresh_from_db()
+        self.assertEqual(self.socks.quantity, 20 + 5 - 25)
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).out_of_stock, 1)
+
+    def test_batch_api_rejects_invalid_entries(self):
+        """Bad kinds/signs/SKUs should be reported by index and nothing applied"""
+        payload = {'movements': [
+            {'sku': self.socks.sku, 'kind': 'receipt', 'delta': -5},
+            {'sku': 'NOPE', 'kind': 'sale', 'delta': -1},
+        ]}
+        response = self.client.post(
+            reverse('stock_movements_api'), json.dumps(payload), content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.json()['errors']], [0, 1])
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_batch_api_insufficient_stock_is_conflict(self):
+        """Overselling through the API should answer 409"""
+        payload = {'movements': [{'sku': self.socks.sku, 'kind': 'sale', 'delta': -99}]}
+        response = self.client.post(
+            reverse('stock_movements_api'), json.dumps(payload), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_stock_view(self):
+        """The stock page should record a movement and show it"""
+        url = reverse('product_stock_view', args=[self.socks.pk])
+        response = self.client.post(url, {'kind': 'receipt', 'delta': 7, 'note': 'PO 12'})
+        self.assertRedirects(response, url)
+
+        response = self.client.get(url)
+        self.assertContains(response, 'PO 12')
+        self.assertEqual(response.context['product'].quantity, 27)
+
+
+class BulkActionTests(TestCase):
+    """Test the bulk actions on the product list and in the admin"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.products = make_products(self.user, 5, quantity=10)
+        self.foreign = make_products(self.other, 1, quantity=10)[0]
+        for owner in (self.user, self.other):
+            InventoryStats.rebuild(owner.pk)
+            reports.rebuild(owner.pk)
+        get_search_backend().reindex()
+        self.client.login(username='owner', password='testpass123')
+        self.url = reverse('product_bulk_view')
+
+    def post(self, action, value='', products=None):
+        if products is None:
+            products = [p.pk for p in self.products[:3]] + [self.foreign.pk]
+        return self.client.post(self.url, {'action': action, 'value': value, 'products': products, 'next': '/products/?sort=name'})
+
+    def assertBookkeepingMatchesTable(self):
+        stats = InventoryStats.objects.get(pk=self.user.pk)
+        live = Product.objects.filter(owner=self.user).stock_summary()
+        self.assertEqual(
+            (stats.total_products, stats.low_stock, stats.out_of_stock),
+            (live['total_products'], live['low_stock'], live['out_of_stock']),
+        )
+        rollups = lambda: (
+            OwnerValuation.objects.filter(pk=self.user.pk).values_list('products', 'units', 'stock_value').get(),
+            set(SupplierValuation.objects.filter(owner=self.user, products__gt=0)
+                .values_list('supplier_id', 'products', 'units', 'stock_value')),
+        )
+        maintained = rollups()
+        reports.rebuild(self.user.pk)
+        self.assertEqual(maintained, rollups())
+
+    def test_price_actions_touch_only_the_owners_selection(self):
+        """Set / adjust price should update the ticked products of this owner only"""
+        response = self.post('set_price', '4.00')
+        self.assertRedirects(response, '/products/?sort=name', fetch_redirect_response=False)
+        self.post('adjust_price', '12.5')
+
+        prices = dict(Product.objects.values_list('pk', 'price'))
+        self.assertEqual([prices[p.pk] for p in self.products], [Decimal('4.50')] * 3 + [Decimal('13.00'), Decimal('14.00')])
+        self.assertEqual(prices[self.foreign.pk], self.foreign.price)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).version, 3)
+        self.assertEqual(Product.objects.get(pk=self.foreign.pk).version, 1)
+        self.assertBookkeepingMatchesTable()
+
+    def test_quantity_and_reorder_level_keep_counters_and_ledger(self):
+        """Quantity and reorder level changes should shift the counters and write adjustments"""
+        self.post('set_reorder_level', '5')
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).low_stock, 2)
+        self.post('adjust_quantity', '-10')
+
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).out_of_stock, 3)
+        movements = StockMovement.objects.filter(owner=self.user)
+        self.assertEqual(movements.count(), 3)
+        self.assertEqual(
+            {(m.kind, m.delta, m.quantity_after) for m in movements}, {(StockMovement.ADJUSTMENT, -10, 0)},
+        )
+        self.assertEqual(StockAlert.objects.filter(product__owner=self.user).count(), 3)
+        self.assertBookkeepingMatchesTable()
+
+    def test_short_stock_changes_nothing(self):
+        """An adjustment taking any product below zero should leave every product alone"""
+        Product.objects.filter(pk=self.products[1].pk).update(quantity=3)
+        response = self.post('adjust_quantity', '-5')
+
+        self.assertIn('Not enough stock', str(list(response.wsgi_request._messages)[0]))
+        self.assertEqual(
+            list(Product.objects.filter(pk__in=[p.pk for p in self.products[:3]]).order_by('pk').values_list('quantity', flat=True)),
+            [10, 3, 10],
+        )
+        self.assertFalse(StockMovement.objects.exists())
+        with self.assertRaises(InsufficientStock):
+            from .bulk import apply_action
+            apply_action(self.user, [self.products[1].pk], 'adjust_quantity', -5)
+
+    def test_price_past_the_column_changes_nothing(self):
+        """An increase pricing any product above what the column holds should leave every product alone"""
+        Product.objects.filter(pk=self.products[1].pk).update(price=Decimal('60000000.00'))
+        response = self.post('adjust_price', '100')
+
+        self.assertIn('above 99999999.99', str(list(response.wsgi_request._messages)[0]))
+        self.assertEqual(
+            list(Product.objects.filter(pk__in=[p.pk for p in self.products[:3]]).order_by('pk').values_list('price', 'version')),
+            [(self.products[0].price, 1), (Decimal('60000000.00'), 1), (self.products[2].price, 1)],
+        )
+        with self.assertRaises(bulk.PriceOutOfRange):
+            bulk.apply_action(self.user, [self.products[1].pk], bulk.ADJUST_PRICE, Decimal('70'))
+        self.assertEqual(bulk.apply_action(self.user, [self.products[1].pk], bulk.ADJUST_PRICE, Decimal('60')), 1)
+
+    def test_set_supplier_reindexes_search(self):
+        """Moving products to another supplier should reach the rollups and search"""
+        self.post('set_supplier', 'ACME ')
+
+        self.assertEqual(Product.objects.filter(owner=self.user, supplier__name='ACME').count(), 3)
+        self.assertEqual(len(search_products(self.user, 'acme', 10)), 3)
+        self.assertEqual(search_products(self.other, 'acme', 10), [])
+        self.assertBookkeepingMatchesTable()
+
+    def test_delete_removes_products_and_their_rows(self):
+        """Bulk delete should remove the owner's ticked products, their ledger and search rows"""
+        apply_movement(self.user, self.products[0].pk, StockMovement.SALE, -10)
+        self.post('delete')
+
+        self.assertEqual(Product.objects.filter(owner=self.user).count(), 2)
+        self.assertTrue(Product.objects.filter(pk=self.foreign.pk).exists())
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertFalse(StockAlert.objects.exists())
+        self.assertEqual(search_products(self.user, 'product', 10)[0].pk, self.products[3].pk)
+        self.assertBookkeepingMatchesTable()
+
+    def test_delete_refuses_unknown_relations(self):
+        """A reference to Product the set-based delete doesn't know about should stop it"""
+        relation = StockAlert._meta.get_field('product').remote_field
+        with mock.patch.object(relation, 'on_delete', models.PROTECT):
+            with self.assertRaisesMessage(ValueError, 'StockAlert.product (PROTECT)'):
+                bulk.apply_action(self.user, [self.products[0].pk], bulk.DELETE)
+        self.assertTrue(Product.objects.filter(pk=self.products[0].pk).exists())
+
+    def test_every_action_changes_the_api_etag(self):
+        """Conditional GETs of the API should not answer 304 after any bulk action"""
+        product = self.products[0]
+        url = reverse('product_detail_api', args=[product.pk])
+        for action, value in [
+            (bulk.SET_PRICE, Decimal('99')), (bulk.ADJUST_PRICE, Decimal('10')), (bulk.SET_SUPPLIER, 'Acme'),
+            (bulk.SET_REORDER_LEVEL, 3), (bulk.ADJUST_QUANTITY, 1), (bulk.DELETE, None),
+        ]:
+            with self.subTest(action=action):
+                etag = self.client.get(url)['ETag']
+                bulk.apply_action(self.user, [product.pk], action, value)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertNotEqual(response.status_code, 304)
+                self.assertNotEqual(response.get('ETag'), etag)
+
+    def test_invalid_requests_change_nothing(self):
+        """A bad value, no selection or a GET should be turned away"""
+        response = self.post('set_price', 'cheap')
+        self.assertIn('Enter a number.', str(list(response.wsgi_request._messages)[0]))
+        self.post('adjust_quantity', '0')
+        self.post('set_price', '1.00', products=[])
+        self.assertEqual(Product.objects.filter(version__gt=1).count(), 0)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_admin_actions(self):
+        """The admin's actions and "delete selected" should use the same bulk paths"""
+        User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:invApp_product_changelist')
+        selected = [self.products[0].pk, self.foreign.pk]
+
+        self.client.post(url, {'action': 'set_reorder_level', 'value': '15', '_selected_action': selected})
+        self.assertEqual(
+            list(Product.objects.filter(pk__in=selected).values_list('reorder_level', flat=True)), [15, 15],
+        )
+        self.assertEqual(InventoryStats.objects.get(pk=self.other.pk).low_stock, 1)
+
+        self.client.post(url, {'action': 'delete_selected', 'post': 'yes', '_selected_action': selected})
+        self.assertFalse(Product.objects.filter(pk__in=selected).exists())
+        self.assertEqual(InventoryStats.objects.get(pk=self.other.pk).total_products, 0)
+        self.assertBookkeepingMatchesTable()
+
+
+class FakeAlertBackend:
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, alerts):
+        if self.fail:
+            raise ConnectionError('webhook down')
+        self.sent.extend(alerts)
+
+
+class StockAlertTests(TestCase):
+    """Test low-stock alert detection and the delivery outbox"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123', email='owner@example.com')
+        self.socks, self.shoes = make_products(self.user, 2, quantity=20)
+        InventoryStats.rebuild(self.user.pk)
+        self.client.login(username='owner', password='testpass123')
+
+    def test_crossing_the_reorder_level_raises_one_alert(self):
+        """Only the movement that crosses the level (or reaches zero) should alert"""
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -8)   # 12: above the level
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -4)   # 8: crosses 10
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -3)   # 5: still low
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -5)   # 0: out
+        apply_movement(self.user, self.socks.pk, StockMovement.RECEIPT, 3) # 3: restocked, still low
+
+        alerts = list(StockAlert.objects.order_by('pk').values_list('kind', 'quantity'))
+        self.assertEqual(alerts, [(StockAlert.LOW_STOCK, 8), (StockAlert.OUT_OF_STOCK, 0)])
+
+    def test_per_product_reorder_level(self):
+        """Each product's own level should drive both the alerts and the dashboard count"""
+        Product.objects.filter(pk=self.shoes.pk).update(reorder_level=18)
+        InventoryStats.rebuild(self.user.pk)
+
+        apply_movements(self.user, [
+            {'product_id': self.socks.pk, 'kind': StockMovement.SALE, 'delta': -3},
+            {'product_id': self.shoes.pk, 'kind': StockMovement.SALE, 'delta': -3},
+        ])
+
+        self.assertEqual(list(StockAlert.objects.values_list('product_id', flat=True)), [self.shoes.pk])
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).low_stock, 1)
+        self.assertEqual(Product.objects.filter(owner=self.user).stock_summary()['low_stock'], 1)
+
+    def test_form_edits_raise_alerts(self):
+        """Lowering the quantity or raising the level in the edit form should alert"""
+        url = reverse('product_update_view', args=[self.socks.pk])
+        data = {'name': 'Socks', 'sku': self.socks.sku, 'price': '5.00', 'quantity': 20, 'supplier': 'Nike'}
+
+        self.client.post(url, {**data, 'reorder_level': 25, 'version': self.socks.version})
+        self.client.post(url, {**data, 'quantity': 0, 'version': self.socks.version + 1})
+
+        self.socks.refresh_from_db()
+        self.assertEqual(self.socks.reorder_level, 25)  # left blank: kept
+        self.assertEqual(
+            list(StockAlert.objects.order_by('pk').values_list('kind', flat=True)),
+            [StockAlert.LOW_STOCK, StockAlert.OUT_OF_STOCK],
+        )
+        self.assertEqual(InventoryStats.objects.get(pk=self.user.pk).counters(), {
+            'total_products': 2, 'low_stock': 1, 'out_of_stock': 1,
+        })
+
+    def test_import_raises_alerts_for_updated_rows(self):
+        """An import that lowers existing stock should alert; new products should not"""
+        csv = f"name,sku,price,quantity,supplier\nSocks,{self.socks.sku},5.00,4,Nike\nHat,H1,9.00,0,Nike\n"
+        import_file(self.user, io.BytesIO(csv.encode()), 'catalog.csv')
+
+        alert = StockAlert.objects.get()
+        self.assertEqual((alert.product_id, alert.kind, alert.quantity), (self.socks.pk, StockAlert.LOW_STOCK, 4))
+
+    def test_delivery_marks_alerts_delivered(self):
+        """Delivered alerts should leave the pending outbox"""
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -20)
+        apply_movement(self.user, self.shoes.pk, StockMovement.SALE, -15)
+        backend = FakeAlertBackend()
+
+        self.assertEqual(deliver_pending(batch_size=1, backends=[backend]), (1, 0))
+        self.assertEqual(deliver_pending(batch_size=1, backends=[backend]), (1, 0))
+        self.assertEqual(deliver_pending(batch_size=1, backends=[backend]), (0, 0))
+
+        self.assertEqual([a.product_id for a in backend.sent], [self.socks.pk, self.shoes.pk])
+        self.assertFalse(StockAlert.objects.pending().exists())
+
+    def test_failed_delivery_is_retried_later(self):
+        """A failing backend should record the error and push the alert back"""
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -20)
+
+        with self.assertLogs('inventory.alerts', 'ERROR'):
+            self.assertEqual(deliver_pending(backends=[FakeAlertBackend(fail=True)]), (0, 1))
+
+        alert = StockAlert.objects.get()
+        self.assertIsNone(alert.delivered_at)
+        self.assertEqual(alert.attempts, 1)
+        self.assertIn('webhook down', alert.last_error)
+        # not due again until the back-off has passed
+        self.assertEqual(deliver_pending(backends=[FakeAlertBackend()]), (0, 0))
+
+    @override_settings(INVENTORY_ALERT_MAX_ATTEMPTS=2)
+    def test_alert_fails_after_the_last_attempt(self):
+        """An alert out of attempts should be marked failed, and the admin should be able to retry it"""
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -20)
+        alert = StockAlert.objects.get()
+
+        with self.assertLogs('inventory.alerts', 'ERROR'):
+            deliver_pending(backends=[FakeAlertBackend(fail=True)])
+            StockAlert.objects.update(next_attempt_at=timezone.now())
+            deliver_pending(backends=[FakeAlertBackend(fail=True)])
+
+        alert.refresh_from_db()
+        self.assertEqual((alert.status, alert.attempts), (StockAlert.FAILED, 2))
+        self.assertFalse(StockAlert.objects.pending().exists())
+
+        admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(admin)
+        changelist = reverse('admin:invApp_stockalert_changelist')
+        response = self.client.get(changelist, {'status__exact': 'failed'})
+        self.assertEqual(list(response.context['cl'].result_list), [alert])
+        self.client.post(changelist, {'action': 'retry', '_selected_action': [alert.pk]})
+        self.assertEqual(deliver_pending(backends=[FakeAlertBackend()]), (1, 0))
+        alert.refresh_from_db()
+        self.assertEqual(alert.status, StockAlert.DELIVERED)
+
+    @override_settings(INVENTORY_ALERT_MAX_ATTEMPTS=2)
+    def test_claimed_alert_out_of_attempts_is_failed(self):
+        """An alert whose last claim was never reported back should fail rather than stay pending"""
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -20)
+        StockAlert.objects.update(attempts=2)
+
+        self.assertEqual(deliver_pending(backends=[FakeAlertBackend()]), (0, 0))
+        self.assertEqual(StockAlert.objects.get().status, StockAlert.FAILED)
+
+    def test_email_backend_groups_by_owner(self):
+        """The email backend should send one message per owner per batch"""
+        apply_movements(self.user, [
+            {'product_id': self.socks.pk, 'kind': StockMovement.SALE, 'delta': -20},
+            {'product_id': self.shoes.pk, 'kind': StockMovement.SALE, 'delta': -12},
+        ])
+
+        deliver_pending(backends=[EmailBackend()])
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['owner@example.com'])
+        self.assertIn(self.shoes.sku, mail.outbox[0].body)
+
+    @override_settings(INVENTORY_ALERT_BACKENDS=['invApp.alerts.LoggingBackend'])
+    def test_deliver_alerts_command(self):
+        """deliver_alerts --once should drain the outbox through the configured backends"""
+        apply_movement(self.user, self.socks.pk, StockMovement.SALE, -20)
+        out = io.StringIO()
+
+        with self.assertLogs('inventory.alerts', 'WARNING') as logs:
+            call_command('deliver_alerts', '--once', stdout=out)
+
+        self.assertIn('Out of stock', logs.output[0])
+        self.assertIn('Delivered 1 alert(s)', out.getvalue())
+        self.assertFalse(StockAlert.objects.pending().exists())
+
+
+class JobQueueTests(TestCase):
+    """Test the DB-backed background job queue"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+        files_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(files_dir.cleanup)
+        self.enterContext(override_settings(INVENTORY_JOB_FILES_DIR=files_dir.name))
+        self.calls = []
+
+        @jobs.task('test_flaky', max_attempts=2)
+        def flaky(job, fail_times=0, permanent=False):
+            self.calls.append(job.pk)
+            if permanent:
+                raise jobs.PermanentError('bad input')
+            if len(self.calls) <= fail_times:
+                raise ConnectionError('try again')
+            job.progress(1, 2, 'halfway')
+            return {'calls': len(self.calls)}
+        self.addCleanup(jobs.TASKS.pop, 'test_flaky')
+
+    def test_job_runs_and_records_result(self):
+        """A claimed job should run once and store its result"""
+        job = jobs.enqueue('test_flaky', self.user)
+
+        self.assertEqual(jobs.run_next().pk, job.pk)
+        self.assertIsNone(jobs.run_next())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.result), (Job.SUCCEEDED, 100, {'calls': 1}))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """A failure should requeue the job for later, up to max_attempts"""
+        job = jobs.enqueue('test_flaky', self.user, fail_times=1)
+
+        with self.assertLogs('inventory.jobs', 'WARNING'):
+            jobs.run_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('ConnectionError', job.error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(jobs.run_next())  # not due yet
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.run_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.SUCCEEDED, 2))
+
+    def test_permanent_and_exhausted_failures(self):
+        """PermanentError and the last allowed attempt should fail the job for good"""
+        permanent = jobs.enqueue('test_flaky', self.user, permanent=True)
+        exhausted = jobs.enqueue('test_flaky', self.user, fail_times=5)
+
+        with self.assertLogs('inventory.jobs', 'WARNING'):
+            jobs.run_next()
+            jobs.run_next()
+            Job.objects.filter(pk=exhausted.pk).update(run_after=timezone.now())
+            jobs.run_next()
+
+        permanent.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((permanent.status, permanent.attempts, permanent.error), (Job.FAILED, 1, 'bad input'))
+        self.assertEqual((exhausted.status, exhausted.attempts), (Job.FAILED, 2))
+        self.assertEqual(exhausted.error_summary, 'ConnectionError: try again')
+
+    def test_claim_is_exclusive_and_stale_jobs_come_back(self):
+        """A job is claimed once; a dead worker's job is requeued after its lease"""
+        job = jobs.enqueue('test_flaky', self.user)
+
+        self.assertEqual(jobs.claim('worker-1').pk, job.pk)
+        self.assertIsNone(jobs.claim('worker-2'))
+
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim('worker-2').pk, job.pk)
+
+    @override_settings(INVENTORY_IMPORT_INLINE_MAX_BYTES=10)
+    def test_large_import_runs_in_the_background(self):
+        """Uploads over the inline limit should be queued and reported on the job page"""
+        upload = SimpleUploadedFile('catalog.csv', ProductImportTests.CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('product_import_view'), {'file': upload})
+
+        job = Job.objects.get(name='import_products')
+        self.assertRedirects(response, reverse('job_detail_view', args=[job.pk]))
+        self.assertFalse(Product.objects.exists())
+
+        jobs.run_next()
+
+        self.assertEqual(Product.objects.filter(owner=self.user).count(), 2)
+        self.assertFalse(jobs.files().exists(job.payload['path']))
+        response = self.client.get(reverse('job_detail_view', args=[job.pk]))
+        self.assertContains(response, 'Import report')
+        self.assertNotContains(response, 'http-equiv="refresh"')
+
+    @override_settings(INVENTORY_IMPORT_INLINE_MAX_BYTES=10)
+    def test_failed_import_keeps_its_file_only_for_retries(self):
+        """The uploaded file should survive a retried failure and go with the last one"""
+        upload = SimpleUploadedFile('catalog.csv', ProductImportTests.CSV.encode(), content_type='text/csv')
+        self.client.post(reverse('product_import_view'), {'file': upload})
+        job = Job.objects.get(name='import_products')
+
+        with mock.patch('invApp.importers.import_products', side_effect=ConnectionError('try again')):
+            with self.assertLogs('inventory.jobs', 'WARNING'):
+                for attempt in range(job.max_attempts):
+                    self.assertTrue(jobs.files().exists(job.payload['path']))
+                    Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+                    jobs.run_next()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, job.max_attempts))
+        self.assertFalse(jobs.files().exists(job.payload['path']))
+
+    def test_background_export_can_be_downloaded(self):
+        """A POSTed export should be written by a job and downloadable when done"""
+        make_products(self.user, 3, supplier='Acme')
+        response = self.client.post(reverse('product_export_view') + '?format=csv&supplier=Acme')
+        job = Job.objects.get(name='export_products')
+        self.assertRedirects(response, reverse('job_detail_view', args=[job.pk]))
+        self.assertContains(self.client.get(response.url), 'http-equiv="refresh"')
+
+        jobs.run_next()
+
+        response = self.client.get(reverse('job_download_view', args=[job.pk]))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(self.client.get(reverse('job_detail_api', args=[job.pk])).json()['result']['rows'], 3)
+
+    def test_jobs_are_private_to_their_owner(self):
+        """Another user's job should be a 404 everywhere"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        job = jobs.enqueue('test_flaky', other)
+
+        self.assertEqual(self.client.get(reverse('job_detail_view', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('job_download_view', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('job_detail_api', args=[job.pk])).status_code, 404)
+
+    def test_alerts_queue_a_single_delivery_job(self):
+        """Raising alerts should queue one deliver_alerts job that drains them all"""
+        socks, shoes = make_products(self.user, 2, quantity=20)
+        apply_movement(self.user, socks.pk, StockMovement.SALE, -20)
+        apply_movement(self.user, shoes.pk, StockMovement.SALE, -20)
+        self.assertEqual(Job.objects.filter(name='deliver_alerts', status=Job.QUEUED).count(), 1)
+
+        with self.assertLogs('inventory.alerts', 'WARNING'):
+            jobs.run_next()
+
+        self.assertEqual(Job.objects.get(name='deliver_alerts').result, {'delivered': 2, 'failed': 0})
+        self.assertFalse(StockAlert.objects.pending().exists())
+
+
+class RunWorkerCommandTests(TransactionTestCase):
+    """Test manage.py run_worker (its threads need committed data)"""
+
+    def test_run_worker_drains_the_queue(self):
+        """--once should run every due job on the thread pool and exit"""
+        user = User.objects.create_user(username='owner', password='testpass123')
+        for _ in range(3):
+            jobs.enqueue('deliver_alerts', user)
+        out = io.StringIO()
+
+        call_command('run_worker', '--once', '--threads', '1', stdout=out)
+
+        self.assertIn('3 succeeded', out.getvalue())
+        self.assertFalse(Job.objects.exclude(status=Job.SUCCEEDED).exists())
+
+
+class ProductSearchTests(TestCase):
+    """Test the per-owner full-text search"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+
+        for owner, name, sku, supplier in [
+            (self.user, 'Running Socks', 'RS-01', 'Nike'),
+            (self.user, 'Socks Pack', 'SP-02', 'Adidas'),
+            (self.user, 'Running Shoes', 'SH-03', 'Nike'),
+            (self.other, 'Running Socks', 'RS-01', 'Nike'),
+        ]:
+            Product.objects.create(
+                owner=owner, name=name, sku=sku, price=1, quantity=1,
+                supplier=Supplier.objects.named(owner.pk, supplier),
+            )
+
+    def names(self, text):
+        return [p.name for p in search_products(self.user, text, 10)]
+
+    def test_matches_name_sku_and_supplier_prefixes(self):
+        """Every term should match a prefix of name, SKU or supplier"""
+        self.assertEqual(set(self.names('sock')), {'Running Socks', 'Socks Pack'})
+        self.assertEqual(self.names('nike sock'), ['Running Socks'])
+        self.assertEqual(self.names('sp-02'), ['Socks Pack'])
+
+    def test_results_are_scoped_to_owner(self):
+        """Another owner's identical product should never show up"""
+        ids = [p.pk for p in search_products(self.user, 'running socks', 10)]
+        self.assertEqual(Product.objects.filter(pk__in=ids, owner=self.other).count(), 0)
+
+    def test_index_follows_saves_and_deletes(self):
+        """Renaming or deleting a product should update the index"""
+        product = Product.objects.get(owner=self.user, sku='SH-03')
+        product.name = 'Trail Boots'
+        product.save()
+        self.assertEqual(self.names('boots'), ['Trail Boots'])
+        self.assertEqual(self.names('shoes'), [])
+
+        product.delete()
+        self.assertEqual(self.names('boots'), [])
+
+    def test_imported_products_are_indexed(self):
+        """Bulk imports bypass the signals but must still be searchable"""
+        import_file(self.user, io.BytesIO(b"name,sku,price,quantity,supplier\nWool Hat,WH1,3,4,Puma\n"), 'x.csv')
+        self.assertEqual(self.names('wool'), ['Wool Hat'])
+
+    def test_reindex_rebuilds_owner(self):
+        """reindex() should restore an owner's rows from the table"""
+        backend = get_search_backend()
+        backend.remove(Product.objects.filter(owner=self.user).values_list('pk', flat=True))
+        self.assertEqual(self.names('sock'), [])
+
+        backend.reindex(self.user.pk)
+        self.assertEqual(len(self.names('sock')), 2)
+
+    def test_search_view(self):
+        """The search page should list ranked matches"""
+        response = self.client.get(reverse('product_search_view'), {'q': 'running'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), 2)
+        self.assertContains(response, 'Running Shoes')
+
+
+class SupplierTests(TestCase):
+    """Test the per-owner supplier records, autocomplete and supplier list"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='owner', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='owner', password='testpass123')
+
+    def test_names_differing_in_case_or_spacing_are_one_supplier(self):
+        """'Acme  Ltd' and 'acme ltd' should resolve to the same row, per owner"""
+        ids = Supplier.objects.resolve(self.user.pk, ['Acme  Ltd', 'acme ltd', 'Beta'])
+        self.assertEqual(ids['Acme  Ltd'], ids['acme ltd'])
+        self.assertEqual(Supplier.objects.named(self.user.pk, ' ACME LTD').pk, ids['acme ltd'])
+        self.assertEqual(Supplier.objects.get(pk=ids['acme ltd']).name, 'Acme Ltd')
+        self.assertNotEqual(Supplier.objects.named(self.other.pk, 'Acme Ltd').pk, ids['Acme  Ltd'])
+
+    def test_form_and_import_reuse_suppliers(self):
+        """Products typed or imported with another spelling should share the supplier"""
+        self.client.post(reverse('product_create_view'), {
+            'name': 'Socks', 'sku': 'S1', 'price': '5.00', 'quantity': 5, 'supplier': 'Nike',
+        })
+        import_file(self.user, io.BytesIO(b"name,sku,price,quantity,supplier\nHat,H1,3,4,NIKE\nCap,C1,3,4,Puma\n"), 'x.csv')
+        self.assertEqual(
+            sorted(Supplier.objects.filter(owner=self.user).values_list('name', flat=True)), ['Nike', 'Puma'],
+        )
+
+        socks = Product.objects.get(sku='S1')
+        self.client.post(reverse('product_update_view', args=[socks.pk]), {
+            'name': 'Socks', 'sku': 'S1', 'price': '5.00', 'quantity': 5, 'supplier': 'Puma',
+            'version': socks.version,
+        })
+        socks.refresh_from_db()
+        self.assertEqual(socks.supplier.name, 'Puma')
+        self.assertEqual(Product.objects.filter(owner=self.user, supplier__key='puma').count(), 2)
+
+    def test_list_filter_matches_any_spelling(self):
+        """The product list's supplier filter should go through the normalized key"""
+        make_products(self.user, 6)
+        response = self.client.get(reverse('product_list_view'), {'supplier': '  SUPPLIER 2 '})
+        self.assertEqual(len(response.context['products']), 2)
+
+    def test_rename_reaches_products_and_search(self):
+        """Renaming a supplier should show in its products and their search rows"""
+        make_products(self.user, 3, supplier='Nike')
+        supplier = Supplier.objects.get(owner=self.user)
+        supplier.name = 'Reebok'
+        supplier.save()
+        self.assertEqual(len(search_products(self.user, 'reebok', 10)), 3)
+        self.assertEqual(search_products(self.user, 'nike', 10), [])
+
+    def test_rename_changes_the_api_etag(self):
+        """A renamed supplier should not be answered with 304 for the old ETag"""
+        self.client.post(reverse('product_create_view'), {
+            'name': 'Socks', 'sku': 'S1', 'price': '5.00', 'quantity': 5, 'supplier': 'Acme',
+        })
+        url = reverse('product_sku_api', args=['S1'])
+        etag = self.client.get(url)['ETag']
+
+        supplier = Supplier.objects.get(owner=self.user)
+        supplier.name = 'Acme Renamed'
+        supplier.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['supplier'], 'Acme Renamed')
+
+    def test_deleting_the_owner_removes_suppliers(self):
+        """A supplier with products can't be deleted on its own, but goes with its owner"""
+        make_products(self.user, 2, supplier='Nike')
+        with self.assertRaises(RestrictedError):
+            Supplier.objects.get(owner=self.user).delete()
+        self.user.delete()
+        self.assertFalse(Supplier.objects.filter(owner_id=self.user.pk).exists())
+
+    def test_autocomplete_matches_prefixes(self):
+        """The autocomplete should return the owner's names starting with the text"""
+        Supplier.objects.resolve(self.user.pk, ['Acorn Foods', 'acme', 'Beta'])
+        Supplier.objects.named(self.other.pk, 'Acme Other')
+        url = reverse('supplier_autocomplete_api')
+
+        self.assertEqual(self.client.get(url, {'q': 'AC'}).json(), {'results': ['acme', 'Acorn Foods']})
+        self.assertEqual(self.client.get(url, {'q': 'acz'}).json(), {'results': []})
+        self.client.logout()
+        self.assertEqual(self.client.get(url, {'q': 'ac'}).status_code, 401)
+
+    def test_supplier_list_shows_totals(self):
+        """The supplier list should page through names with each one's stock totals"""
+        make_products(self.user, 9)
+        Supplier.objects.named(self.user.pk, 'Zeta')
+
+        response = self.client.get(reverse('supplier_list_view'))
+        rows = {supplier.name: totals for supplier, totals in response.context['suppliers']}
+        self.assertEqual(list(rows), ['Supplier 0', 'Supplier 1', 'Supplier 2', 'Zeta'])
+        self.assertEqual(rows['Supplier 1'][0], 3)
+        self.assertEqual(tuple(rows['Zeta']), (0, 0, 0))
+
+        response = self.client.get(reverse('supplier_list_view'), {'q': 'sup', 'after': 'supplier 0'})
+        self.assertEqual([s.name for s, _ in response.context['suppliers']], ['Supplier 1', 'Supplier 2'])
+
+        with override_settings(INVENTORY_VALUATION_ROLLUPS=False):
+            live = self.client.get(reverse('supplier_list_view'))
+        self.assertEqual(
+            [tuple(t) for _, t in live.context['suppliers']],
+            [tuple(t) for _, t in self.client.get(reverse('supplier_list_view')).context['suppliers']],
+        )
+
+
+class SeedInventoryTests(TestCase):
+    """Test the synthetic tenant generator"""
+
+    def seed(self, *args):
+        call_command('seed_inventory', *args, stdout=io.StringIO())
+
+    def test_seeds_users_and_products(self):
+        """Users should get the requested sizes, with counters and search in place"""
+        self.seed('--users', '3', '--sizes', '4,30', '--prefix', 'load')
+
+        users = User.objects.filter(username__startswith='load-').order_by('username')
+        self.assertEqual([u.username for u in users], ['load-0001', 'load-0002', 'load-0003'])
+        self.assertEqual([Product.objects.filter(owner=u).count() for u in users], [4, 30, 4])
+        self.assertTrue(self.client.login(username='load-0002', password='seedpass123'))
+
+        stats = InventoryStats.objects.get(pk=users[1].pk)
+        self.assertEqual(stats.total_products, 30)
+        product = Product.objects.filter(owner=users[1]).first()
+        self.assertIn(product, search_products(users[1], product.sku, limit=10))
+
+    def test_is_reproducible(self):
+        """The same --seed should generate the same catalogue"""
+        self.seed('--users', '1', '--products', '20', '--seed', '7')
+        first = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'quantity', 'supplier__name'))
+
+        self.seed('--users', '1', '--products', '20', '--seed', '7', '--replace')
+        second = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'quantity', 'supplier__name'))
+        self.assertEqual(first, second)
+
+    def test_refuses_to_overwrite_without_replace(self):
+        """Existing users with the prefix should not be clobbered silently"""
+        self.seed('--users', '1', '--products', '1')
+        with self.assertRaises(CommandError):
+            self.seed('--users', '1', '--products', '1')
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every invApp URL must run a fixed number of queries, whatever the
+    tenant's size, and stay within its latency budget.
+    """
+
+    # URL names covered below; a new URL without a budget fails test_every_url_has_a_budget
+    BUDGETED = {
+        'home_view', 'product_list_view', 'product_create_view', 'product_search_view',
+        'product_import_view', 'product_export_view', 'product_update_view', 'product_delete_view',
+        'product_stock_view', 'cache_stats_view', 'product_list_api', 'product_detail_api',
+        'product_sku_api', 'stock_movements_api', 'job_detail_view', 'job_download_view', 'job_detail_api',
+        'inventory_report_view', 'product_history_api', 'supplier_list_view', 'supplier_autocomplete_api',
+        'product_bulk_view',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenants = []
+        for size in TENANT_SIZES:
+            owner = User.objects.create_user(username=f'tenant{size}', password='testpass123', is_staff=True)
+            seed_tenant(owner, size)
+            cls.tenants.append((size, owner))
+
+    def log_in(self, owner):
+        """Log ``owner`` in and return their oldest product."""
+        self.client.force_login(owner)
+        return Product.objects.filter(owner=owner).order_by('Product_id').first()
+
+    def test_every_url_has_a_budget(self):
+        """Adding a URL to invApp.urls should come with a budget here"""
+        from .urls import urlpatterns
+
+        self.assertEqual({p.name for p in urlpatterns}, self.BUDGETED)
+
+    def test_dashboard(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                # session + user + stats row + latest products
+                self.assertWithinBudget(reverse('home_view'), queries=4, ms=150)
+
+    def test_product_list(self):
+        url = reverse('product_list_view')
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                # session + user + one page of products
+                response = self.assertWithinBudget(url, queries=3, ms=200)
+                self.assertWithinBudget(url, {'sort': 'name', 'per_page': 100}, queries=3, ms=200)
+                self.assertWithinBudget(url, {'supplier': 'Supplier 7', 'min_quantity': 5}, queries=3, ms=300)
+
+                if size > 25:
+                    cursor = response.context['page'].next_cursor
+                    self.assertWithinBudget(url, {'after': cursor}, queries=3, ms=200)
+
+    def test_product_search(self):
+        url = reverse('product_search_view')
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                # session + user + ranked ids + products
+                self.assertWithinBudget(url, {'q': 'product 0000'}, queries=4, ms=300)
+
+    def test_product_create(self):
+        url = reverse('product_create_view')
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                self.assertWithinBudget(url, queries=2, ms=150)
+                # + the new Supplier (lookup, then insert in a savepoint)
+                # + owner valuation + the new supplier's valuation row (update, insert, update)
+                # + the form's transaction around supplier and product (a savepoint here)
+                self.assertWithinBudget(url, {
+                    'name': 'New', 'sku': 'NEW-1', 'price': '1.00', 'quantity': 3, 'supplier': 'Acme',
+                }, method='post', status=302, queries=16, ms=200)
+
+    def test_product_update(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                product = self.log_in(owner)
+                url = reverse('product_update_view', args=[product.pk])
+                self.assertWithinBudget(url, queries=3, ms=150)
+                # + the new Supplier (lookup, then insert in a savepoint)
+                # + the version-checked UPDATE and its signals, in a savepoint of their own
+                # + owner valuation, the old supplier's row and the new one's (update, insert, update)
+                # + the form's transaction around supplier and product (a savepoint here)
+                self.assertWithinBudget(url, {
+                    'name': 'Renamed', 'sku': product.sku, 'price': '2.00', 'quantity': 40, 'supplier': 'Acme',
+                    'version': product.version,
+                }, method='post', status=302, queries=20, ms=200)
+
+    def test_product_delete(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                product = self.log_in(owner)
+                url = reverse('product_delete_view', args=[product.pk])
+                self.assertWithinBudget(url, queries=3, ms=150)
+                # the delete cascades to the product's movements, history and alerts,
+                # then shifts the owner and supplier valuation rows
+                self.assertWithinBudget(url, method='post', status=302, queries=11, ms=200)
+
+    def test_product_bulk(self):
+        url = reverse('product_bulk_view')
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                products = list(Product.objects.filter(owner=owner).order_by('pk').values_list('pk', flat=True)[:10])
+                # session + user + savepoint, read, UPDATE, read back, ledger lines, stats
+                # row, owner valuation + one row per supplier (10 here) + release
+                self.assertWithinBudget(url, {'action': 'adjust_quantity', 'value': 5, 'products': products},
+                                        method='post', status=302, queries=20, ms=300)
+
+    def test_product_stock(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                product = self.log_in(owner)
+                url = reverse('product_stock_view', args=[product.pk])
+                self.assertWithinBudget(url, queries=4, ms=150)
+                # + owner and supplier valuation rows
+                self.assertWithinBudget(url, {'kind': StockMovement.RECEIPT, 'delta': 5, 'note': ''},
+                                        method='post', status=302, queries=11, ms=200)
+
+    def test_product_import(self):
+        url = reverse('product_import_view')
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                self.assertWithinBudget(url, queries=2, ms=150)
+                upload = SimpleUploadedFile(
+                    'products.csv', b'name,sku,price,quantity,supplier\nA,IMP-1,1.00,1,Acme\nB,SKU000001,2.00,2,Acme\n',
+                )
+                # + the batch's suppliers (lookup, insert the new ones, read their ids)
+                # + bumping the version of the updated rows
+                # + the valuation rebuild: grouped totals, then replace the rollup rows atomically
+                self.assertWithinBudget(url, {'file': upload}, method='post', queries=22, ms=300)
+
+    def test_product_export(self):
+        url = reverse('product_export_view')
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                # session + user + one streamed query, whatever the size; time grows with the rows
+                self.assertWithinBudget(url, queries=3, ms=100 + size * 0.05)
+                self.assertWithinBudget(url, {'format': 'ndjson', 'supplier': 'Supplier 3'},
+                                        queries=3, ms=100 + size * 0.05)
+
+    def test_background_export_and_jobs(self):
+        files_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(files_dir.cleanup)
+        self.enterContext(override_settings(INVENTORY_JOB_FILES_DIR=files_dir.name))
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                # session + user + INSERT job: the request never touches the products
+                response = self.assertWithinBudget(reverse('product_export_view'), {'format': 'csv'},
+                                                   method='post', status=302, queries=3, ms=100)
+                job = Job.objects.filter(owner=owner).latest('pk')
+                jobs.run(jobs.claim('test'))
+
+                # session + user + job
+                self.assertWithinBudget(response.url, queries=3, ms=100)
+                self.assertWithinBudget(reverse('job_download_view', args=[job.pk]), queries=3, ms=100 + size * 0.01)
+                self.assertWithinBudget(reverse('job_detail_api', args=[job.pk]), queries=3, ms=100)
+
+    def test_inventory_report(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                # session + user + owner totals + top suppliers + top products, whatever the size
+                self.assertWithinBudget(reverse('inventory_report_view'), queries=5, ms=150)
+                self.assertWithinBudget(reverse('inventory_report_view'), {'top': 100}, queries=5, ms=200)
+
+    def test_suppliers(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                # session + user + one page of suppliers + owner totals + their rollup rows
+                self.assertWithinBudget(reverse('supplier_list_view'), queries=5, ms=150)
+                self.assertWithinBudget(reverse('supplier_list_view'), {'q': 'supplier 1'}, queries=5, ms=150)
+                # session + user + a range of the (owner, key) index
+                self.assertWithinBudget(reverse('supplier_autocomplete_api'), {'q': 'sup'}, queries=3, ms=100)
+
+    def test_cache_stats(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                self.log_in(owner)
+                self.assertWithinBudget(reverse('cache_stats_view'), queries=2, ms=100)
+
+    def test_api_reads(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                product = self.log_in(owner)
+                # session + user + stats row + products
+                self.assertWithinBudget(reverse('product_list_api'), queries=4, ms=150)
+                self.assertWithinBudget(reverse('product_detail_api', args=[product.pk]), queries=4, ms=100)
+                self.assertWithinBudget(reverse('product_sku_api', args=[product.sku]), queries=4, ms=100)
+
+    def test_api_history(self):
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                product = self.log_in(owner)
+                month, index = history.slot(timezone.now(), history.STEPS['day'])
+                StockHistory.objects.get_or_create(product=product, month=month, step=history.STEPS['day'], defaults={
+                    'owner': owner, 'first_slot': 0, 'last_slot': index,
+                    'quantity': product.quantity, 'price': product.price,
+                    'changes': history.encode([(0, product.quantity, 500)]),
+                })
+                # session + user + product + the history rows of the months in range
+                self.assertWithinBudget(reverse('product_history_api', args=[product.sku]), queries=4, ms=150)
+
+    def test_api_stock_movements(self):
+        url = reverse('stock_movements_api')
+        for size, owner in self.tenants:
+            with self.subTest(products=size):
+                product = self.log_in(owner)
+                body = json.dumps({'movements': [
+                    {'sku': product.sku, 'kind': 'receipt', 'delta': 3},
+                    {'product_id': product.pk, 'kind': 'sale', 'delta': -1},
+                ]})
+                # + one owner and one supplier valuation update for the whole batch
+                self.assertWithinBudget(url, body, method='post', content_type='application/json',
+                                        queries=13, ms=200)
 
-# Create your tests here.
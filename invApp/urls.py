@@ -1,10 +1,29 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('', views.home_view, name='home_view'),
     path('products/', views.product_list_view, name='product_list_view'),
     path('create/', views.product_create_view, name='product_create_view'),
+    path('products/search/', views.product_search_view, name='product_search_view'),
+    path('products/import/', views.product_import_view, name='product_import_view'),
+    path('products/bulk/', views.product_bulk_view, name='product_bulk_view'),
+    path('products/export/', views.product_export_view, name='product_export_view'),
     path('products/<int:pk>/edit/', views.product_update_view, name='product_update_view'),
     path('products/<int:pk>/delete/', views.product_delete_view, name='product_delete_view'),
+    path('products/<int:pk>/stock/', views.product_stock_view, name='product_stock_view'),
+    path('suppliers/', views.supplier_list_view, name='supplier_list_view'),
+    path('reports/', views.inventory_report_view, name='inventory_report_view'),
+    path('jobs/<int:pk>/', views.job_detail_view, name='job_detail_view'),
+    path('jobs/<int:pk>/download/', views.job_download_view, name='job_download_view'),
+    path('cache/stats/', views.cache_stats_view, name='cache_stats_view'),
+
+    # JSON API
+    path('api/products/', api.product_list_api, name='product_list_api'),
+    path('api/products/<int:pk>/', api.product_detail_api, name='product_detail_api'),
+    path('api/products/sku/<str:sku>/', api.product_sku_api, name='product_sku_api'),
+    path('api/products/sku/<str:sku>/history/', api.product_history_api, name='product_history_api'),
+    path('api/suppliers/', api.supplier_autocomplete_api, name='supplier_autocomplete_api'),
+    path('api/stock/movements/', api.stock_movements_api, name='stock_movements_api'),
+    path('api/jobs/<int:pk>/', api.job_detail_api, name='job_detail_api'),
 ]
@@ -1,26 +1,61 @@
+import asyncio
+
+from django.conf import settings
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+
+from .models import EditConflict, Product, InventoryStats, Job, Supplier
+from .forms import BulkActionForm, ProductForm, ProductFilterForm, ProductImportForm, StockMovementForm
+from .stock import apply_movement, InsufficientStock
+from .importers import import_file, ImportFileError
+from .pagination import akeyset_paginate, InvalidCursor
+from .exporters import export_filename, export_queryset, stream_export, EXPORT_FORMATS
+from .jobs import enqueue, files as job_files
+from .search import search_products
+from . import bulk, cache as fragment_cache
+from .reports import supplier_totals, valuation_report, TOP_DEFAULT
+
 
-from .models import Product
-from .forms import ProductForm
+async def _auser(request):
+    """
+    The logged-in user, loaded without blocking the event loop. It is also
+    pinned on request.user so templates don't lazily query it again.
+    """
+    request.user = await request.auser()
+    return request.user
 
 
-# Home / dashboard view – per user
+# Home / dashboard view – per user (async: the two panels load concurrently)
 @login_required
-def home_view(request):
-    user_products = Product.objects.filter(owner=request.user)
+async def home_view(request):
+    owner = await _auser(request)
 
-    total_products = user_products.count()
-    low_stock = user_products.filter(quantity__lte=10).count()
-    out_of_stock = user_products.filter(quantity=0).count()
-    latest_products = user_products.order_by('-Product_id')[:8]
+    # both panels are cached per owner; a repeat visit runs no product queries
+    async def render_stats():
+        # counters come from the per-owner summary row (one pk read)
+        stats = await InventoryStats.afor_owner(owner)
+        return render_to_string('invApp/partials/dashboard_stats.html', stats)
 
+    async def render_latest():
+        latest_products = [
+            p async for p in Product.objects.filter(owner=owner).order_by('-Product_id')[:8]
+        ]
+        return render_to_string('invApp/partials/latest_products.html', {'latest_products': latest_products})
+
+    stats_html, latest_products_html = await asyncio.gather(
+        fragment_cache.acached_fragment(owner.pk, 'dashboard_stats', render_stats),
+        fragment_cache.acached_fragment(owner.pk, 'latest_products', render_latest),
+    )
     context = {
-        'total_products': total_products,
-        'low_stock': low_stock,
-        'out_of_stock': out_of_stock,
-        'latest_products': latest_products,
+        'stats_html': stats_html,
+        'latest_products_html': latest_products_html,
     }
     return render(request, 'invApp/home.html', context)
 
@@ -28,10 +63,10 @@ def home_view(request):
 # Create view – creates a product for the logged-in user
 @login_required
 def product_create_view(request):
-    form = ProductForm()
+    form = ProductForm(owner=request.user)
 
     if request.method == 'POST':
-        form = ProductForm(request.POST)
+        form = ProductForm(request.POST, owner=request.user)
         if form.is_valid():
             product = form.save(commit=False)   # do not save yet
             product.owner = request.user        # attach owner
@@ -42,30 +77,275 @@ def product_create_view(request):
     return render(request, 'invApp/product_form.html', {'form': form})
 
 
-# List view – only this user's products
+# Import view – bulk create/update products from a CSV or XLSX upload
+@login_required
+def product_import_view(request):
+    form = ProductImportForm()
+    report = None
+
+    if request.method == 'POST':
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            if upload.size > settings.INVENTORY_IMPORT_INLINE_MAX_BYTES:
+                # too big to import inside the request -- hand it to a worker
+                path = job_files().save(f'imports/{request.user.pk}/{upload.name}', upload)
+                job = enqueue('import_products', request.user, path=path, filename=upload.name)
+                return redirect('job_detail_view', pk=job.pk)
+            try:
+                report = import_file(request.user, upload.file, upload.name)
+            except ImportFileError as e:
+                form.add_error('file', str(e))
+            else:
+                messages.success(
+                    request,
+                    f'Imported {report.imported} product(s): '
+                    f'{report.created} new, {report.updated} updated, {report.error_count} rejected.'
+                )
+
+    return render(request, 'invApp/product_import.html', {'form': form, 'report': report})
+
+
+# List view – only this user's products, one keyset page at a time (async)
+@login_required
+async def product_list_view(request):
+    owner = await _auser(request)
+    filter_form = ProductFilterForm(request.GET)
+    products = filter_form.filter(Product.objects.filter(owner=owner).select_related('supplier'))
+    params = filter_form.cleaned_data if filter_form.is_valid() else {}
+
+    async def render_table():
+        try:
+            page = await akeyset_paginate(
+                products,
+                sort=params.get('sort'),
+                after=request.GET.get('after') or None,
+                before=request.GET.get('before') or None,
+                page_size=params.get('per_page'),
+            )
+        except InvalidCursor:
+            # stale or tampered cursor -> start again from the first page
+            page = await akeyset_paginate(products, sort=params.get('sort'), page_size=params.get('per_page'))
+
+        context = {'products': page, 'page': page}
+        return render_to_string('invApp/partials/product_table.html', context, request=request)
+
+    # the table (and its pagination links) depends only on the query string
+    query = sorted(request.GET.lists())
+    context = {
+        'table_html': await fragment_cache.acached_fragment(owner.pk, 'product_table', render_table, query),
+        'filter_form': filter_form,
+        'bulk_form': BulkActionForm(),
+    }
+    return render(request, 'invApp/product_list.html', context)
+
+
+# Bulk view – one action on the products ticked in the list, as one set-based query
+@login_required
+@require_POST
+def product_bulk_view(request):
+    form = BulkActionForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            messages.error(request, ' '.join(errors))
+    else:
+        action = form.cleaned_data['action']
+        try:
+            count = bulk.apply_action(request.user, form.cleaned_data['products'], action, form.cleaned_data['value'])
+        except InsufficientStock:
+            messages.error(request, 'Not enough stock on some of the products -- nothing was changed.')
+        except bulk.PriceOutOfRange:
+            messages.error(request, f'That would price some of the products above {bulk.MAX_PRICE} -- nothing was changed.')
+        else:
+            if action == bulk.DELETE:
+                messages.success(request, f'{count} product(s) deleted.')
+            else:
+                label = dict(bulk.ACTION_CHOICES)[action]
+                messages.success(request, f'{label}: {count} product(s) updated.')
+
+    # back to the same (filtered, sorted) page of the list
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('product_list_view')
+    return redirect(next_url)
+
+
+SEARCH_PAGE_SIZE = 25
+SEARCH_MAX_PAGES = 40
+
+
+# Search view – ranked full-text search over this user's products
+@login_required
+def product_search_view(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = min(max(int(request.GET.get('page', 1)), 1), SEARCH_MAX_PAGES)
+    except ValueError:
+        page = 1
+
+    results = []
+    if query:
+        # one extra row tells us whether there is a next page, without a COUNT(*)
+        results = search_products(
+            request.user, query, SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE
+        )
+
+    context = {
+        'query': query,
+        'products': results[:SEARCH_PAGE_SIZE],
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': len(results) > SEARCH_PAGE_SIZE and page < SEARCH_MAX_PAGES,
+    }
+    return render(request, 'invApp/product_search.html', context)
+
+
+# Export view – stream this user's (filtered) products as CSV or NDJSON
 @login_required
-def product_list_view(request):
-    products = Product.objects.filter(owner=request.user)
-    return render(request, 'invApp/product_list.html', {'products': products})
+def product_export_view(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+
+    if request.method == 'POST':
+        # large catalogs: write the file in the background, download it from the job page
+        job = enqueue('export_products', request.user, format=export_format, params=request.GET.dict())
+        return redirect('job_detail_view', pk=job.pk)
+
+    products = export_queryset(request.user, request.GET)
+    filename = export_filename(export_format)
+    response = StreamingHttpResponse(
+        stream_export(products, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+SUPPLIER_PAGE_SIZE = 50
+
+
+# Supplier list – this user's suppliers by name with their stock totals, one page at a time
+@login_required
+def supplier_list_view(request):
+    query = request.GET.get('q', '').strip()
+    # name prefix and paging both walk the (owner, key) index
+    suppliers = Supplier.objects.filter(owner=request.user).prefixed(query).order_by('key')
+    after = request.GET.get('after')
+    if after:
+        suppliers = suppliers.filter(key__gt=after)
+    page = list(suppliers.only('name', 'key')[:SUPPLIER_PAGE_SIZE + 1])
+    has_next = len(page) > SUPPLIER_PAGE_SIZE
+    page = page[:SUPPLIER_PAGE_SIZE]
+
+    totals = supplier_totals(request.user, [supplier.pk for supplier in page])
+    context = {
+        'query': query,
+        'suppliers': [(supplier, totals.get(supplier.pk, (0, 0, 0))) for supplier in page],
+        'next_after': page[-1].key if has_next else None,
+    }
+    return render(request, 'invApp/supplier_list.html', context)
+
+
+# Reports view – stock value totals, by supplier and top products (reads the rollups only)
+@login_required
+def inventory_report_view(request):
+    try:
+        top = int(request.GET.get('top', TOP_DEFAULT))
+    except ValueError:
+        top = TOP_DEFAULT
+    return render(request, 'invApp/inventory_report.html', valuation_report(request.user, top))
+
+
+# Job view – progress and outcome of one of this user's background jobs
+@login_required
+def job_detail_view(request, pk):
+    job = get_object_or_404(Job, pk=pk, owner=request.user)
+    return render(request, 'invApp/job_detail.html', {'job': job})
+
+
+# Job download – the file an export job produced
+@login_required
+def job_download_view(request, pk):
+    job = get_object_or_404(Job, pk=pk, owner=request.user, status=Job.SUCCEEDED)
+    if not job.result or 'path' not in job.result:
+        raise Http404("This job has no file.")
+    storage = job_files()
+    if not storage.exists(job.result['path']):
+        raise Http404("The file has been removed.")
+    return FileResponse(storage.open(job.result['path'], 'rb'), as_attachment=True, filename=job.result['filename'])
+
+
+# Cache stats – fragment cache hit/miss counters of this process (staff only)
+@staff_member_required
+def cache_stats_view(request):
+    return JsonResponse(fragment_cache.counters.snapshot())
 
 
 # Update view – only allow editing products owned by this user
 @login_required
 def product_update_view(request, pk):
-    product = get_object_or_404(Product, pk=pk, owner=request.user)
+    product = get_object_or_404(Product.objects.select_related('supplier'), pk=pk, owner=request.user)
 
     if request.method == 'POST':
-        form = ProductForm(request.POST, instance=product)
+        form = ProductForm(request.POST, instance=product, owner=request.user)
         if form.is_valid():
-            form.save()
+            try:
+                form.save()
+            except EditConflict:
+                return _edit_conflict(request, pk)
             messages.success(request, 'Product updated!')
             return redirect('product_list_view')
     else:
-        form = ProductForm(instance=product)
+        form = ProductForm(instance=product, owner=request.user)
 
     return render(request, 'invApp/product_form.html', {'form': form})
 
 
+def _edit_conflict(request, pk):
+    """
+    409: the product changed since the form was loaded. The user's input is
+    shown again next to the current values, with the current version, so
+    saving once more deliberately overwrites them.
+    """
+    current = get_object_or_404(Product.objects.select_related('supplier'), pk=pk, owner=request.user)
+    data = request.POST.copy()
+    data['version'] = current.version
+    form = ProductForm(data, instance=current, owner=request.user)
+    form.is_valid()
+    form.add_error(None, 'Someone else changed this product while you were editing it. '
+                         'Check the current values below and save again to overwrite them.')
+    return render(request, 'invApp/product_form.html', {'form': form, 'current': current}, status=409)
+
+
+# Stock view – receive, sell or adjust stock through the ledger
+@login_required
+def product_stock_view(request, pk):
+    product = get_object_or_404(Product, pk=pk, owner=request.user)
+    form = StockMovementForm()
+
+    if request.method == 'POST':
+        form = StockMovementForm(request.POST)
+        if form.is_valid():
+            try:
+                movement = apply_movement(
+                    request.user, product.pk,
+                    form.cleaned_data['kind'], form.cleaned_data['delta'], form.cleaned_data['note'],
+                )
+            except InsufficientStock:
+                form.add_error('delta', 'Not enough stock for this change.')
+            else:
+                messages.success(request, f'Stock updated: {movement.quantity_after} in stock.')
+                return redirect('product_stock_view', pk=product.pk)
+
+    movements = product.movements.order_by('-created_at')[:20]
+    return render(request, 'invApp/product_stock.html', {
+        'product': product,
+        'form': form,
+        'movements': movements,
+    })
+
+
 # Delete view – only allow deleting products owned by this user
 @login_required
 def product_delete_view(request, pk):
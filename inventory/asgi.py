@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory.settings')
 
 application = get_asgi_application()
+
+# compile the templates now, not during the first requests
+if settings.INVENTORY_TEMPLATE_WARMUP:
+    from inventory.rendering import warm_templates
+
+    warm_templates()
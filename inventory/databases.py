@@ -0,0 +1,87 @@
+"""
+Database profiles, picked with the INVENTORY_DB environment variable.
+
+- ``sqlite`` (default): WAL journal, synchronous=NORMAL, a busy timeout and
+  memory-mapped reads. Write transactions start with BEGIN IMMEDIATE so
+  concurrent writers queue on the busy timeout instead of failing with
+  "database is locked" when a read lock cannot be upgraded.
+- ``sqlite-rollback``: Django's stock SQLite settings (rollback journal, no
+  busy handling). Only kept as a baseline for ``bench_db_profiles``.
+- ``postgres``: persistent, health-checked connections, or a psycopg
+  connection pool (needs ``psycopg[pool]``) when INVENTORY_DB_POOL_MAX > 0.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+PROFILES = ('sqlite', 'sqlite-rollback', 'postgres')
+
+
+def _int(environ, name, default):
+    return int(environ.get(name, default))
+
+
+def sqlite_config(environ, base_dir, tuned=True):
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': environ.get('INVENTORY_DB_NAME') or base_dir / 'db.sqlite3',
+    }
+    if not tuned:
+        # journal_mode is stored in the file -- undo a previous WAL run explicitly
+        config['OPTIONS'] = {'init_command': 'PRAGMA journal_mode=DELETE;'}
+        return config
+
+    busy_ms = _int(environ, 'INVENTORY_DB_BUSY_TIMEOUT_MS', 20000)
+    mmap_bytes = _int(environ, 'INVENTORY_DB_MMAP_SIZE', 128 * 1024 * 1024)
+    config['OPTIONS'] = {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            f'PRAGMA busy_timeout={busy_ms};'
+            f'PRAGMA mmap_size={mmap_bytes};'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+        # seconds the sqlite3 module waits for a lock (it also sets busy_timeout)
+        'timeout': busy_ms / 1000,
+        'transaction_mode': 'IMMEDIATE',
+    }
+    return config
+
+
+def postgres_config(environ):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('INVENTORY_DB_NAME') or environ.get('PGDATABASE', 'inventory'),
+        'USER': environ.get('PGUSER', ''),
+        'PASSWORD': environ.get('PGPASSWORD', ''),
+        'HOST': environ.get('PGHOST', ''),
+        'PORT': environ.get('PGPORT', ''),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+
+    pool_max = _int(environ, 'INVENTORY_DB_POOL_MAX', 10)
+    if pool_max > 0:
+        # the pool owns the connections; Django refuses CONN_MAX_AGE with a pool
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': _int(environ, 'INVENTORY_DB_POOL_MIN', 2),
+            'max_size': pool_max,
+            'timeout': _int(environ, 'INVENTORY_DB_POOL_TIMEOUT', 10),
+        }
+    else:
+        config['CONN_MAX_AGE'] = _int(environ, 'INVENTORY_DB_CONN_MAX_AGE', 60)
+    return config
+
+
+def database_config(base_dir, environ=os.environ):
+    """The ``default`` DATABASES entry for the profile named by INVENTORY_DB."""
+    profile = environ.get('INVENTORY_DB', 'sqlite')
+    if profile == 'sqlite':
+        return sqlite_config(environ, base_dir)
+    if profile == 'sqlite-rollback':
+        return sqlite_config(environ, base_dir, tuned=False)
+    if profile == 'postgres':
+        return postgres_config(environ)
+    raise ImproperlyConfigured(f"Unknown INVENTORY_DB profile {profile!r}; expected one of {', '.join(PROFILES)}.")
@@ -0,0 +1,114 @@
+"""
+In-process request metrics, exposed at /metrics in Prometheus text format.
+
+Histograms live in this process only; with several workers each one keeps
+its own, so scrape them per worker (or run one worker per port).
+"""
+import bisect
+import threading
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+
+# seconds; also reused for the smaller timings (DB, templates)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+
+
+class Histogram:
+    """A Prometheus histogram keyed by one label (the URL name)."""
+
+    def __init__(self, name, help_text, buckets, label='view'):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = {
+                    'counts': [0] * len(self.buckets), 'sum': 0, 'count': 0,
+                }
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def samples(self, label_value):
+        with self._lock:
+            series = self._series.get(label_value)
+            return dict(series, counts=list(series['counts'])) if series else None
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                label = f'{self.label}="{escape(label_value)}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{label}}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{label}}} {series["count"]}')
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+request_duration = Histogram(
+    'inventory_request_duration_seconds', 'Wall time per request.', DURATION_BUCKETS)
+db_queries = Histogram(
+    'inventory_request_db_queries', 'Database queries per request.', QUERY_BUCKETS)
+db_duration = Histogram(
+    'inventory_request_db_seconds', 'Time spent in database queries per request.', DURATION_BUCKETS)
+template_duration = Histogram(
+    'inventory_request_template_seconds', 'Time spent rendering templates per request.', DURATION_BUCKETS)
+response_size = Histogram(
+    'inventory_response_size_bytes', 'Response body size (non-streaming responses).', SIZE_BUCKETS)
+
+HISTOGRAMS = (request_duration, db_queries, db_duration, template_duration, response_size)
+
+# extra callables returning Prometheus text lines (apps register theirs in ready())
+_collectors = []
+
+
+def register_collector(collector):
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; only for INVENTORY_METRICS_ALLOWED_IPS (or DEBUG)."""
+    allowed = getattr(settings, 'INVENTORY_METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if not settings.DEBUG and request.META.get('REMOTE_ADDR') not in allowed:
+        raise PermissionDenied
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,107 @@
+"""
+Template rendering: start-up warm-up and a memoizing form renderer.
+
+- ``warm_templates()`` compiles the project's templates (and the form
+  widget templates) into the cached loaders when a worker starts, so the
+  first request for each page doesn't pay for reading and parsing them.
+  wsgi.py/asgi.py call it when INVENTORY_TEMPLATE_WARMUP is on.
+- ``CachedFormRenderer`` is Django's form renderer, except that a widget
+  whose template context is plain data (name, type, value, attrs) is
+  rendered once per distinct context and the HTML reused. The widget
+  templates are pure functions of that context, and on the product form
+  they were most of the page's render time.
+"""
+import os
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.forms.renderers import DjangoTemplates, get_default_renderer
+from django.template import engines
+from django.template.backends.django import DjangoTemplates as DjangoTemplatesBackend
+from django.template.utils import get_app_template_dirs
+from django.utils.functional import Promise
+
+
+FORM_TEMPLATES = 'django/forms/'
+WIDGET_TEMPLATES = 'django/forms/widgets/'
+
+
+def _template_names(dirs, prefixes):
+    for directory in dirs:
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                if name.startswith(prefixes) and name.endswith(('.html', '.txt')):
+                    yield name
+
+
+def warm_templates(prefixes=None):
+    """
+    Compile every template whose name starts with one of ``prefixes``
+    (default INVENTORY_WARM_TEMPLATES), and the form renderer's templates.
+    Returns their names.
+    """
+    if prefixes is None:
+        prefixes = getattr(settings, 'INVENTORY_WARM_TEMPLATES', ())
+    prefixes = tuple(prefixes)
+    warmed = set()
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplatesBackend):
+            continue
+        dirs = [*backend.engine.dirs, *get_app_template_dirs('templates')]
+        for name in set(_template_names(dirs, prefixes)):
+            backend.get_template(name)
+            warmed.add(name)
+
+    renderer = get_default_renderer()
+    if isinstance(renderer, DjangoTemplates):
+        # django/forms/templates isn't an app directory unless django.forms is installed
+        dirs = [*renderer.engine.engine.dirs, *get_app_template_dirs('templates')]
+        for name in set(_template_names(dirs, (FORM_TEMPLATES,))):
+            renderer.get_template(name)
+            warmed.add(name)
+    return sorted(warmed)
+
+
+def _freeze(value):
+    """A hashable copy of a widget context value; TypeError if it isn't plain data."""
+    if value is None or isinstance(value, (str, bool, int, float, Decimal)):
+        # typed: True and 1, or SafeString and str, are equal but render differently
+        return (type(value), value)
+    if isinstance(value, Promise):
+        # reverse_lazy() and gettext_lazy() attributes, as they read now
+        return (str, str(value))
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((key, _freeze(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    raise TypeError(type(value).__name__)
+
+
+class CachedFormRenderer(DjangoTemplates):
+    """Reuse the HTML of widgets already rendered with the same context."""
+
+    # distinct widget renders kept (per process) before starting over
+    max_entries = 2048
+
+    def __init__(self):
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def render(self, template_name, context, request=None):
+        if settings.DEBUG or request is not None or not template_name.startswith(WIDGET_TEMPLATES):
+            return super().render(template_name, context, request)
+        try:
+            key = (template_name, _freeze(context))
+        except TypeError:
+            return super().render(template_name, context, request)
+
+        html = self._rendered.get(key)
+        if html is None:
+            html = super().render(template_name, context, request)
+            with self._lock:
+                if len(self._rendered) >= self.max_entries:
+                    self._rendered.clear()
+                self._rendered[key] = html
+        return html
@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from django.templatetags.static import static
 
+from .databases import database_config
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -54,6 +57,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory.staticfiles.StaticFilesMiddleware',
+    'inventory.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,28 +74,42 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # compiled once per process and kept; with DEBUG on the
+            # autoreloader empties the cache when a template is edited
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Widgets rendered with the same name/value/attrs reuse their HTML
+# (inventory/rendering.py); off while DEBUG is on.
+FORM_RENDERER = 'inventory.rendering.CachedFormRenderer'
+
+# Compile these templates (by name prefix) and the form widgets when a
+# worker starts (wsgi.py/asgi.py) rather than on the first request for each.
+INVENTORY_TEMPLATE_WARMUP = os.environ.get('INVENTORY_TEMPLATE_WARMUP', '0' if DEBUG else '1') == '1'
+INVENTORY_WARM_TEMPLATES = ['invApp/', 'accounts/', '404.html']
+
 WSGI_APPLICATION = 'inventory.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Profile picked with INVENTORY_DB=sqlite|sqlite-rollback|postgres, see inventory/databases.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
 
@@ -112,6 +131,38 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing profile (auth_app/hashers.py): 'pbkdf2', 'argon2' (needs
+# argon2-cffi) or 'scrypt', with the cost of each below (unset = Django's
+# default). The other hashers stay listed so existing hashes still verify;
+# they are re-hashed with the profile's hasher on the next login.
+INVENTORY_PASSWORD_HASHER = os.environ.get('INVENTORY_PASSWORD_HASHER', 'pbkdf2')
+INVENTORY_PBKDF2_ITERATIONS = int(os.environ.get('INVENTORY_PBKDF2_ITERATIONS', 0))
+INVENTORY_ARGON2_TIME_COST = int(os.environ.get('INVENTORY_ARGON2_TIME_COST', 0))
+INVENTORY_ARGON2_MEMORY_COST = int(os.environ.get('INVENTORY_ARGON2_MEMORY_COST', 0))  # KiB
+INVENTORY_ARGON2_PARALLELISM = int(os.environ.get('INVENTORY_ARGON2_PARALLELISM', 0))
+INVENTORY_SCRYPT_WORK_FACTOR = int(os.environ.get('INVENTORY_SCRYPT_WORK_FACTOR', 0))
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'auth_app.hashers.PBKDF2PasswordHasher',
+    'argon2': 'auth_app.hashers.Argon2PasswordHasher',
+    'scrypt': 'auth_app.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[INVENTORY_PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != INVENTORY_PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Failed logins allowed per client IP and per username in a sliding window,
+# as (failures, seconds); over either, login answers 429 without hashing the
+# password (auth_app/throttle.py). Counted in this cache alias.
+INVENTORY_LOGIN_THROTTLE_RATES = {
+    'ip': (int(os.environ.get('INVENTORY_LOGIN_THROTTLE_IP', 20)), 300),
+    'username': (int(os.environ.get('INVENTORY_LOGIN_THROTTLE_USERNAME', 5)), 300),
+}
+INVENTORY_LOGIN_THROTTLE_CACHE = 'default'
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -136,6 +187,25 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Hashed file names ({% static %} -> styles.3f1a….css) with .gz/.br variants
+# written by collectstatic (inventory/staticfiles.py; .br needs the brotli
+# package). Needs `manage.py collectstatic` before the site is served, so it
+# is off by default while DEBUG is on.
+INVENTORY_HASHED_STATIC = os.environ.get('INVENTORY_HASHED_STATIC', '0' if DEBUG else '1') == '1'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'inventory.staticfiles.CompressedManifestStaticFilesStorage' if INVENTORY_HASHED_STATIC
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT from Django itself, for deployments without nginx in
+# front: hashed files are sent as immutable for a year, the others for
+# INVENTORY_STATIC_MAX_AGE seconds. Restart the workers after collectstatic.
+INVENTORY_SERVE_STATIC = os.environ.get('INVENTORY_SERVE_STATIC', '0') == '1'
+INVENTORY_STATIC_MAX_AGE = int(os.environ.get('INVENTORY_STATIC_MAX_AGE', 60))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -162,3 +232,118 @@ UNFOLD = {
     "SITE_LOGO_WIDTH": "140px",
 }
 
+
+# invApp
+# Keep per-owner dashboard counters in the InventoryStats table (updated on
+# every Product save/delete). Set to False to aggregate live on each request.
+INVENTORY_STATS_TABLE = True
+
+# Keep the stock valuation rollups (invApp/reports.py) current on every
+# change. Set to False to aggregate the reports page live.
+INVENTORY_VALUATION_ROLLUPS = True
+
+# Fragment cache for the dashboard and product list (invApp/cache.py).
+# locmem is per process -- use "file" or "redis" when running several workers,
+# so that an edit in one worker invalidates the fragments seen by the others.
+INVENTORY_CACHE = os.environ.get('INVENTORY_CACHE', 'locmem')
+INVENTORY_CACHE_LOCATION = os.environ.get('INVENTORY_CACHE_LOCATION')
+
+if INVENTORY_CACHE == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': INVENTORY_CACHE_LOCATION or 'redis://127.0.0.1:6379/1',
+        }
+    }
+elif INVENTORY_CACHE == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': INVENTORY_CACHE_LOCATION or str(BASE_DIR / 'var' / 'cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'inventory',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# seconds a rendered fragment may live; edits invalidate it sooner
+INVENTORY_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('INVENTORY_FRAGMENT_CACHE_TIMEOUT', 300))
+
+# Session profile: 'cached_db' reads sessions from the cache and writes them
+# through to the database, 'signed_cookies' keeps them in the browser (no
+# server-side storage, so they can't be revoked there), 'db' is Django's
+# plain database store. Expired database sessions are removed by
+# `manage.py purge_sessions`, run from cron.
+# cached_db is only the default with a shared cache: with locmem a logout in
+# one worker would leave the session cached, and valid, in the others.
+INVENTORY_SHARED_CACHE = INVENTORY_CACHE in ('redis', 'file')
+INVENTORY_SESSIONS = os.environ.get('INVENTORY_SESSIONS', 'cached_db' if INVENTORY_SHARED_CACHE else 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[INVENTORY_SESSIONS]
+
+# The logged-in user is cached for this many seconds between requests
+# (auth_app/backends.py); 0 looks it up every time. Off by default unless the
+# cache is shared, so that a password change ends the user's sessions in
+# every worker at once. `manage.py check` flags either cache on locmem.
+AUTHENTICATION_BACKENDS = ['auth_app.backends.CachedModelBackend']
+INVENTORY_USER_CACHE_TIMEOUT = int(os.environ.get('INVENTORY_USER_CACHE_TIMEOUT', 300 if INVENTORY_SHARED_CACHE else 0))
+
+# Request instrumentation (inventory/middleware.py): share of requests measured,
+# and who may scrape /metrics when DEBUG is off.
+INVENTORY_PERF_SAMPLE_RATE = float(os.environ.get('INVENTORY_PERF_SAMPLE_RATE', 1.0))
+INVENTORY_METRICS_ALLOWED_IPS = os.environ.get('INVENTORY_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Stock alerts (invApp/alerts.py): delivered by `manage.py deliver_alerts`
+# through these backends, comma-separated dotted paths.
+INVENTORY_ALERT_BACKENDS = os.environ.get('INVENTORY_ALERT_BACKENDS', 'invApp.alerts.LoggingBackend').split(',')
+INVENTORY_ALERT_WEBHOOK_URL = os.environ.get('INVENTORY_ALERT_WEBHOOK_URL')
+INVENTORY_ALERT_MAX_ATTEMPTS = int(os.environ.get('INVENTORY_ALERT_MAX_ATTEMPTS', 5))
+
+# Background jobs (invApp/jobs.py, `manage.py run_worker`): where uploads and
+# exports handed to jobs are kept, and the upload size above which an import
+# is queued instead of run inside the request.
+INVENTORY_JOB_FILES_DIR = os.environ.get('INVENTORY_JOB_FILES_DIR', str(BASE_DIR / 'var' / 'jobs'))
+INVENTORY_IMPORT_INLINE_MAX_BYTES = int(os.environ.get('INVENTORY_IMPORT_INLINE_MAX_BYTES', 1024 * 1024))
+
+# Stock history (invApp/history.py): one snapshot per 'hour' or 'day', taken by
+# `manage.py snapshot_inventory` run from cron at that interval.
+INVENTORY_SNAPSHOT_INTERVAL = os.environ.get('INVENTORY_SNAPSHOT_INTERVAL', 'day')
+
+# the test runner quiets the loggers below (see inventory/test_runner.py)
+TEST_RUNNER = 'inventory.test_runner.QuietLoggingRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # one JSON line per measured request
+        'inventory.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('INVENTORY_PERF_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        # LoggingBackend alerts
+        'inventory.alerts': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        # job failures and worker start/stop
+        'inventory.jobs': {
+            'handlers': ['console'],
+            'level': os.environ.get('INVENTORY_JOBS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,186 @@
+"""
+Static assets with content hashes, pre-compressed variants and far-future
+caching.
+
+- ``CompressedManifestStaticFilesStorage``: Django's manifest storage
+  (``{% static %}`` returns ``styles/styles.3f1a….css``), which additionally
+  writes ``.gz`` and -- when the ``brotli`` package is installed -- ``.br``
+  files next to every compressible hashed file during ``collectstatic``.
+- ``StaticFilesMiddleware``: serves STATIC_ROOT from the Django process for
+  deployments without nginx in front (INVENTORY_SERVE_STATIC). The file list
+  is read once at startup (restart after ``collectstatic``); each request is
+  a dict lookup. Hashed names are sent with ``Cache-Control: immutable`` and
+  a year's max-age, in the best encoding the browser accepts.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+from email.utils import formatdate
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf', '.eot')
+# not worth a variant below this size, nor unless it saves at least 5%
+MIN_COMPRESS_BYTES = 256
+MIN_SAVING = 0.95
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress(path):
+    """Write ``path``.gz (and .br) where they come out smaller; returns the files written."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return []
+
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data)
+    written = []
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data) * MIN_SAVING:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # the final hashed names only (CSS is hashed over several passes)
+        for name in set(self.hashed_files.values()):
+            if name.lower().endswith(COMPRESSIBLE):
+                compress(self.path(name))
+
+
+def accepted_encodings(header):
+    """The Content-Encodings an Accept-Encoding header allows (q > 0)."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        # weak: the gzip/brotli/identity bodies all carry it
+        self.etag = f'W/"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.cache_control = IMMUTABLE if immutable else (
+            f"public, max-age={getattr(settings, 'INVENTORY_STATIC_MAX_AGE', 60)}"
+        )
+        self.variants = [
+            (encoding, path + suffix, os.path.getsize(path + suffix))
+            for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)
+        ]
+
+    def pick(self, accept_encoding):
+        """(path, size, Content-Encoding or None) to send for this Accept-Encoding."""
+        if self.variants and accept_encoding:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, path, size in self.variants:
+                if encoding in accepted:
+                    return path, size, encoding
+        return self.path, self.size, None
+
+
+def scan(root, static_url):
+    """{url path: StaticFile} for everything collected under ``root``."""
+    root = os.fspath(root)
+    hashed = set()
+    manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+    if os.path.exists(manifest):
+        hashed = set(ManifestStaticFilesStorage(location=root).hashed_files.values())
+
+    compressed = tuple(suffix for _, suffix in ENCODINGS)
+    files = {}
+    for directory, _, names in os.walk(root):
+        for filename in names:
+            path = os.path.join(directory, filename)
+            base, extension = os.path.splitext(path)
+            if extension in compressed and os.path.exists(base):
+                continue  # a variant of another file
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[posixpath.join(static_url, name)] = StaticFile(path, name in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files (GET/HEAD under STATIC_URL) before anything else runs."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INVENTORY_SERVE_STATIC', False) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+        self.files = scan(settings.STATIC_ROOT, self.prefix)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        static_file = self.files.get(request.path)
+        if static_file is None:
+            return None
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and static_file.etag in parse_etags(if_none_match):
+            response = HttpResponseNotModified()
+        else:
+            path, size, encoding = static_file.pick(request.headers.get('Accept-Encoding', ''))
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=static_file.content_type)
+            else:
+                response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = static_file.etag
+        response['Last-Modified'] = static_file.last_modified
+        response['Cache-Control'] = static_file.cache_control
+        if static_file.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,26 @@
+"""
+The project's test runner: Django's, with the per-request performance lines
+and the job worker's INFO lines kept out of the test output. Tests that
+check them use assertLogs(), which lowers the level for its block; setting
+INVENTORY_PERF_LOG_LEVEL / INVENTORY_JOBS_LOG_LEVEL shows them again.
+"""
+import logging
+import os
+
+from django.test.runner import DiscoverRunner
+
+
+# logger -> the environment variable that sets its level
+QUIET_LOGGERS = {
+    'inventory.performance': 'INVENTORY_PERF_LOG_LEVEL',
+    'inventory.jobs': 'INVENTORY_JOBS_LOG_LEVEL',
+}
+
+
+class QuietLoggingRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        for name, variable in QUIET_LOGGERS.items():
+            if variable not in os.environ:
+                logging.getLogger(name).setLevel(logging.WARNING)
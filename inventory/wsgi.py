@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory.settings')
 
 application = get_wsgi_application()
+
+# compile the templates now, not during the first requests
+if settings.INVENTORY_TEMPLATE_WARMUP:
+    from inventory.rendering import warm_templates
+
+    warm_templates()